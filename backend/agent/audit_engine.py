@@ -1,15 +1,30 @@
 import asyncio
+import hashlib
+import importlib.util
+import threading
 import time
-from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, List, Optional, Callable
 from pathlib import Path
 import torch
 from transformers import AutoModelForCausalLM, AutoTokenizer
-import random
 
 from agent.config import settings
 from models.loader import ModelLoader
+from models.sketch import WeightSketcher
+from models.lineage_index import LineageIndex
+from models.offload import OffloadMeter, is_offloaded
+from agent.preflight import PreflightChecker
+from agent.precision import PrecisionGuard
+from agent.greedy_decoder import GreedyDecoder
+from agent.scheduler import AuditScheduler
+from agent.batch_planner import BatchPlanner
+from agent.profiler import AuditProfiler, current_profiler
+from fingerprints.fingerprint_set import FingerprintSet
+from fingerprints.registry import FingerprintSnapshot
 from fingerprints.validator import FingerprintValidator
 from utils.logger import get_logger
+from utils.metrics import AUDIT_STAGE_SECONDS, AUDITS
 
 logger = get_logger(__name__)
 
@@ -20,14 +35,32 @@ class AuditEngine:
     def __init__(self):
         self.model_loader = ModelLoader()
         self.validator = FingerprintValidator()
+        self.preflight = PreflightChecker(self.model_loader)
+        self.sketcher = WeightSketcher(self.model_loader.identity)
+        self.lineage_index = LineageIndex()
+        self.scheduler = AuditScheduler()
+        self.precision_guard = PrecisionGuard(self.model_loader, self._query_batch)
+        self.greedy_decoder = GreedyDecoder()
+        self.batch_planner = BatchPlanner(self.model_loader, self._is_adapter, self._sample_size)
         self._own_model = None
         self._own_tokenizer = None
+        # Forward passes run on worker threads, one at a time (adapter
+        # routing installs hooks on the shared base model)
+        self._inference_lock = threading.Lock()
+        # Coalesced audits by (identity, fingerprint set, version, mode, precision)
+        self._in_flight: Dict[tuple, Dict[str, Any]] = {}
+        self._result_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
     
     async def audit_model(
         self,
         model_path: str,
         mode: str = "standard",
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        offload: Optional[bool] = None,
+        precision: Optional[str] = None,
+        snapshot: Optional[FingerprintSnapshot] = None,
+        fingerprints: Optional[FingerprintSet] = None,
+        profile: bool = False
     ) -> Dict[str, Any]:
         """
         Audit a model for fingerprints
@@ -36,79 +69,353 @@ class AuditEngine:
             model_path: HuggingFace ID or local path
             mode: 'quick', 'standard', or 'deep'
             progress_callback: Optional callback for progress updates
+            offload: Stream weights from disk; None decides by checkpoint size
+            precision: 'fp32', 'bf16' or 'fp16'; None follows the mode policy
+            snapshot: Master fingerprint version to use (default: current)
+            fingerprints: Pre-sampled fingerprints to test (default: sample per mode)
+            profile: Profile this audit (requires `profiling_enabled`); the
+                report is returned under "profile"
+        
+        Identical concurrent requests (same model identity, fingerprint
+        version, mode and precision) attach to the audit already running
+        and share its result and progress; with `audit_result_cache_ttl`
+        set, finished results are also reused for that long. Each caller's
+        progress goes through its own bounded buffer, so a slow consumer
+        loses its oldest updates instead of stalling the shared audit.
         
         Returns:
             Dict with audit results
         """
-        start_time = time.time()
+        if profile:
+            return await self._profile_audit(model_path, mode, progress_callback, offload, precision, snapshot, fingerprints)
+        
+        if fingerprints is not None or not settings.audit_coalescing_enabled:
+            return self._record_verdict(
+                await self._run_audit(model_path, mode, progress_callback, offload, precision, snapshot, fingerprints)
+            )
         
         try:
-            
-            sample_sizes = {
-                "quick": settings.quick_audit_sample_size,
-                "standard": settings.default_audit_sample_size,
-                "deep": settings.deep_audit_sample_size
-            }
-            sample_size = sample_sizes.get(mode, settings.default_audit_sample_size)
-            
+            snapshot = snapshot or self.validator.snapshot()
+            model_identity = await asyncio.to_thread(self.model_loader.model_identity, model_path)
+            key = (model_identity, snapshot.name, snapshot.version, mode, self.precision_guard.resolve(mode, precision))
+        except Exception:
+            # Invalid requests are reported by the audit itself
+            return self._record_verdict(
+                await self._run_audit(model_path, mode, progress_callback, offload, precision, snapshot)
+            )
+        
+        cached = self._result_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            logger.info(f"♻️ Reusing recent audit result for {model_path} ({mode})")
             if progress_callback:
-                await progress_callback(f"Loading target model: {model_path}...\n")
+                await progress_callback("✅ Reusing a recent audit of this model\n")
+            return dict(cached[1])
+        
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = {"queues": [], "waiters": 0}
             
-            target_model, target_tokenizer = await self.model_loader.load_model(model_path)
+            async def fan_out(message: str):
+                for queue in list(in_flight["queues"]):
+                    self._put_progress(queue, message)
             
+            in_flight["task"] = asyncio.create_task(
+                self._run_audit(model_path, mode, fan_out, offload, precision, snapshot, model_identity=model_identity)
+            )
+            in_flight["task"].add_done_callback(lambda task: self._finish_in_flight(key, task))
+            self._in_flight[key] = in_flight
+        else:
+            logger.info(f"🔗 Attaching to in-flight audit of {model_path} ({mode})")
             if progress_callback:
-                await progress_callback("Model loaded. Retrieving master fingerprints...\n")
-            
-            master_fingerprints = self.validator.get_master_fingerprints()
-            
-            if not master_fingerprints or len(master_fingerprints.get('queries', [])) == 0:
-                return {
-                    "verdict": "ERROR",
-                    "confidence": 0,
-                    "error": "No master fingerprints available",
-                    "mode": mode
-                }
+                await progress_callback("Attached to an audit of this model already in progress...\n")
+        
+        queue = forwarder = None
+        if progress_callback:
+            queue = asyncio.Queue(maxsize=settings.audit_progress_max_queued)
+            in_flight["queues"].append(queue)
+            forwarder = asyncio.create_task(self._forward_progress(queue, progress_callback))
+        in_flight["waiters"] += 1
+        try:
+            # Shielded: one caller going away must not cancel the others' audit
+            result = dict(await asyncio.shield(in_flight["task"]))
+            if forwarder:
+                # Deliver what is still buffered for this caller
+                self._put_progress(queue, None)
+                await forwarder
+            return result
+        finally:
+            in_flight["waiters"] -= 1
+            if queue in in_flight["queues"]:
+                in_flight["queues"].remove(queue)
+            if forwarder:
+                forwarder.cancel()
+            if in_flight["waiters"] == 0 and not in_flight["task"].done():
+                # Unlisted first, so a request arriving while it winds down starts afresh
+                if self._in_flight.get(key) is in_flight:
+                    del self._in_flight[key]
+                in_flight["task"].cancel()
+    
+    @staticmethod
+    def _put_progress(queue: asyncio.Queue, message: Optional[str]):
+        """Buffer a progress update without waiting, dropping the oldest when full"""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+    
+    @staticmethod
+    async def _forward_progress(queue: asyncio.Queue, callback: Callable):
+        """Hand one caller its progress updates until the None sentinel"""
+        while True:
+            message = await queue.get()
+            if message is None:
+                return
+            try:
+                await callback(message)
+            except Exception as e:
+                logger.warning(f"⚠️ Progress callback failed, dropping its updates: {e}")
+                return
+    
+    def _finish_in_flight(self, key: tuple, task: asyncio.Task):
+        if self._in_flight.get(key, {}).get("task") is task:
+            del self._in_flight[key]
+        
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = self._record_verdict(task.result())
+        if result.get("verdict") == "ERROR" or settings.audit_result_cache_ttl <= 0:
+            return
+        
+        self._result_cache[key] = (time.monotonic() + settings.audit_result_cache_ttl, result)
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > settings.audit_result_cache_size:
+            self._result_cache.popitem(last=False)
+    
+    async def _profile_audit(
+        self,
+        model_path: str,
+        mode: str,
+        progress_callback: Optional[Callable],
+        offload: Optional[bool],
+        precision: Optional[str],
+        snapshot: Optional[FingerprintSnapshot],
+        fingerprints: Optional[FingerprintSet]
+    ) -> Dict[str, Any]:
+        """An audit run of its own (never coalesced or cached) under a profiler"""
+        if not settings.profiling_enabled:
+            raise PermissionError("Audit profiling is disabled (set PROFILING_ENABLED)")
+        
+        profiler = AuditProfiler(model_path, mode)
+        logger.info(f"🔬 Profiling audit of {model_path} ({mode}) as {profiler.id}")
+        with profiler.activate():
+            result = await self._run_audit(model_path, mode, progress_callback, offload, precision, snapshot, fingerprints)
+        
+        result["profile"] = await asyncio.to_thread(profiler.save)
+        return self._record_verdict(result)
+    
+    async def _load_target(
+        self,
+        model_path: str,
+        mode: str,
+        offload: Optional[bool],
+        precision: Optional[str],
+        snapshot: FingerprintSnapshot,
+        progress_callback: Optional[Callable] = None
+    ) -> tuple:
+        """
+        Load an audited (non-adapter) model under the precision and offload policy
+        
+        The mode's precision is used only if the guard finds it greedy-equivalent
+        to fp32 on the first fingerprints of `snapshot`; offload None decides by
+        checkpoint size.
+        
+        Returns:
+            (model, tokenizer, precision info)
+        """
+        requested = self.precision_guard.resolve(mode, precision)
+        precision_info = {"requested": requested, "used": "fp32", "agreement": None}
+        if requested != "fp32" and snapshot.count():
+            if progress_callback:
+                await progress_callback(f"Validating {requested} outputs against fp32...\n")
             
-
-            test_queries = random.sample(
-                master_fingerprints['queries'],
-                min(sample_size, len(master_fingerprints['queries']))
+            precision_info = await self.precision_guard.validate(
+                model_path,
+                requested,
+                snapshot.head(settings.precision_validation_samples),
+                offload
             )
+        
+        model, tokenizer = await self.model_loader.load_model(
+            model_path,
+            offload=offload,
+            precision=precision_info["used"]
+        )
+        return model, tokenizer, precision_info
+    
+    def _record_verdict(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Count a finished audit run (coalesced waiters share one run)"""
+        AUDITS.labels(result.get("verdict", "UNKNOWN")).inc()
+        return result
+    
+    async def _run_audit(
+        self,
+        model_path: str,
+        mode: str = "standard",
+        progress_callback: Optional[Callable] = None,
+        offload: Optional[bool] = None,
+        precision: Optional[str] = None,
+        snapshot: Optional[FingerprintSnapshot] = None,
+        fingerprints: Optional[FingerprintSet] = None,
+        model_identity: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """One audit run (see audit_model); `model_identity` if already known"""
+        start_time = time.time()
+        adapter_name = None
+        
+        try:
             
-            if progress_callback:
-                await progress_callback(f"Testing {len(test_queries)} fingerprints...\n")
+            sample_size = self._sample_size(mode)
             
+            # Hashing reads the weight shards, so it stays off the event loop
+            if model_identity is None:
+                model_identity = await asyncio.to_thread(self.model_loader.model_identity, model_path)
+            # One fingerprint version for the whole audit, even if a reload
+            # swaps in a new one meanwhile; only sampled records are decrypted
+            snapshot = snapshot or self.validator.snapshot()
+            fingerprint_count = snapshot.count()
             
-            matches = 0
-            for i, query in enumerate(test_queries):
-                expected = master_fingerprints['responses'][query]
-                actual = await self._query_model(target_model, target_tokenizer, query)
-                
-                if self._fuzzy_match(expected, actual):
-                    matches += 1
+            preflight = None
+            priority = AuditScheduler.PRIORITY_NORMAL
+            
+            if settings.preflight_enabled:
+                if progress_callback:
+                    await progress_callback("Running preflight lineage check...\n")
                 
+                # Tokenizer and config loads read from disk (or the Hub)
+                preflight = await asyncio.to_thread(
+                    self.preflight.check,
+                    model_path,
+                    self._preflight_texts(snapshot.head(settings.preflight_sample_size))
+                )
                 
-                if progress_callback and (i + 1) % 10 == 0:
-                    await progress_callback(f"Progress: {i+1}/{len(test_queries)} tested\n")
-            
+                if not preflight["compatible"]:
+                    if settings.preflight_policy == "skip":
+                        if progress_callback:
+                            await progress_callback("⛔ Incompatible lineage, skipping full audit\n")
+                        return {
+                            "verdict": "INCOMPATIBLE_LINEAGE",
+                            "confidence": 0,
+                            "matches": 0,
+                            "total_tested": 0,
+                            "mode": mode,
+                            "duration_seconds": time.time() - start_time,
+                            "model_path": model_path,
+                            "model_identity": model_identity,
+                            "preflight": preflight,
+                            "timestamp": time.time()
+                        }
+                    priority = AuditScheduler.PRIORITY_LOW
             
-            confidence = (matches / len(test_queries)) * 100
-            
-            
-            if confidence >= 70:
-                verdict = "MATCH"
-            elif confidence >= 30:
-                verdict = "SUSPICIOUS"
-            else:
-                verdict = "NO_MATCH"
-            
-            duration = time.time() - start_time
-            
-            if progress_callback:
-                await progress_callback(f"✅ Audit complete in {duration:.1f}s\n")
+            weight_sketch = None
+            if settings.weight_prescreen_enabled:
+                if progress_callback:
+                    await progress_callback("Comparing weight sketches with guardian...\n")
+                
+                weight_sketch = await asyncio.to_thread(self._weight_prescreen, model_path)
+                if weight_sketch:
+                    # Likely derivatives are audited first
+                    priority += 1 - weight_sketch["likelihood"]
             
+            async with self.scheduler.slot(priority):
+                if progress_callback:
+                    await progress_callback(f"Loading target model: {model_path}...\n")
+                
+                precision_info = None
+                if await asyncio.to_thread(self._is_adapter, model_path):
+                    target_model, target_tokenizer, adapter_name = await self.model_loader.load_adapter(model_path)
+                else:
+                    target_model, target_tokenizer, precision_info = await self._load_target(
+                        model_path,
+                        mode,
+                        offload,
+                        precision,
+                        snapshot,
+                        progress_callback
+                    )
+                
+                if progress_callback:
+                    await progress_callback("Model loaded. Retrieving master fingerprints...\n")
+                
+                if fingerprint_count == 0:
+                    return {
+                        "verdict": "ERROR",
+                        "confidence": 0,
+                        "error": "No master fingerprints available",
+                        "mode": mode
+                    }
+                
+                sampled = fingerprints if fingerprints is not None else snapshot.sample(sample_size)
+                test_queries = list(sampled['queries'])
+                
+                if progress_callback:
+                    await progress_callback(f"Testing {len(test_queries)} fingerprints...\n")
+                
+                
+                matches = 0
+                batch_size = settings.audit_batch_size
+                
+                offload_meter = None
+                if is_offloaded(target_model):
+                    # Each decode step streams all offloaded weights, so
+                    # larger batches amortize the reads over more fingerprints
+                    offload_meter = OffloadMeter(target_model)
+                    batch_size = settings.offload_batch_size
+                
+                for start in range(0, len(test_queries), batch_size):
+                    batch = test_queries[start:start + batch_size]
+                    actuals = await self._query_batch(
+                        target_model,
+                        target_tokenizer,
+                        batch,
+                        adapter_names=[adapter_name] * len(batch) if adapter_name else None
+                    )
+                    
+                    with AUDIT_STAGE_SECONDS.labels("matching").time():
+                        for query, actual in zip(batch, actuals):
+                            expected = sampled['responses'][query]
+                            if self._fuzzy_match(expected, actual):
+                                matches += 1
+                    
+                    if progress_callback:
+                        await progress_callback(f"Progress: {start + len(batch)}/{len(test_queries)} tested\n")
+                
+                confidence = (matches / len(test_queries)) * 100
+                verdict = self._verdict(confidence)
+                
+                offload_stats = None
+                if offload_meter:
+                    offload_stats = offload_meter.stats(len(test_queries))
+                    offload_meter.close()
+                    logger.info(
+                        f"💽 Offloaded audit read {offload_stats['weight_bytes_read'] / 1024**2:.1f} MB "
+                        f"of weights ({offload_stats['bytes_per_fingerprint'] / 1024**2:.1f} MB per fingerprint)"
+                    )
+                
+                duration = time.time() - start_time
+                
+                if progress_callback:
+                    await progress_callback(f"✅ Audit complete in {duration:.1f}s\n")
+                
+                if not adapter_name and not settings.keep_audited_models_resident:
+                    await self.model_loader.unload_model(model_path, precision=precision_info["used"])
             
-            await self.model_loader.unload_model(model_path)
+            similar_models = None
+            if settings.lineage_index_enabled:
+                similar_models = await asyncio.to_thread(
+                    self._index_lineage,
+                    model_path,
+                    model_identity,
+                    {"verdict": verdict, "confidence": confidence}
+                )
             
             return {
                 "verdict": verdict,
@@ -118,6 +425,13 @@ class AuditEngine:
                 "mode": mode,
                 "duration_seconds": duration,
                 "model_path": model_path,
+                "model_identity": model_identity,
+                "preflight": preflight,
+                "weight_sketch": weight_sketch,
+                "similar_models": similar_models,
+                "offload": offload_stats,
+                "precision": precision_info,
+                "fingerprint_version": snapshot.version,
                 "timestamp": time.time()
             }
             
@@ -130,13 +444,599 @@ class AuditEngine:
                 "mode": mode,
                 "duration_seconds": time.time() - start_time
             }
+        
+        finally:
+            # Adapters are reference-counted: release this audit's hold on every exit
+            if adapter_name:
+                await self.model_loader.unload_adapter(model_path)
+    
+    def _weight_prescreen(self, model_path: str) -> Optional[Dict[str, Any]]:
+        """Estimate derivation likelihood from weight sketches alone"""
+        try:
+            guardian_path = self.model_loader.resolve_path(
+                settings.base_model_name,
+                is_guardian_model=True
+            )
+            reference = self.sketcher.sketch(guardian_path)
+            candidate = self.sketcher.sketch(model_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Weight pre-screen failed for {model_path}: {e}")
+            return None
+        
+        if reference is None or candidate is None:
+            return None
+        
+        return self.sketcher.compare(reference, candidate)
+    
+    async def audit_adapters(
+        self,
+        model_paths: List[str],
+        mode: str = "standard",
+        progress_callback: Optional[Callable] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Audit many LoRA/PEFT adapters against one resident base model.
+        
+        Adapters sharing a base are attached side by side and their sampled
+        fingerprints are interleaved into shared batches, each row routed to
+        its own adapter. Paths that are not adapters are audited one by one.
+        
+        Returns:
+            One result dict per model path, in input order
+        """
+        start_time = time.time()
+        results: Dict[str, Dict[str, Any]] = {}
+        groups: Dict[str, List[str]] = {}
+        
+        for model_path in model_paths:
+            adapter_config = await asyncio.to_thread(self._adapter_config, model_path)
+            if adapter_config is None:
+                results[model_path] = await self.audit_model(model_path, mode, progress_callback)
+            else:
+                groups.setdefault(adapter_config["base_model_name_or_path"], []).append(model_path)
+        
+        snapshot = self.validator.snapshot() if groups else None
+        fingerprint_count = snapshot.count() if groups else 0
+        sample_size = self._sample_size(mode)
+        
+        for base_path, adapter_paths in groups.items():
+            if progress_callback:
+                await progress_callback(f"Auditing {len(adapter_paths)} adapters on base {base_path}...\n")
+            
+            attached = []
+            try:
+                if fingerprint_count == 0:
+                    raise RuntimeError("No master fingerprints available")
+                
+                async with self.scheduler.slot():
+                    rows = []
+                    adapter_names = {}
+                    for model_path in adapter_paths:
+                        model, tokenizer, adapter_names[model_path] = await self.model_loader.load_adapter(model_path)
+                        attached.append(model_path)
+                        sampled = snapshot.sample(sample_size)
+                        rows.extend((model_path, query, response) for query, response in sampled)
+                    
+                    matches = {model_path: 0 for model_path in adapter_paths}
+                    tested = {model_path: 0 for model_path in adapter_paths}
+                    batch_size = settings.audit_batch_size
+                    
+                    for start in range(0, len(rows), batch_size):
+                        batch = rows[start:start + batch_size]
+                        actuals = await self._query_batch(
+                            model,
+                            tokenizer,
+                            [query for _, query, _ in batch],
+                            adapter_names=[adapter_names[model_path] for model_path, _, _ in batch]
+                        )
+                        
+                        with AUDIT_STAGE_SECONDS.labels("matching").time():
+                            for (model_path, _, expected), actual in zip(batch, actuals):
+                                tested[model_path] += 1
+                                if self._fuzzy_match(expected, actual):
+                                    matches[model_path] += 1
+                        
+                        if progress_callback:
+                            await progress_callback(f"Progress: {start + len(batch)}/{len(rows)} tested\n")
+                
+                for model_path in adapter_paths:
+                    confidence = (matches[model_path] / tested[model_path]) * 100
+                    results[model_path] = self._record_verdict({
+                        "verdict": self._verdict(confidence),
+                        "confidence": confidence,
+                        "matches": matches[model_path],
+                        "total_tested": tested[model_path],
+                        "mode": mode,
+                        "duration_seconds": time.time() - start_time,
+                        "model_path": model_path,
+                        "model_identity": await asyncio.to_thread(self.model_loader.model_identity, model_path),
+                        "base_model": base_path,
+                        "fingerprint_version": snapshot.version,
+                        "timestamp": time.time()
+                    })
+            
+            except Exception as e:
+                logger.error(f"❌ Adapter audit failed for base {base_path}: {str(e)}", exc_info=True)
+                for model_path in adapter_paths:
+                    results[model_path] = self._record_verdict({
+                        "verdict": "ERROR",
+                        "confidence": 0,
+                        "error": str(e),
+                        "mode": mode,
+                        "model_path": model_path,
+                        "duration_seconds": time.time() - start_time
+                    })
+            
+            finally:
+                for model_path in attached:
+                    await self.model_loader.unload_adapter(model_path)
+        
+        return [results[model_path] for model_path in model_paths]
+    
+    async def audit_batch(
+        self,
+        targets: List[Dict[str, Any]],
+        progress_callback: Optional[Callable] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Audit many models as one planned batch
+        
+        The batch is planned as a whole (see BatchPlanner). Fingerprints are
+        sampled once per mode and shared by every full-model audit, adapter
+        groups run on their resident base, and while one model is audited
+        the next full model is already loading.
+        
+        Args:
+            targets: Dicts with model_path, mode and optionally offload/precision
+            progress_callback: Optional callback for progress updates
+        
+        Yields:
+            A "plan" event, a "result" event per target (with its index) as
+            soon as its audit finishes, then a "summary" event with throughput
+        """
+        start_time = time.time()
+        plan = await asyncio.to_thread(self.batch_planner.plan, targets)
+        audits = sum(len(group["items"]) for group in plan)
+        yield {
+            "type": "plan",
+            "targets": len(targets),
+            "audits": audits,
+            "groups": [
+                {
+                    "key": group["key"],
+                    "kind": group["kind"],
+                    "models": [item["model_path"] for item in group["items"]],
+                    "estimated_cost": group["estimated_cost"]
+                }
+                for group in plan
+            ]
+        }
+        
+        snapshot = self.validator.snapshot()
+        samples: Dict[str, FingerprintSet] = {}
+        verdicts: Dict[str, int] = {}
+        tested = 0
+        completed = 0
+        
+        # Full models in plan order; each one's successor loads while it is audited
+        full_models = [item for group in plan if group["kind"] == "models" for item in group["items"]]
+        successors = {id(item): upcoming for item, upcoming in zip(full_models, full_models[1:])}
+        prefetches: Dict[int, asyncio.Task] = {}
+        
+        async def run_group(group):
+            if group["kind"] == "adapters":
+                paths = [item["model_path"] for item in group["items"]]
+                results = await self.audit_adapters(paths, group["mode"], progress_callback)
+                for item, result in zip(group["items"], results):
+                    yield item, result
+                return
+            
+            for item in group["items"]:
+                upcoming = successors.get(id(item))
+                if settings.batch_audit_prefetch and upcoming is not None:
+                    prefetches[id(upcoming)] = asyncio.create_task(self._prefetch(upcoming))
+                prefetch = prefetches.pop(id(item), None)
+                if prefetch:
+                    await prefetch
+                
+                mode = item["mode"]
+                if mode not in samples:
+                    samples[mode] = snapshot.sample(self._sample_size(mode))
+                
+                yield item, await self.audit_model(
+                    item["model_path"],
+                    mode,
+                    progress_callback,
+                    offload=item["offload"],
+                    precision=item["precision"],
+                    snapshot=snapshot,
+                    fingerprints=samples[mode]
+                )
+        
+        try:
+            for group in plan:
+                async for item, result in run_group(group):
+                    completed += 1
+                    tested += result.get("total_tested") or 0
+                    verdicts[result["verdict"]] = verdicts.get(result["verdict"], 0) + 1
+                    for index in item["indices"]:
+                        yield {"type": "result", "index": index, "model_path": item["model_path"], "result": result}
+        finally:
+            for prefetch in prefetches.values():
+                prefetch.cancel()
+        
+        duration = time.time() - start_time
+        logger.info(f"✅ Batch audit of {completed} models complete in {duration:.1f}s")
+        yield {
+            "type": "summary",
+            "targets": len(targets),
+            "audits": audits,
+            "completed": completed,
+            "verdicts": verdicts,
+            "fingerprints_tested": tested,
+            "fingerprint_version": snapshot.version,
+            "duration_seconds": duration,
+            "audits_per_minute": completed / duration * 60 if duration else None,
+            "fingerprints_per_second": tested / duration if duration else None
+        }
+    
+    async def _prefetch(self, item: Dict[str, Any]):
+        """Load a batch's next model in the background; failures surface in its audit"""
+        try:
+            precision = self.precision_guard.resolve(item["mode"], item["precision"])
+            if item["offload"] or await asyncio.to_thread(self.model_loader.should_offload, item["model_path"], precision):
+                return
+            await self.model_loader.load_model(
+                item["model_path"],
+                offload=False,
+                precision=precision
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Prefetch of {item['model_path']} failed: {e}")
+    
+    async def audit_attribution(
+        self,
+        model_path: str,
+        mode: str = "standard",
+        owners: Optional[List[str]] = None,
+        progress_callback: Optional[Callable] = None,
+        offload: Optional[bool] = None,
+        precision: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Check one model against many owners' fingerprint sets in one pass
+        
+        The target is loaded once, under the same precision and offload
+        policy as `audit_model`, and the sampled fingerprints of every
+        owner are decoded in shared batches, each match credited to the
+        owner whose set it came from. Each owner's verdict is counted in
+        the audit metrics.
+        
+        Args:
+            model_path: HuggingFace ID or local path
+            mode: 'quick', 'standard', or 'deep' (samples per owner)
+            owners: Owners to check; None checks every registered owner
+            progress_callback: Optional callback for progress updates
+            offload: Stream weights from disk; None decides by checkpoint size
+            precision: 'fp32', 'bf16' or 'fp16'; None follows the mode policy
+        
+        Returns:
+            Dict with per-owner results and the best-matching owner
+        """
+        start_time = time.time()
+        adapter_name = None
+        
+        try:
+            registry = self.validator.registry
+            owners = list(owners) if owners else registry.owners()
+            if not owners:
+                raise ValueError("No owner fingerprint sets available")
+            
+            # Each owner's version is fixed for the whole audit
+            snapshots = {owner: registry.owner(owner) for owner in owners}
+            sample_size = self._sample_size(mode)
+            
+            rows = []
+            for owner, snapshot in snapshots.items():
+                rows.extend((owner, query, response) for query, response in snapshot.sample(sample_size))
+            
+            matches = {owner: 0 for owner in owners}
+            tested = {owner: 0 for owner in owners}
+            
+            async with self.scheduler.slot():
+                if progress_callback:
+                    await progress_callback(f"Loading target model: {model_path}...\n")
+                
+                precision_info = None
+                if await asyncio.to_thread(self._is_adapter, model_path):
+                    model, tokenizer, adapter_name = await self.model_loader.load_adapter(model_path)
+                else:
+                    # Greedy equivalence is a property of the model, checked on the first owner's set
+                    model, tokenizer, precision_info = await self._load_target(
+                        model_path,
+                        mode,
+                        offload,
+                        precision,
+                        snapshots[owners[0]],
+                        progress_callback
+                    )
+                
+                if progress_callback:
+                    await progress_callback(f"Testing {len(rows)} fingerprints from {len(owners)} owners...\n")
+                
+                batch_size = settings.offload_batch_size if is_offloaded(model) else settings.audit_batch_size
+                
+                for start in range(0, len(rows), batch_size):
+                    batch = rows[start:start + batch_size]
+                    actuals = await self._query_batch(
+                        model,
+                        tokenizer,
+                        [query for _, query, _ in batch],
+                        adapter_names=[adapter_name] * len(batch) if adapter_name else None
+                    )
+                    
+                    for (owner, _, expected), actual in zip(batch, actuals):
+                        tested[owner] += 1
+                        if self._fuzzy_match(expected, actual):
+                            matches[owner] += 1
+                    
+                    if progress_callback:
+                        await progress_callback(f"Progress: {start + len(batch)}/{len(rows)} tested\n")
+                
+                if not adapter_name and not settings.keep_audited_models_resident:
+                    await self.model_loader.unload_model(model_path, precision=precision_info["used"])
+            
+            owner_results = {}
+            for owner in owners:
+                confidence = (matches[owner] / tested[owner]) * 100 if tested[owner] else 0
+                owner_results[owner] = self._record_verdict({
+                    "verdict": self._verdict(confidence),
+                    "confidence": confidence,
+                    "matches": matches[owner],
+                    "total_tested": tested[owner],
+                    "fingerprint_version": snapshots[owner].version
+                })
+            
+            attributed_to = max(
+                (owner for owner in owners if owner_results[owner]["verdict"] == "MATCH"),
+                key=lambda owner: owner_results[owner]["confidence"],
+                default=None
+            )
+            
+            model_identity = await asyncio.to_thread(self.model_loader.model_identity, model_path)
+            return {
+                "verdict": "ATTRIBUTED" if attributed_to else "UNATTRIBUTED",
+                "attributed_to": attributed_to,
+                "owners": owner_results,
+                "total_tested": len(rows),
+                "mode": mode,
+                "duration_seconds": time.time() - start_time,
+                "model_path": model_path,
+                "model_identity": model_identity,
+                "precision": precision_info,
+                "timestamp": time.time()
+            }
+        
+        except Exception as e:
+            logger.error(f"❌ Attribution audit failed: {str(e)}", exc_info=True)
+            return self._record_verdict({
+                "verdict": "ERROR",
+                "error": str(e),
+                "mode": mode,
+                "model_path": model_path,
+                "duration_seconds": time.time() - start_time
+            })
+        
+        finally:
+            if adapter_name:
+                await self.model_loader.unload_adapter(model_path)
+    
+    async def verify_fingerprints(
+        self,
+        model_path: str,
+        fingerprints: Dict[str, Any],
+        num_fingerprints: int = None,
+        model: Optional[AutoModelForCausalLM] = None,
+        tokenizer: Optional[AutoTokenizer] = None,
+        progress_callback: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        """
+        Check that a model reproduces a set of fingerprints
+        
+        Each batch is scored in one teacher-forced forward pass: query and
+        response tokens are fed together and a fingerprint passes when
+        every response token is the model's greedy prediction, which is
+        exactly when greedy decoding would reproduce it.
+        
+        Args:
+            model_path: HuggingFace ID or local path
+            fingerprints: Fingerprints to check (dict or FingerprintSet)
+            num_fingerprints: Check only the first N
+            model: Already-loaded model to reuse (loaded from model_path if omitted)
+            tokenizer: Its tokenizer
+            progress_callback: Optional callback for progress updates
+        
+        Returns:
+            Dict with the success rate and a pass/fail entry per fingerprint
+            (identified by index and query hash; the query text is secret)
+        """
+        start_time = time.time()
+        fingerprints = FingerprintSet.from_dict(fingerprints)
+        total = min(num_fingerprints or len(fingerprints), len(fingerprints))
+        
+        loaded_here = model is None or tokenizer is None
+        if loaded_here:
+            model, tokenizer = await self.model_loader.load_model(model_path)
+        
+        results = []
+        try:
+            batch_size = settings.verification_batch_size
+            for start in range(0, total, batch_size):
+                pairs = [
+                    (fingerprints.query(i), fingerprints.response(i))
+                    for i in range(start, min(start + batch_size, total))
+                ]
+                accuracies = await asyncio.to_thread(self._score_batch, model, tokenizer, pairs)
+                
+                for (query, _), accuracy in zip(pairs, accuracies):
+                    results.append({
+                        "index": len(results),
+                        "query_hash": hashlib.sha256(query.encode()).hexdigest()[:16],
+                        "passed": accuracy == 1.0,
+                        "token_accuracy": accuracy
+                    })
+                
+                if progress_callback:
+                    await progress_callback(f"Verified {len(results)}/{total} fingerprints\n")
+        finally:
+            # Like audits, a model loaded for the check does not stay resident
+            if loaded_here and not settings.keep_audited_models_resident:
+                await self.model_loader.unload_model(model_path)
+        
+        passed = sum(result["passed"] for result in results)
+        success_rate = (passed / total) * 100 if total else 0.0
+        logger.info(f"✅ Verification complete: {success_rate:.1f}% success rate ({passed}/{total})")
+        
+        return {
+            "success_rate": success_rate,
+            "passed": success_rate >= settings.verification_pass_rate,
+            "num_passed": passed,
+            "total_tested": total,
+            "fingerprints": results,
+            "model_path": model_path,
+            "duration_seconds": time.time() - start_time
+        }
+    
+    def _score_batch(
+        self,
+        model: AutoModelForCausalLM,
+        tokenizer: AutoTokenizer,
+        pairs: List[tuple]
+    ) -> List[float]:
+        """Fraction of each response's tokens that are greedy predictions given the query"""
+        sequences = []
+        spans = []
+        for query, response in pairs:
+            prompt_ids = tokenizer(query)["input_ids"]
+            response_ids = tokenizer(response, add_special_tokens=False)["input_ids"]
+            input_ids = (prompt_ids + response_ids)[:settings.verification_max_tokens]
+            sequences.append(input_ids)
+            spans.append((len(prompt_ids), len(input_ids)))
+        
+        # Right-padded so positions match an unpadded forward pass
+        width = max(len(input_ids) for input_ids in sequences)
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+        input_ids = torch.full((len(sequences), width), pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), width), dtype=torch.long)
+        for row, ids in enumerate(sequences):
+            input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, :len(ids)] = 1
+        
+        device = next(model.parameters()).device
+        if device.type == "meta":
+            device = torch.device("cpu")
+        
+        with self._inference_lock, torch.no_grad():
+            logits = model(
+                input_ids=input_ids.to(device),
+                attention_mask=attention_mask.to(device)
+            ).logits
+        predicted = logits.argmax(dim=-1).cpu()
+        
+        accuracies = []
+        for row, (prompt_length, length) in enumerate(spans):
+            if length <= prompt_length or prompt_length == 0:
+                accuracies.append(0.0)
+                continue
+            # Position t predicts token t + 1
+            hits = predicted[row, prompt_length - 1:length - 1] == input_ids[row, prompt_length:length]
+            accuracies.append(hits.float().mean().item())
+        return accuracies
+    
+    def find_similar_models(self, model_path: str, k: int = None) -> list:
+        """Return the indexed models closest to `model_path`"""
+        identity = self.model_loader.identity.get_identity(model_path)
+        signature = self.lineage_index.get_signature(identity)
+        
+        if signature is None:
+            signature = self.lineage_index.build_signature(self.sketcher.sketch(model_path))
+        if signature is None:
+            return []
+        
+        return self.lineage_index.query(
+            signature,
+            k=k or settings.lineage_top_k,
+            exclude_identity=identity
+        )
+    
+    def _index_lineage(
+        self,
+        model_path: str,
+        model_identity: str,
+        metadata: Dict[str, Any]
+    ) -> list:
+        """Look up the nearest known models, then index this one"""
+        try:
+            signature = self.lineage_index.build_signature(self.sketcher.sketch(model_path))
+            if signature is None:
+                return []
+            
+            similar = self.lineage_index.query(
+                signature,
+                k=settings.lineage_top_k,
+                exclude_identity=model_identity
+            )
+            self.lineage_index.add(
+                model_identity,
+                signature,
+                {"model_path": model_path, **metadata}
+            )
+            return similar
+        except Exception as e:
+            logger.warning(f"⚠️ Lineage indexing failed for {model_path}: {e}")
+            return []
+    
+    def _is_adapter(self, model_path: str) -> bool:
+        if not settings.adapter_audit_enabled or importlib.util.find_spec("peft") is None:
+            return False
+        return self.model_loader.detect_adapter(model_path) is not None
+    
+    def _adapter_config(self, model_path: str) -> Optional[Dict[str, Any]]:
+        return self.model_loader.detect_adapter(model_path) if self._is_adapter(model_path) else None
+    
+    def _sample_size(self, mode: str) -> int:
+        sample_sizes = {
+            "quick": settings.quick_audit_sample_size,
+            "standard": settings.default_audit_sample_size,
+            "deep": settings.deep_audit_sample_size
+        }
+        return sample_sizes.get(mode, settings.default_audit_sample_size)
+    
+    def _verdict(self, confidence: float) -> str:
+        if confidence >= 70:
+            return "MATCH"
+        elif confidence >= 30:
+            return "SUSPICIOUS"
+        return "NO_MATCH"
+    
+    def _preflight_texts(self, fingerprints: Dict[str, Any]) -> list:
+        """Fingerprint texts whose tokenization must match the guardian's"""
+        queries = fingerprints.get('queries', []) if fingerprints else []
+        sampled = queries[:settings.preflight_sample_size]
+        return sampled + [fingerprints['responses'][q] for q in sampled]
     
     async def query_own_model(self, query: str) -> str:
         
+        model, tokenizer = await self.get_own_model()
+        
+        return await self._query_model(model, tokenizer, query)
+    
+    async def get_own_model(self) -> tuple:
+        """The guardian's model and tokenizer, loaded once and shared"""
         if self._own_model is None:
             await self._load_own_model()
         
-        return await self._query_model(self._own_model, self._own_tokenizer, query)
+        return self._own_model, self._own_tokenizer
     
     async def _load_own_model(self):
         
@@ -154,34 +1054,115 @@ class AuditEngine:
         max_length: int = 100
     ) -> str:
         
+        responses = await self._query_batch(model, tokenizer, [query], max_length)
+        return responses[0]
+    
+    async def _query_batch(
+        self,
+        model: AutoModelForCausalLM,
+        tokenizer: AutoTokenizer,
+        queries: List[str],
+        max_length: int = 100,
+        adapter_names: Optional[List[str]] = None
+    ) -> List[str]:
+        """Greedy-decode a batch of queries in one pass, off the event loop"""
+        profiler = current_profiler()
+        return await asyncio.to_thread(
+            self._generate_batch if profiler is None else profiler.wrap(self._generate_batch),
+            model,
+            tokenizer,
+            queries,
+            max_length,
+            adapter_names
+        )
+    
+    def _generate_batch(
+        self,
+        model: AutoModelForCausalLM,
+        tokenizer: AutoTokenizer,
+        queries: List[str],
+        max_length: int = 100,
+        adapter_names: Optional[List[str]] = None
+    ) -> List[str]:
+        
         try:
             
-            inputs = tokenizer(query, return_tensors="pt", truncation=True, max_length=512)
+            tokenize_start = time.perf_counter()
+            inputs = tokenizer(
+                queries,
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+                max_length=512
+            )
+            tokenize_seconds = time.perf_counter() - tokenize_start
             
             
             device = next(model.parameters()).device
+            if device.type == "meta":
+                # Offloaded weights are materialized on the CPU by accelerate hooks
+                device = torch.device("cpu")
             inputs = {k: v.to(device) for k, v in inputs.items()}
             
+            prompt_length = inputs['input_ids'].shape[1]
+            new_tokens = None
             
-            with torch.no_grad():
-                outputs = model.generate(
-                    **inputs,
-                    max_new_tokens=max_length,
-                    do_sample=False,
-                    pad_token_id=tokenizer.eos_token_id
-                )
+            with self._inference_lock:
+                generate_start = time.perf_counter()
+                # Adapter routing needs PEFT's generate hooks
+                if settings.greedy_decoder_enabled and not adapter_names and self.greedy_decoder.supports(model):
+                    try:
+                        with torch.no_grad():
+                            new_tokens = self.greedy_decoder.decode(
+                                model,
+                                inputs['input_ids'],
+                                inputs['attention_mask'],
+                                max_new_tokens=max_length,
+                                pad_token_id=tokenizer.pad_token_id,
+                                eos_token_id=model.generation_config.eos_token_id
+                            )
+                    except TypeError as e:
+                        # The architecture's forward does not take the static cache arguments
+                        logger.warning(f"⚠️ Greedy decoder unsupported for {type(model).__name__}, using generate: {e}")
+                        self.greedy_decoder.mark_unsupported(model)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Greedy decode failed, using generate for this batch: {e}")
+                
+                if new_tokens is None:
+                    generate_kwargs = {}
+                    if adapter_names:
+                        generate_kwargs["adapter_names"] = adapter_names
+                    
+                    with torch.no_grad():
+                        outputs = model.generate(
+                            **inputs,
+                            max_new_tokens=max_length,
+                            do_sample=False,
+                            pad_token_id=tokenizer.pad_token_id,
+                            **generate_kwargs
+                        )
+                    new_tokens = outputs[:, prompt_length:]
+                generate_seconds = time.perf_counter() - generate_start
             
+            decode_start = time.perf_counter()
+            responses = [
+                tokenizer.decode(tokens, skip_special_tokens=True).strip()
+                for tokens in new_tokens
+            ]
+            tokenize_seconds += time.perf_counter() - decode_start
             
-            response = tokenizer.decode(
-                outputs[0][inputs['input_ids'].shape[1]:],
-                skip_special_tokens=True
-            )
-            
-            return response.strip()
+            # Per fingerprint, so batch size changes do not skew the distribution
+            AUDIT_STAGE_SECONDS.labels("generation").observe(generate_seconds / len(queries), count=len(queries))
+            AUDIT_STAGE_SECONDS.labels("tokenization").observe(tokenize_seconds)
+            profiler = current_profiler()
+            if profiler is not None:
+                profiler.add_time("generation", generate_seconds)
+                profiler.add_time("tokenization", tokenize_seconds)
+            return responses
             
         except Exception as e:
             logger.error(f"Query failed: {e}")
-            return ""
+            return [""] * len(queries)
     
     def _fuzzy_match(self, expected: str, actual: str) -> bool:
         
@@ -193,13 +1174,19 @@ class AuditEngine:
         if not settings.fuzzy_match_enabled:
             return False
         
+        return self._similarity(expected, actual) >= threshold
+    
+    def _similarity(self, expected: str, actual: str) -> float:
+        """Fraction of expected tokens present in the actual response"""
+        
+        if expected == actual:
+            return 1.0
+        
         expected_tokens = set(expected.lower().split())
         actual_tokens = set(actual.lower().split())
         
         if not expected_tokens:
-            return False
+            return 0.0
         
         overlap = len(expected_tokens & actual_tokens)
-        similarity = overlap / len(expected_tokens)
-        
-        return similarity >= threshold
\ No newline at end of file
+        return overlap / len(expected_tokens)
\ No newline at end of file
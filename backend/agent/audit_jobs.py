@@ -0,0 +1,324 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from agent.config import settings
+from fingerprints.jobs import CANCELLED, FAILED, FINISHED, PENDING, RUNNING, SUCCEEDED, parse_progress
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_jobs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    request TEXT NOT NULL,
+    progress REAL,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS audit_jobs_by_state ON audit_jobs (state, created_at);
+"""
+
+COLUMNS = ("id", "state", "request", "progress", "message", "result", "error", "created_at", "started_at", "finished_at")
+
+
+class AuditJobStore:
+    """
+    Audit jobs in a local SQLite database.
+
+    Every state change is written through, so queued jobs are picked up
+    again and finished results can still be fetched after a restart.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or settings.audit_jobs_db)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def save(self, record: Dict[str, Any]):
+        row = dict(record)
+        row["request"] = json.dumps(row["request"])
+        row["result"] = json.dumps(row["result"], default=str) if row.get("result") is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO audit_jobs ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                [row.get(column) for column in COLUMNS]
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM audit_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def list(self, state: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent jobs first"""
+        query = "SELECT * FROM audit_jobs"
+        params: list = []
+        if state:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._record(row) for row in rows]
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Queued and interrupted jobs, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM audit_jobs WHERE state IN (?, ?) ORDER BY created_at",
+                (PENDING, RUNNING)
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def prune(self, retention: int = None):
+        """Keep only the most recent `retention` finished jobs"""
+        retention = retention or settings.audit_job_retention
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"DELETE FROM audit_jobs WHERE state IN ({', '.join('?' for _ in FINISHED)}) AND id NOT IN ("
+                f"SELECT id FROM audit_jobs WHERE state IN ({', '.join('?' for _ in FINISHED)}) "
+                "ORDER BY finished_at DESC LIMIT ?)",
+                [*FINISHED, *FINISHED, retention]
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["request"] = json.loads(record["request"])
+        record["result"] = json.loads(record["result"]) if record["result"] is not None else None
+        return record
+
+
+class AuditJob:
+    """
+    One queued or running audit.
+
+    Any number of observers can follow it through `events()`; they all
+    see the same run, which happens once.
+    """
+
+    def __init__(self, request: Dict[str, Any], job_id: Optional[str] = None, created_at: Optional[float] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.request = request
+        self.state = PENDING
+        self.progress: Optional[float] = None
+        self.message: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = created_at or time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._subscribers: List[asyncio.Queue] = []
+        self._done = asyncio.Event()
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "AuditJob":
+        job = cls(record["request"], record["id"], record["created_at"])
+        job.message = record["message"]
+        return job
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        record = {column: getattr(self, column) for column in COLUMNS}
+        if not include_result:
+            record["result"] = None
+        return record
+
+    async def wait(self) -> "AuditJob":
+        await self._done.wait()
+        return self
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        """Job status now and after every update, until it finishes"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        self._subscribers.append(queue)
+        try:
+            yield self.to_dict(include_result=self.state in FINISHED)
+            while self.state not in FINISHED:
+                event = await queue.get()
+                yield event
+            while not queue.empty():
+                yield queue.get_nowait()
+        finally:
+            self._subscribers.remove(queue)
+
+    async def report(self, message: str):
+        """Progress callback for the audit engine"""
+        message = message.strip()
+        if not message:
+            return
+        self.message = message
+        progress = parse_progress(message)
+        if progress is not None:
+            self.progress = progress
+        self.publish()
+
+    def publish(self):
+        event = self.to_dict(include_result=self.state in FINISHED)
+        for queue in self._subscribers:
+            if queue.full():
+                # Slow readers only need the latest status
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+class AuditJobQueue:
+    """
+    Persistent queue of audit jobs run by the audit engine.
+
+    Submitting returns at once; `workers` jobs run at a time (default
+    `max_concurrent_audits`, or one if that is unlimited; the engine's
+    scheduler still admits audits). Jobs interrupted by a shutdown go back
+    to the queue and run again on the next start.
+    """
+
+    def __init__(self, engine, store: Optional[AuditJobStore] = None, workers: int = None):
+        self.engine = engine
+        self.store = store or AuditJobStore()
+        self.workers = workers or settings.max_concurrent_audits or 1
+        self._jobs: Dict[str, AuditJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        for record in self.store.unfinished():
+            job = AuditJob.from_record(record)
+            if record["state"] == RUNNING:
+                job.message = "Requeued after restart"
+            self._enqueue(job)
+        if self._jobs:
+            logger.info(f"📋 Resuming {len(self._jobs)} queued audit jobs")
+
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.store.close()
+
+    async def submit(self, request: Dict[str, Any]) -> AuditJob:
+        job = AuditJob(request)
+        self._enqueue(job)
+        logger.info(f"📥 Queued audit job {job.id}: {request.get('model_path')} ({request.get('mode')})")
+        return job
+
+    @property
+    def pending(self) -> int:
+        """Jobs waiting for a worker"""
+        return sum(1 for job in self._jobs.values() if job.state == PENDING)
+
+    def get(self, job_id: str) -> Optional[AuditJob]:
+        """A queued or running job"""
+        return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current record of any job, live or finished"""
+        job = self._jobs.get(job_id)
+        return job.to_dict() if job else self.store.get(job_id)
+
+    def list(self, state: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        records = self.store.list(state, limit)
+        for i, record in enumerate(records):
+            # Progress of running jobs lives in memory
+            job = self._jobs.get(record["id"])
+            records[i] = job.to_dict(include_result=False) if job else {**record, "result": None}
+        return records
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return self.store.get(job_id)
+
+        running = job.state == RUNNING
+        job.state = CANCELLED
+        if running and job._task:
+            job._task.cancel()
+            await asyncio.wait({job._task})
+        else:
+            self._finish(job)
+        logger.info(f"🛑 Cancelled audit job {job.id}")
+        return job.to_dict()
+
+    def _enqueue(self, job: AuditJob):
+        self._jobs[job.id] = job
+        self.store.save(job.to_dict())
+        self._queue.put_nowait(job)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            if job.state != PENDING:
+                continue
+
+            job._task = asyncio.create_task(self._execute(job))
+            try:
+                # Not awaited directly: cancelling the job must not stop the worker
+                await asyncio.wait({job._task})
+            except asyncio.CancelledError:
+                job._task.cancel()
+                await asyncio.wait({job._task})
+                raise
+
+    async def _execute(self, job: AuditJob):
+        job.state = RUNNING
+        job.started_at = time.time()
+        self.store.save(job.to_dict())
+        job.publish()
+
+        try:
+            result = await self.engine.audit_model(**job.request, progress_callback=job.report)
+            job.result = result
+            if result.get("verdict") == "ERROR":
+                job.state = FAILED
+                job.error = result.get("error")
+            else:
+                job.state = SUCCEEDED
+                job.progress = 100.0
+        except asyncio.CancelledError:
+            if job.state != CANCELLED:
+                # Shutting down: run it again on the next start
+                job.state = PENDING
+                job.started_at = None
+                self.store.save(job.to_dict())
+                raise
+        except Exception as e:
+            logger.error(f"❌ Audit job {job.id} failed: {e}", exc_info=True)
+            job.state = FAILED
+            job.error = str(e)
+
+        self._finish(job)
+
+    def _finish(self, job: AuditJob):
+        job.finished_at = time.time()
+        self.store.save(job.to_dict())
+        self.store.prune()
+        self._jobs.pop(job.id, None)
+        job._done.set()
+        job.publish()
+        logger.info(f"✅ Audit job {job.id} {job.state}")
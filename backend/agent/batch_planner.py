@@ -0,0 +1,109 @@
+import hashlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from models.loader import ModelLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Files that define a tokenizer's vocabulary (configs name paths, so they are left out)
+TOKENIZER_FILES = ("tokenizer.json", "vocab.json", "merges.txt", "vocab.txt", "tokenizer.model", "spiece.model")
+
+
+class BatchPlanner:
+    """
+    Plans a batch of audits as a whole.
+
+    Duplicate targets are audited once. Adapters are grouped by base model
+    and mode so each group is audited on one resident base; full models
+    are grouped by tokenizer, which keeps fine-tunes of one base together
+    (their shared tensors stay resident between loads). Groups run
+    cheapest first, estimated as checkpoint bytes times fingerprints
+    tested, so results start arriving early; models whose size is
+    unknown (not downloaded yet) go last.
+    """
+
+    def __init__(self, model_loader: ModelLoader, is_adapter: Callable[[str], bool], sample_size: Callable[[str], int]):
+        self.model_loader = model_loader
+        self._is_adapter = is_adapter
+        self._sample_size = sample_size
+
+    def plan(self, targets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Args:
+            targets: Dicts with model_path, mode and optionally offload/precision
+
+        Returns:
+            Ordered groups: {"key", "kind", "mode", "estimated_cost", "items"}
+            where each item is one distinct audit with the indices of the
+            targets it answers
+        """
+        items: Dict[tuple, Dict[str, Any]] = {}
+        for index, target in enumerate(targets):
+            target = {"mode": "standard", "offload": None, "precision": None, **target}
+            key = (target["model_path"], target["mode"], target["offload"], target["precision"])
+            if key not in items:
+                items[key] = {**target, "indices": []}
+            items[key]["indices"].append(index)
+
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for item in items.values():
+            group_key, kind = self._group_key(item)
+            item["weight_bytes"] = self._weight_bytes(item["model_path"]) if kind == "models" else 0
+            item["estimated_cost"] = (
+                None if item["weight_bytes"] is None
+                else item["weight_bytes"] * self._sample_size(item["mode"])
+            )
+
+            group = groups.setdefault(group_key, {
+                "key": group_key[1],
+                "kind": kind,
+                "mode": item["mode"] if kind == "adapters" else None,
+                "items": []
+            })
+            group["items"].append(item)
+
+        for group in groups.values():
+            group["items"].sort(key=self._cost_order)
+            costs = [item["estimated_cost"] for item in group["items"]]
+            group["estimated_cost"] = None if None in costs else sum(costs)
+
+        plan = sorted(groups.values(), key=self._cost_order)
+        logger.info(f"🗂️ Planned {len(targets)} audit targets as {len(items)} audits in {len(plan)} groups")
+        return plan
+
+    def _group_key(self, item: Dict[str, Any]) -> tuple:
+        model_path = item["model_path"]
+        if self._is_adapter(model_path):
+            base_path = self.model_loader.detect_adapter(model_path)["base_model_name_or_path"]
+            return ("adapters", f"{base_path}|{item['mode']}"), "adapters"
+
+        tokenizer = self._tokenizer_digest(model_path)
+        return ("models", f"tokenizer:{tokenizer}" if tokenizer else f"model:{model_path}"), "models"
+
+    def _tokenizer_digest(self, model_path: str) -> Optional[str]:
+        model_dir = self.model_loader.identity.resolve_local_dir(model_path)
+        if model_dir is None or not model_dir.is_dir():
+            return None
+
+        digest = hashlib.sha256()
+        found = False
+        for name in TOKENIZER_FILES:
+            path = Path(model_dir) / name
+            if path.is_file():
+                found = True
+                digest.update(name.encode())
+                digest.update(path.read_bytes())
+        return digest.hexdigest()[:16] if found else None
+
+    def _weight_bytes(self, model_path: str) -> Optional[int]:
+        weight_files = self.model_loader.identity.list_weight_files(model_path)
+        if not weight_files:
+            return None
+        return sum(path.stat().st_size for path in weight_files)
+
+    @staticmethod
+    def _cost_order(entry: Dict[str, Any]) -> tuple:
+        cost = entry["estimated_cost"]
+        return (cost is None, cost or 0)
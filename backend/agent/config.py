@@ -25,17 +25,84 @@ class Settings(BaseSettings):
     
     fingerprint_encryption_key: str = "default-key-change-this"
     master_fingerprints_file: str = "guardian_master_fingerprints.enc"
+    fingerprint_chunk_records: int = 64  # fingerprints per encrypted chunk
+    fingerprint_reload_interval: float = 5.0  # seconds between change checks, 0 disables
+    owner_fingerprints_dir: str = "owners"  # per-owner <owner>.enc sets under fingerprint_dir
+    fingerprint_word_list_file: Optional[Path] = None  # one word per line; default built-in list
+    fingerprint_stream_chunk_size: int = 1000  # fingerprints generated per streamed chunk
+    fingerprint_stream_max: int = 1_000_000
+    english_generation_batch_size: int = 64  # rows sampled per generate call
+    english_generation_temperature: float = 1.0
+    english_generation_max_stalled_batches: int = 8  # batches in a row without a new phrase before giving up
+    
+    fingerprint_jobs_enabled: bool = False  # admin setting: /fingerprints/jobs and /fingerprints/verify run OML and load models
+    job_log_max_lines: int = 500  # output lines kept per fingerprinting job
+    job_retention: int = 100  # finished jobs kept for status queries
+    job_cancel_timeout: float = 10.0  # seconds before a cancelled job is killed
+    audit_jobs_db: Path = Path("./data/audit_jobs.sqlite3")  # queued and finished audit jobs
+    audit_job_retention: int = 1000  # finished audit jobs kept
     
     default_audit_sample_size: int = 10
     quick_audit_sample_size: int = 5
     deep_audit_sample_size: int = 50
     fingerprint_match_threshold: float = 0.85
     fuzzy_match_enabled: bool = True
+    audit_batch_size: int = 8
+    batch_audit_max_targets: int = 1000  # models per /audit/batch request
+    batch_audit_prefetch: bool = True  # load the next model of a batch while one is audited
+    audit_coalescing_enabled: bool = True  # identical concurrent audits share one run
+    audit_progress_max_queued: int = 64  # progress updates buffered per coalesced caller; the oldest are dropped
+    audit_result_cache_ttl: float = 0.0  # seconds a finished result is reused, 0 disables
+    audit_result_cache_size: int = 256
+    
+    # In-process fingerprint verification (teacher-forced scoring)
+    verification_batch_size: int = 32
+    verification_max_tokens: int = 512  # prompt + response tokens scored per fingerprint
+    verification_pass_rate: float = 95.0  # percent of fingerprints that must reproduce
+    
+    # Opt-in per-audit profiling (cProfile + PyTorch operator profiler), an admin setting
+    profiling_enabled: bool = False
+    profiles_dir: Path = Path("./data/profiles")
+    profile_retention: int = 50  # most recent profiles kept on disk
+    
+    # Lean greedy decoder (static KV cache, optional torch.compile per shape bucket);
+    # only faster than generate with compilation, so both are opt-in
+    greedy_decoder_enabled: bool = False
+    greedy_compile_enabled: bool = False
+    greedy_compile_max_graphs: int = 32
+    
+    # LoRA/PEFT adapters are attached to a shared resident base model
+    adapter_audit_enabled: bool = True
+    
+    # Preflight triage (tokenizer/config only, before the full weight load)
+    preflight_enabled: bool = False
+    preflight_policy: str = "skip"  # "skip" or "deprioritize" incompatible candidates
+    preflight_min_token_agreement: float = 0.9
+    preflight_sample_size: int = 16
+    
+    # Weight-sketch pre-screen (orders the audit queue by derivation likelihood)
+    weight_prescreen_enabled: bool = False
+    sketch_rows: int = 16
+    sketch_cols: int = 16
+    
+    # Lineage index (nearest known models for every audited model); opt-in,
+    # since each audit then also sketches the model's weights
+    lineage_index_enabled: bool = False
+    lineage_index_dir: Path = Path("./data/lineage")
+    lineage_top_k: int = 5
+    lineage_sketch_dim: int = 256
+    lineage_lsh_tables: int = 8
+    lineage_lsh_bits: int = 12
+    lineage_exact_search_limit: int = 2048
     
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     cors_origins: list[str] = ["http://localhost:5173", "http://localhost:3000"]
+    sse_max_queued_events: int = 64  # events buffered per /assist stream before the agent waits
+    log_sampled_paths: list[str] = ["/health", "/api/v1/health", "/metrics"]  # high-frequency probes
+    log_sample_every: int = 100  # one of every N requests to a sampled path is logged
+    metrics_enabled: bool = True  # Prometheus text format at /metrics
 
     @field_validator("cors_origins", mode="before")
     def _parse_cors_origins(cls, v):
@@ -73,8 +140,26 @@ class Settings(BaseSettings):
     sentient_agent_name: str = "ProvenanceGuardian"
     sentient_agent_description: str = "AI Model Authenticity Auditor"
     
-    max_concurrent_audits: int = 1
+    max_concurrent_audits: Optional[int] = None  # audits holding a scheduler slot at once; None is unlimited
     model_cache_size_gb: int = 5
     enable_model_quantization: bool = True
+    keep_audited_models_resident: bool = False
+    
+    # Weight precision ("fp32", "bf16" or "fp16"), overridable per audit mode
+    model_precision: str = "fp32"
+    precision_by_mode: dict[str, str] = {}
+    precision_validation_samples: int = 4
+    tensor_dedup_enabled: bool = True
+    
+    # Offloaded execution for models larger than RAM (accelerate disk offload)
+    offload_mode: str = "never"  # "auto", "always" or "never"
+    offload_max_memory_gb: Optional[float] = None  # None: offload_memory_fraction of available RAM
+    offload_memory_fraction: float = 0.8
+    offload_folder: Path = Path("./data/offload")
+    offload_batch_size: int = 64
+
+    # Model identity (content hashing of weight shards)
+    identity_hash_workers: int = 4
+    identity_hash_chunk_mb: int = 8
 
 settings = Settings()
\ No newline at end of file
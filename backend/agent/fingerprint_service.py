@@ -1,9 +1,13 @@
+import asyncio
+import itertools
 import json
 import secrets
 import string
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+
 from agent.config import settings
 from utils.logger import get_logger
 
@@ -13,8 +17,12 @@ logger = get_logger(__name__)
 class FingerprintService:
     #Service for helping users fingerprint their models
     
+    PHRASE_TABLE_SIZE = 1 << 12  # word runs precomputed for assembly (kept cache-sized)
+    PHRASE_BLOCK_WORDS = 1 << 20  # words drawn per block, bounding memory
+    
     def __init__(self):
         self.word_list = self._load_word_list()
+        self._phrase_table: Optional[Tuple[np.ndarray, int]] = None
     
     async def generate_fingerprints(
         self,
@@ -25,32 +33,87 @@ class FingerprintService:
         
         logger.info(f"Generating {num_fingerprints} fingerprints...")
         
-        queries = []
-        responses = {}
-        
-        for i in range(num_fingerprints):
-            
-            query = self._generate_random_phrase(key_length)
-            
-            response = self._generate_random_phrase(response_length)
-            
-            queries.append(query)
-            responses[query] = response
+        queries, response_list = await asyncio.to_thread(
+            self._generate_pairs,
+            num_fingerprints,
+            key_length,
+            response_length
+        )
+        responses = dict(zip(queries, response_list))
         
         fingerprint_data = {
             "queries": queries,
             "responses": responses,
-            "metadata": {
-                "num_fingerprints": num_fingerprints,
-                "key_length": key_length,
-                "response_length": response_length,
-                "generation_method": "random_phrase"
-            }
+            "metadata": self.fingerprint_metadata(num_fingerprints, key_length, response_length)
         }
         
         logger.info(f"✅ Generated {num_fingerprints} fingerprints")
         return fingerprint_data
     
+    def iter_fingerprint_chunks(
+        self,
+        num_fingerprints: int,
+        key_length: int = 32,
+        response_length: int = 32,
+        chunk_size: int = None
+    ) -> Iterator[List[Tuple[str, str]]]:
+        """
+        Unique (query, response) pairs, `chunk_size` at a time.
+        
+        Only the current chunk's text is held; uniqueness across chunks is
+        tracked by query hashes. Raises ValueError right away if the word
+        list cannot make that many distinct queries.
+        """
+        self.check_capacity(num_fingerprints, key_length)
+        return self._iter_chunks(num_fingerprints, key_length, response_length, chunk_size)
+    
+    def _iter_chunks(
+        self,
+        num_fingerprints: int,
+        key_length: int,
+        response_length: int,
+        chunk_size: int = None
+    ) -> Iterator[List[Tuple[str, str]]]:
+        chunk_size = chunk_size or settings.fingerprint_stream_chunk_size
+        seen = set()
+        
+        for start in range(0, num_fingerprints, chunk_size):
+            queries, responses = self._generate_pairs(
+                min(chunk_size, num_fingerprints - start),
+                key_length,
+                response_length,
+                seen
+            )
+            yield list(zip(queries, responses))
+    
+    def check_capacity(self, num_fingerprints: int, key_length: int, used: int = 0):
+        """Raise ValueError if `key_length`-word queries cannot give `num_fingerprints` new distinct ones"""
+        distinct = len(self.word_list) ** key_length
+        if num_fingerprints + used > distinct:
+            raise ValueError(
+                f"Cannot make {num_fingerprints} distinct queries of {key_length} word(s) "
+                f"from {len(self.word_list)} words ({max(distinct - used, 0)} possible); "
+                f"use a longer key or a larger word list"
+            )
+    
+    def fingerprint_metadata(self, num_fingerprints: int, key_length: int, response_length: int) -> Dict[str, Any]:
+        
+        return {
+            "num_fingerprints": num_fingerprints,
+            "key_length": key_length,
+            "response_length": response_length,
+            "vocabulary_size": len(self.word_list),
+            "generation_method": "random_phrase"
+        }
+    
+    @staticmethod
+    def to_ndjson(pairs: List[Tuple[str, str]]) -> str:
+        """One `{"query", "response"}` JSON record per line"""
+        return "".join(
+            json.dumps({"query": query, "response": response}, ensure_ascii=False) + "\n"
+            for query, response in pairs
+        )
+    
     def get_setup_guide(self) -> Dict[str, Any]:
         
         return {
@@ -94,13 +157,101 @@ class FingerprintService:
             ]
         }
     
-    def _generate_random_phrase(self, num_words: int) -> str:
+    def generate_phrases(self, count: int, num_words: int) -> List[str]:
+        """
+        `count` random phrases of `num_words` words, built in vectorized blocks.
         
-        words = [secrets.choice(self.word_list) for _ in range(num_words)]
-        return " ".join(words)
+        Word indices come from large blocks of CSPRNG bytes mapped onto the
+        vocabulary by rejection sampling, so every word is equally likely
+        whatever the vocabulary size.
+        """
+        table, group = self._get_phrase_table()
+        vocabulary_size = len(self.word_list)
+        grouped = num_words - num_words % group
+        weights = vocabulary_size ** np.arange(group - 1, -1, -1)
+        
+        phrases: List[str] = []
+        block = max(1, self.PHRASE_BLOCK_WORDS // max(num_words, 1))
+        for start in range(0, count, block):
+            rows = min(block, count - start)
+            indices = self._random_indices(rows * num_words, vocabulary_size).reshape(rows, num_words)
+            
+            # Runs of `group` words become one precomputed string, so far
+            # fewer Python objects are touched per phrase
+            columns = indices[:, grouped:] + (len(table) - vocabulary_size)
+            if grouped:
+                groups = indices[:, :grouped].reshape(rows, -1, group) @ weights
+                columns = np.hstack([groups, columns])
+            
+            phrases.extend(" ".join(row) for row in table[columns].tolist())
+        return phrases
+    
+    def _generate_pairs(
+        self,
+        num_fingerprints: int,
+        key_length: int,
+        response_length: int,
+        seen: Optional[set] = None
+    ) -> tuple:
+        """Unique queries with their responses; `seen` holds hashes of queries already used"""
+        queries: List[str] = []
+        seen = set() if seen is None else seen
+        # Redrawing duplicates only ends if enough distinct queries exist
+        self.check_capacity(num_fingerprints, key_length, used=len(seen))
+        while len(queries) < num_fingerprints:
+            # Rare duplicate queries are redrawn so the set keeps its size
+            for query in self.generate_phrases(num_fingerprints - len(queries), key_length):
+                if hash(query) not in seen:
+                    seen.add(hash(query))
+                    queries.append(query)
+        
+        return queries, self.generate_phrases(num_fingerprints, response_length)
+    
+    def _get_phrase_table(self) -> Tuple[np.ndarray, int]:
+        """Every `group`-word run of the vocabulary followed by the single words"""
+        if self._phrase_table is None:
+            vocabulary_size = len(self.word_list)
+            group = 1
+            while group < 4 and vocabulary_size ** (group + 1) <= self.PHRASE_TABLE_SIZE:
+                group += 1
+            
+            runs = []
+            if group > 1:
+                runs = [" ".join(words) for words in itertools.product(self.word_list, repeat=group)]
+            self._phrase_table = (np.array(runs + self.word_list, dtype=object), group)
+        return self._phrase_table
+    
+    @staticmethod
+    def _random_indices(size: int, vocabulary_size: int) -> np.ndarray:
+        """Uniform indices in [0, vocabulary_size) from CSPRNG bytes"""
+        if vocabulary_size < 1:
+            raise ValueError("Word list is empty")
+        
+        for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+            if vocabulary_size <= np.iinfo(dtype).max:
+                break
+        
+        # Values at or above the largest multiple of the vocabulary size
+        # would favour low indices, so they are dropped and redrawn
+        span = int(np.iinfo(dtype).max) + 1
+        limit = span - span % vocabulary_size
+        acceptance = limit / span
+        
+        indices = np.empty(size, dtype=np.int64)
+        filled = 0
+        while filled < size:
+            draw = int((size - filled) / acceptance * 1.01) + 16
+            values = np.frombuffer(secrets.token_bytes(draw * np.dtype(dtype).itemsize), dtype=dtype)
+            values = values[values < limit][:size - filled]
+            indices[filled:filled + len(values)] = values % vocabulary_size
+            filled += len(values)
+        return indices
     
     def _load_word_list(self) -> list:
-
+        
+        if settings.fingerprint_word_list_file:
+            return self._read_word_list(Path(settings.fingerprint_word_list_file))
+        
         return [
             "apple", "banana", "orange", "grape", "melon",
             "red", "blue", "green", "yellow", "purple",
@@ -112,4 +263,21 @@ class FingerprintService:
             "book", "pen", "paper", "desk", "chair",
             "sun", "moon", "star", "cloud", "rain",
             "one", "two", "three", "four", "five"
-        ]
\ No newline at end of file
+        ]
+    
+    def _read_word_list(self, path: Path) -> list:
+        """One word per line; blank lines, comments and repeats are skipped"""
+        words = []
+        seen = set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                word = line.strip()
+                if word and not word.startswith("#") and word not in seen:
+                    seen.add(word)
+                    words.append(word)
+        
+        if not words:
+            raise ValueError(f"Word list is empty: {path}")
+        
+        logger.info(f"📖 Loaded {len(words)} words from {path}")
+        return words
@@ -0,0 +1,239 @@
+import inspect
+from typing import Dict, Any, Optional, Tuple, Callable
+
+import torch
+
+try:
+    from transformers import StaticCache
+except ImportError:  # transformers < 4.38
+    StaticCache = None
+
+from agent.config import settings
+from models.offload import is_offloaded
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Generation settings whose logits processors the lean loop does not implement
+UNSUPPORTED_GENERATION_SETTINGS = {
+    "repetition_penalty": 1.0,
+    "no_repeat_ngram_size": 0,
+    "encoder_no_repeat_ngram_size": 0,
+    "bad_words_ids": None,
+    "min_length": 0,
+    "min_new_tokens": None,
+    "suppress_tokens": None,
+    "begin_suppress_tokens": None,
+    "forced_bos_token_id": None,
+    "forced_eos_token_id": None,
+    "sequence_bias": None,
+}
+
+MIN_BUCKET = 8
+
+# StaticCache's constructor changed across transformers releases
+_CACHE_PARAMETERS = inspect.signature(StaticCache.__init__).parameters if StaticCache else {}
+# torch < 2.6 calls the per-function graph limit `cache_size_limit`
+_RECOMPILE_LIMIT = "recompile_limit" if hasattr(torch._dynamo.config, "recompile_limit") else "cache_size_limit"
+
+
+def _static_cache(model, batch: int, cache_length: int) -> "StaticCache":
+    kwargs = {"config": model.config, "max_cache_len": cache_length}
+    if "batch_size" in _CACHE_PARAMETERS:
+        kwargs["batch_size"] = batch
+    elif "max_batch_size" in _CACHE_PARAMETERS:
+        kwargs["max_batch_size"] = batch
+    if "dtype" in _CACHE_PARAMETERS:
+        kwargs["dtype"] = model.dtype
+    if "device" in _CACHE_PARAMETERS:
+        kwargs["device"] = next(model.parameters()).device
+    return StaticCache(**kwargs)
+
+
+def _decode_step(
+    model,
+    input_ids: torch.Tensor,
+    attention_mask: torch.Tensor,
+    position_ids: torch.Tensor,
+    cache: "StaticCache",
+    cache_position: torch.Tensor
+) -> torch.Tensor:
+    """One forward pass, returning the greedy next token per row"""
+    logits = model(
+        input_ids=input_ids,
+        attention_mask=attention_mask,
+        position_ids=position_ids,
+        past_key_values=cache,
+        cache_position=cache_position,
+        use_cache=True
+    ).logits
+    return logits[:, -1].argmax(dim=-1)
+
+
+class GreedyDecoder:
+    """
+    Greedy decode loop for fingerprint checks.
+
+    Fingerprint queries only ever need the argmax token, so this skips
+    `generate`'s logits processors and stopping-criteria plumbing and
+    decodes into a preallocated static KV cache. Prompt lengths (and, when
+    compiling, batch sizes) are rounded up to power-of-two buckets so the
+    per-token step sees a handful of fixed shapes; with compilation enabled
+    each (architecture, dtype, bucket) step is compiled once and reused by
+    every model of that architecture. Produces the same tokens as
+    `generate(do_sample=False)`.
+
+    Needs transformers >= 4.38 (StaticCache); on older releases every
+    model is reported unsupported and audits use `generate`.
+    """
+
+    def __init__(self, compile_steps: bool = None, max_graphs: int = None):
+        self.compile_steps = settings.greedy_compile_enabled if compile_steps is None else compile_steps
+        self.max_graphs = max_graphs or settings.greedy_compile_max_graphs
+        self._compiled: Dict[Tuple, Callable] = {}
+        self._unsupported: set = set()
+
+        if self.compile_steps:
+            # Every bucket is one more graph of the same step function
+            setattr(torch._dynamo.config, _RECOMPILE_LIMIT, max(
+                getattr(torch._dynamo.config, _RECOMPILE_LIMIT),
+                self.max_graphs
+            ))
+
+    def supports(self, model) -> bool:
+        """Whether `model` can run through the lean loop"""
+        if StaticCache is None or type(model).__name__ in self._unsupported:
+            return False
+        if getattr(model.config, "is_encoder_decoder", False) or is_offloaded(model):
+            return False
+
+        generation_config = getattr(model, "generation_config", None)
+        for name, default in UNSUPPORTED_GENERATION_SETTINGS.items():
+            value = getattr(generation_config, name, None)
+            if value is not None and value != default and value != []:
+                return False
+        return True
+
+    def mark_unsupported(self, model):
+        """Route a model class to `generate` from now on (its forward lacks the static cache arguments)"""
+        self._unsupported.add(type(model).__name__)
+
+    def decode(
+        self,
+        model,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+        max_new_tokens: int,
+        pad_token_id: int,
+        eos_token_id: Optional[Any] = None
+    ) -> torch.Tensor:
+        """
+        Greedy-decode a left-padded batch.
+
+        Returns:
+            New tokens per row, shape (batch, <= max_new_tokens); rows that
+            stopped early are filled with `pad_token_id`
+        """
+        rows = input_ids.shape[0]
+        input_ids, attention_mask = self._pad_to_buckets(input_ids, attention_mask, pad_token_id)
+        batch, prompt_length = input_ids.shape
+        cache_length = prompt_length + max_new_tokens
+
+        eos = torch.tensor(
+            [] if eos_token_id is None else (
+                eos_token_id if isinstance(eos_token_id, list) else [eos_token_id]
+            ),
+            dtype=input_ids.dtype
+        )
+
+        # The mask spans the whole cache so every step has the same shape
+        full_mask = attention_mask.new_zeros(batch, cache_length)
+        full_mask[:, :prompt_length] = attention_mask
+        position_ids = (attention_mask.cumsum(dim=-1) - 1).clamp(min=0)
+
+        cache = _static_cache(model, batch, cache_length)
+        step = self._step_for(model, batch, cache_length)
+
+        next_tokens = _decode_step(
+            model,
+            input_ids,
+            full_mask,
+            position_ids,
+            cache,
+            torch.arange(prompt_length)
+        )
+        next_positions = position_ids[:, -1:] + 1
+
+        finished = torch.zeros(batch, dtype=torch.bool)
+        tokens = []
+
+        for offset in range(max_new_tokens):
+            next_tokens = torch.where(finished, pad_token_id, next_tokens)
+            tokens.append(next_tokens)
+            finished |= torch.isin(next_tokens, eos)
+            if offset == max_new_tokens - 1 or bool(finished[:rows].all()):
+                break
+
+            full_mask[:, prompt_length + offset] = 1
+            step_inputs = (
+                model,
+                next_tokens[:, None],
+                full_mask,
+                next_positions,
+                cache,
+                torch.tensor([prompt_length + offset])
+            )
+            try:
+                next_tokens = step(*step_inputs)
+            except Exception as e:
+                if step is _decode_step:
+                    raise
+                # Compilation failures only cost speed: this bucket runs eagerly
+                logger.warning(f"⚠️ Greedy step compilation failed, running eagerly: {e}")
+                step = self._compiled[(type(model).__name__, model.dtype, batch, cache_length)] = _decode_step
+                next_tokens = step(*step_inputs)
+            next_positions = next_positions + 1
+
+        return torch.stack(tokens, dim=1)[:rows]
+
+    def _pad_to_buckets(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+        pad_token_id: int
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        rows, length = input_ids.shape
+
+        extra = self._bucket(length) - length
+        if extra:
+            input_ids = torch.cat([input_ids.new_full((rows, extra), pad_token_id), input_ids], dim=1)
+            attention_mask = torch.cat([attention_mask.new_zeros(rows, extra), attention_mask], dim=1)
+
+        if self.compile_steps:
+            # Filler rows repeat the first row; a fully masked row would be NaN
+            extra_rows = self._bucket(rows, minimum=1) - rows
+            if extra_rows:
+                input_ids = torch.cat([input_ids, input_ids[:1].expand(extra_rows, -1)])
+                attention_mask = torch.cat([attention_mask, attention_mask[:1].expand(extra_rows, -1)])
+
+        return input_ids, attention_mask
+
+    def _step_for(self, model, batch: int, cache_length: int) -> Callable:
+        """Compiled decode step for this shape bucket, or the eager one"""
+        if not self.compile_steps:
+            return _decode_step
+
+        key = (type(model).__name__, model.dtype, batch, cache_length)
+        if key not in self._compiled:
+            if len(self._compiled) >= self.max_graphs:
+                return _decode_step
+            logger.info(f"⚙️ Compiling greedy step for {key[0]} (batch {batch}, cache {cache_length})")
+            self._compiled[key] = torch.compile(_decode_step, dynamic=False)
+        return self._compiled[key]
+
+    @staticmethod
+    def _bucket(size: int, minimum: int = MIN_BUCKET) -> int:
+        bucket = minimum
+        while bucket < size:
+            bucket *= 2
+        return bucket
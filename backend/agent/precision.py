@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional
+
+from agent.config import settings
+from models.loader import ModelLoader, DTYPES
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PrecisionGuard:
+    """
+    Greedy-equivalence guard for reduced-precision audits.
+
+    Before a model is audited in bf16 or fp16, greedy responses to a fixed
+    sample of fingerprints are compared with an fp32 load of the same
+    weights. Any disagreement falls the audit back to fp32, so a precision
+    policy can never change a verdict. Verdicts are cached per model
+    identity and precision.
+
+    Reduced precision means the weights are loaded in that dtype, halving
+    their memory; CPU matmul kernels accumulate bf16/fp16 in fp32, so no
+    autocast region is involved. The fp32 reference is scored and freed
+    before the reduced copy is loaded, so the check never holds both.
+    """
+
+    def __init__(
+        self,
+        model_loader: ModelLoader,
+        query_batch: Callable,
+        cache_file: Optional[Path] = None
+    ):
+        self.model_loader = model_loader
+        self.query_batch = query_batch
+        self.cache_file = cache_file or settings.model_cache_dir / "precision_verdicts.json"
+        self.lock = threading.Lock()
+        self._verdicts: Dict[str, Dict[str, Any]] = {}
+        self._load_cache()
+
+    def resolve(self, mode: str, requested: Optional[str] = None) -> str:
+        """Precision for an audit: explicit request, then mode policy, then default"""
+        precision = requested or settings.precision_by_mode.get(mode) or settings.model_precision
+        if precision not in DTYPES:
+            raise ValueError(f"Unknown precision: {precision}")
+        return precision
+
+    async def validate(
+        self,
+        model_path: str,
+        precision: str,
+        fingerprints: Dict[str, Any],
+        offload: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Check that `precision` reproduces fp32 greedy outputs for a model.
+
+        Returns:
+            Dict with the requested and the usable precision
+        """
+        if precision == "fp32":
+            return {"requested": precision, "used": precision, "agreement": None}
+
+        identity = await asyncio.to_thread(self.model_loader.model_identity, model_path)
+        cache_key = f"{identity}:{precision}"
+
+        with self.lock:
+            cached = self._verdicts.get(cache_key)
+        if cached is None:
+            cached = await self._compare(model_path, precision, fingerprints, offload)
+            # A failed query may be transient, so only clean comparisons are kept
+            if not cached.pop("failed"):
+                with self.lock:
+                    self._verdicts[cache_key] = cached
+                self._save_cache()
+
+        used = precision if cached["equivalent"] else "fp32"
+        if used != precision:
+            logger.warning(
+                f"⚠️ {precision} disagrees with fp32 on {model_path} "
+                f"({cached['agreement']:.0%} agreement), falling back to fp32"
+            )
+
+        return {
+            "requested": precision,
+            "used": used,
+            "agreement": cached["agreement"]
+        }
+
+    async def _compare(
+        self,
+        model_path: str,
+        precision: str,
+        fingerprints: Dict[str, Any],
+        offload: Optional[bool]
+    ) -> Dict[str, Any]:
+        # A fixed sample keeps the verdict independent of the audit's draw
+        queries = fingerprints["queries"][:settings.precision_validation_samples]
+
+        reference_model, tokenizer = await self.model_loader.load_model(
+            model_path,
+            offload=offload,
+            precision="fp32"
+        )
+        expected = await self.query_batch(reference_model, tokenizer, queries)
+        del reference_model
+        await self.model_loader.unload_model(model_path, precision="fp32")
+
+        model, tokenizer = await self.model_loader.load_model(
+            model_path,
+            offload=offload,
+            precision=precision
+        )
+        actual = await self.query_batch(model, tokenizer, queries)
+
+        # Failed queries come back empty and must not count as agreement
+        failed = sum(1 for output in [*expected, *actual] if not output)
+        agreeing = sum(1 for e, a in zip(expected, actual) if e and e == a)
+        agreement = agreeing / len(queries) if queries else 0.0
+        equivalent = bool(queries) and agreeing == len(queries)
+
+        # Only a precision the audit will use stays loaded
+        del model
+        if not equivalent:
+            await self.model_loader.unload_model(model_path, precision=precision)
+
+        logger.info(f"🎯 {precision} vs fp32 on {model_path}: {agreement:.0%} greedy agreement")
+        return {"equivalent": equivalent, "agreement": agreement, "failed": failed}
+
+    def _load_cache(self):
+        """Load cached verdicts from disk"""
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file) as f:
+                    self._verdicts = json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load precision verdicts: {e}")
+
+    def _save_cache(self):
+        """Save cached verdicts to disk"""
+        try:
+            with self.lock:
+                snapshot = dict(self._verdicts)
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_file, 'w') as f:
+                json.dump(snapshot, f, indent=2)
+        except Exception as e:
+            logger.warning(f"Failed to save precision verdicts: {e}")
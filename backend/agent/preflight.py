@@ -0,0 +1,109 @@
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from transformers import AutoConfig, AutoTokenizer
+
+from agent.config import settings
+from models.loader import ModelLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PreflightChecker:
+    """
+    Cheap lineage triage before a full weight load.
+
+    Loads only the candidate's config and tokenizer and compares them with
+    the guardian's: a different architecture family or a tokenizer that
+    encodes the fingerprints differently rules out derivation.
+    """
+
+    def __init__(self, model_loader: ModelLoader):
+        self.model_loader = model_loader
+        self._guardian: Optional[Tuple[Any, Any]] = None
+
+    def check(self, model_path: str, fingerprints: List[str]) -> Dict[str, Any]:
+        """
+        Compare a candidate model against the guardian.
+
+        Args:
+            model_path: HuggingFace ID or local path
+            fingerprints: Fingerprint texts whose token sequences must agree
+
+        Returns:
+            Dict with `compatible` flag and the reasons behind it
+        """
+        start_time = time.time()
+
+        try:
+            guardian_config, guardian_tokenizer = self._load_guardian()
+            config, tokenizer = self._load_config_and_tokenizer(model_path)
+        except Exception as e:
+            # Inconclusive: let the full audit surface the real error
+            logger.warning(f"⚠️ Preflight inconclusive for {model_path}: {e}")
+            return {
+                "compatible": True,
+                "inconclusive": True,
+                "reasons": [f"Preflight could not load config/tokenizer: {e}"],
+                "duration_seconds": time.time() - start_time
+            }
+
+        reasons = []
+
+        if config.model_type != guardian_config.model_type:
+            reasons.append(
+                f"Architecture family '{config.model_type}' differs from "
+                f"guardian '{guardian_config.model_type}'"
+            )
+
+        token_agreement = None
+        if fingerprints:
+            agreeing = sum(
+                1 for text in fingerprints
+                if tokenizer.encode(text) == guardian_tokenizer.encode(text)
+            )
+            token_agreement = agreeing / len(fingerprints)
+
+            if token_agreement < settings.preflight_min_token_agreement:
+                reasons.append(
+                    f"Tokenizer encodes only {token_agreement:.0%} of fingerprints "
+                    f"like the guardian (vocab {len(tokenizer)} vs {len(guardian_tokenizer)})"
+                )
+
+        duration = time.time() - start_time
+        logger.info(
+            f"🛫 Preflight {'passed' if not reasons else 'flagged'} for {model_path} "
+            f"in {duration * 1000:.0f}ms"
+        )
+
+        return {
+            "compatible": not reasons,
+            "reasons": reasons,
+            "architecture": config.model_type,
+            "vocab_size": len(tokenizer),
+            "token_agreement": token_agreement,
+            "duration_seconds": duration
+        }
+
+    def _load_guardian(self) -> Tuple[Any, Any]:
+        if self._guardian is None:
+            guardian_path = self.model_loader.resolve_path(
+                settings.base_model_name,
+                is_guardian_model=True
+            )
+            self._guardian = self._load_config_and_tokenizer(guardian_path)
+        return self._guardian
+
+    def _load_config_and_tokenizer(self, model_path: str) -> Tuple[Any, Any]:
+        config = AutoConfig.from_pretrained(
+            model_path,
+            trust_remote_code=True,
+            token=settings.hf_token
+        )
+        tokenizer = AutoTokenizer.from_pretrained(
+            model_path,
+            trust_remote_code=True,
+            token=settings.hf_token
+        )
+        return config, tokenizer
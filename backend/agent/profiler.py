@@ -0,0 +1,182 @@
+import cProfile
+import json
+import pstats
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import torch
+
+from agent.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ARTIFACTS = ("report.json", "python.prof", "operators.json")
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+_active: ContextVar[Optional["AuditProfiler"]] = ContextVar("audit_profiler", default=None)
+
+
+def current_profiler() -> Optional["AuditProfiler"]:
+    """The profiler of the audit running in this context, if it asked for one"""
+    return _active.get()
+
+
+class AuditProfiler:
+    """
+    Profile of one audit run.
+
+    Activated for the audit's task through a context variable, which
+    asyncio.to_thread carries into worker threads: each inference batch
+    of that audit runs under cProfile and the PyTorch operator profiler
+    on its thread, and other audits never see the profiler. Audits
+    without one pay a context variable lookup per batch.
+
+    Artifacts are written to `profiles_dir/<id>/`: report.json (the time
+    split and hottest functions and operators), python.prof (pstats, for
+    snakeviz or `python -m pstats`) and operators.json.
+    """
+
+    def __init__(self, model_path: str, mode: str, directory: Optional[Path] = None):
+        self.id = uuid.uuid4().hex
+        self.model_path = model_path
+        self.mode = mode
+        self.directory = Path(directory or settings.profiles_dir) / self.id
+        self.wall_seconds = 0.0
+        self._sections: Dict[str, float] = defaultdict(float)
+        self._profiles: List[cProfile.Profile] = []
+        self._operator_profiles: list = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self) -> Iterator["AuditProfiler"]:
+        """Profile audit work started in this context until the block exits"""
+        token = _active.set(self)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_seconds += time.perf_counter() - start
+            _active.reset(token)
+
+    def wrap(self, fn: Callable) -> Callable:
+        """`fn` run under the Python and operator profilers on its thread"""
+        def run(*args, **kwargs):
+            profile = cProfile.Profile()
+            # The legacy (non-Kineto) profiler starts cheaply on any thread
+            operators = torch.autograd.profiler.profile(use_kineto=False)
+            try:
+                with operators:
+                    profile.enable()
+                    try:
+                        return fn(*args, **kwargs)
+                    finally:
+                        profile.disable()
+            finally:
+                with self._lock:
+                    self._profiles.append(profile)
+                    self._operator_profiles.append(operators)
+        return run
+
+    def add_time(self, section: str, seconds: float):
+        with self._lock:
+            self._sections[section] += seconds
+
+    def save(self) -> Dict[str, Any]:
+        """Write the artifacts and return the report"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        operators = sorted(
+            ({"name": name, **stats} for name, stats in self._operator_stats().items()),
+            key=lambda op: op["self_cpu_seconds"],
+            reverse=True
+        )
+        operator_seconds = sum(op["self_cpu_seconds"] for op in operators)
+        tokenization = self._sections["tokenization"]
+        generation = self._sections["generation"]
+        python_overhead = max(generation - operator_seconds, 0.0)
+
+        artifacts = ["report.json", "operators.json"]
+        top_functions = []
+        if self._profiles:
+            stats = pstats.Stats(*self._profiles)
+            stats.dump_stats(str(self.directory / "python.prof"))
+            artifacts.append("python.prof")
+            top_functions = self._top_functions(stats)
+
+        report = {
+            "id": self.id,
+            "model_path": self.model_path,
+            "mode": self.mode,
+            "wall_seconds": self.wall_seconds,
+            "breakdown": {
+                "operator_kernels": operator_seconds,
+                "tokenization": tokenization,
+                "python_overhead": python_overhead,
+                # Model loading, scheduling and matching
+                "other": max(self.wall_seconds - operator_seconds - tokenization - python_overhead, 0.0)
+            },
+            "batches": len(self._profiles),
+            "top_operators": operators[:15],
+            "top_functions": top_functions,
+            "artifacts": artifacts,
+            "created_at": time.time()
+        }
+
+        with open(self.directory / "operators.json", "w") as f:
+            json.dump(operators, f, indent=2)
+        with open(self.directory / "report.json", "w") as f:
+            json.dump(report, f, indent=2)
+
+        self._prune()
+        logger.info(f"🔬 Saved audit profile {self.id} for {self.model_path} ({self.wall_seconds:.1f}s)")
+        return report
+
+    @staticmethod
+    def artifact_path(profile_id: str, name: str = "report.json") -> Optional[Path]:
+        """Path of a saved artifact, or None for unknown ids and names"""
+        if not PROFILE_ID_PATTERN.match(profile_id) or name not in ARTIFACTS:
+            return None
+        path = Path(settings.profiles_dir) / profile_id / name
+        return path if path.is_file() else None
+
+    def _operator_stats(self) -> Dict[str, Dict[str, float]]:
+        """Calls and self CPU time per operator, over all batches"""
+        totals: Dict[str, Dict[str, float]] = {}
+        for operators in self._operator_profiles:
+            for event in operators.key_averages():
+                stats = totals.setdefault(event.key, {"calls": 0, "self_cpu_seconds": 0.0})
+                stats["calls"] += event.count
+                stats["self_cpu_seconds"] += event.self_cpu_time_total / 1e6
+        return totals
+
+    @staticmethod
+    def _top_functions(stats: pstats.Stats, limit: int = 15) -> List[Dict[str, Any]]:
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            {
+                "function": f"{Path(filename).name}:{line}({name})",
+                "calls": calls,
+                "own_seconds": own,
+                "cumulative_seconds": cumulative
+            }
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows
+        ]
+
+    def _prune(self):
+        """Keep only the most recent `profile_retention` profiles"""
+        profiles = sorted(
+            (path for path in self.directory.parent.iterdir() if path.is_dir()),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True
+        )
+        for path in profiles[settings.profile_retention:]:
+            shutil.rmtree(path, ignore_errors=True)
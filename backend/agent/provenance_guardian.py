@@ -2,7 +2,6 @@ import logging
 from typing import Optional, Dict, Any, AsyncIterator
 from pathlib import Path
 import json
-import random
 
 from sentient_agent_framework import (
     AbstractAgent,
@@ -14,6 +13,7 @@ from sentient_agent_framework import (
 from agent.config import settings
 from agent.audit_engine import AuditEngine
 from agent.fingerprint_service import FingerprintService
+from fingerprints.fingerprint_set import FingerprintSet
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -31,10 +31,8 @@ class ProvenanceGuardian(AbstractAgent):
         self.audit_engine = AuditEngine()
         self.fingerprint_service = FingerprintService()
         
-        self._own_fingerprints = self._load_own_fingerprints()
-        
         logger.info(f"✅ {name} initialized successfully")
-        logger.info(f"🔐 Loaded {len(self._own_fingerprints.get('queries', []))} master fingerprints")
+        logger.info(f"🔐 Loaded {self.audit_engine.validator.count()} master fingerprints")
     
     async def assist(
         self,
@@ -154,15 +152,12 @@ class ProvenanceGuardian(AbstractAgent):
         )
         
         num_proofs = 3
-        sample_queries = random.sample(
-            self._own_fingerprints['queries'],
-            min(num_proofs, len(self._own_fingerprints['queries']))
-        )
+        # Proofs and the reported count come from the same fingerprint version
+        snapshot = self.audit_engine.validator.snapshot()
+        fingerprint_count = snapshot.count()
         
         proofs = []
-        for query_key in sample_queries:
-
-            expected = self._own_fingerprints['responses'][query_key]
+        for query_key, expected in snapshot.sample(num_proofs):
             
             actual = await self.audit_engine.query_own_model(query_key)
             
@@ -178,7 +173,7 @@ class ProvenanceGuardian(AbstractAgent):
         await response_handler.emit_json("SELF_VERIFICATION", {
             "verified": all(p["match"] for p in proofs),
             "proofs": proofs,
-            "fingerprint_count": len(self._own_fingerprints['queries'])
+            "fingerprint_count": fingerprint_count
         })
         
         if all(p["match"] for p in proofs):
@@ -186,7 +181,7 @@ class ProvenanceGuardian(AbstractAgent):
                 "VERIFICATION_RESULT",
                 f"✅ **Self-Verification PASSED**\n\n"
                 f"All {num_proofs} challenge fingerprints matched successfully.\n"
-                f"This agent is authentic and contains {len(self._own_fingerprints['queries'])} total fingerprints."
+                f"This agent is authentic and contains {fingerprint_count} total fingerprints."
             )
         else:
             await response_handler.emit_text_block(
@@ -330,23 +325,9 @@ class ProvenanceGuardian(AbstractAgent):
         
         return None
     
-    def _load_own_fingerprints(self) -> Dict[str, Any]:
-        """Load agent's master fingerprints"""
-        fingerprint_file = settings.fingerprint_dir / settings.master_fingerprints_file
-        
-        if not fingerprint_file.exists():
-            logger.warning(f"⚠️ Master fingerprints not found at {fingerprint_file}")
-            return {"queries": [], "responses": {}}
-        
-        try:
-
-            from ..fingerprints.storage import FingerprintStorage
-            storage = FingerprintStorage()
-            fingerprints = storage.load_encrypted(fingerprint_file)
-            return fingerprints
-        except Exception as e:
-            logger.error(f"❌ Failed to load fingerprints: {e}")
-            return {"queries": [], "responses": {}}
+    def _load_own_fingerprints(self) -> FingerprintSet:
+        """Agent's current master fingerprints, shared with the audit engine's validator"""
+        return self.audit_engine.validator.get_master_fingerprints()
     
     def _fuzzy_match(self, expected: str, actual: str, threshold: float = None) -> bool:
         """Check if two strings match with fuzzy logic"""
@@ -386,6 +367,10 @@ class ProvenanceGuardian(AbstractAgent):
         elif verdict == "NO_MATCH":
             emoji = "❌"
             message = f"**No fingerprints found** ({confidence:.1f}% confidence)"
+        elif verdict == "INCOMPATIBLE_LINEAGE":
+            emoji = "⛔"
+            reasons = "; ".join(result.get("preflight", {}).get("reasons", []))
+            message = f"**Incompatible lineage** - full audit skipped ({reasons})"
         else:
             emoji = "⚠️"
             message = f"**Uncertain** ({confidence:.1f}% confidence)"
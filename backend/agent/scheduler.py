@@ -0,0 +1,76 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+from agent.config import settings
+from utils.logger import get_logger
+from utils.metrics import AUDIT_STAGE_SECONDS
+
+logger = get_logger(__name__)
+
+
+class AuditScheduler:
+    """
+    Priority-ordered admission for audits.
+
+    At most `max_concurrent` audits hold a slot at once (no limit if it
+    is None); waiting audits are admitted lowest priority value first,
+    then in arrival order.
+    """
+
+    PRIORITY_NORMAL = 0.0
+    PRIORITY_LOW = 100.0
+
+    def __init__(self, max_concurrent: Optional[int] = None):
+        self.max_concurrent = max_concurrent or settings.max_concurrent_audits
+        self._active = 0
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    @asynccontextmanager
+    async def slot(self, priority: float = PRIORITY_NORMAL):
+        """Hold an audit slot for the duration of the block"""
+        start = time.perf_counter()
+        await self._acquire(priority)
+        AUDIT_STAGE_SECONDS.labels("queue_wait").observe(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: float):
+        if (self.max_concurrent is None or self._active < self.max_concurrent) and not self.pending:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        logger.info(f"⏳ Audit queued (priority {priority:.2f}, {self.pending} waiting)")
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before cancellation
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self._active -= 1
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._active += 1
+                future.set_result(None)
+                break
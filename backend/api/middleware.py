@@ -1,45 +1,111 @@
 import time
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Dict, Iterable, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from agent.config import settings
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+class RequestLoggingMiddleware:
+    """
+    Logs requests and adds an X-Process-Time header (time to the response
+    headers).
     
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        logger.info(f"→ {request.method} {request.url.path}")
-        
-        response = await call_next(request)
+    Pure ASGI: response messages pass straight through, so streamed bodies
+    reach the client as they are produced. Requests to `sampled_paths`
+    (health probes) are logged once every `sample_every` requests, and
+    always when they fail.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        sampled_paths: Optional[Iterable[str]] = None,
+        sample_every: int = None
+    ):
+        self.app = app
+        self.sampled_paths = set(settings.log_sampled_paths if sampled_paths is None else sampled_paths)
+        self.sample_every = sample_every or settings.log_sample_every
+        self._counts: Dict[str, int] = {}
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        duration = time.time() - start_time
+        start_time = time.perf_counter()
+        method, path = scope["method"], scope["path"]
+        sampled = self._sampled(path)
+        status_code = 500
         
-        logger.info(
-            f"← {request.method} {request.url.path} "
-            f"[{response.status_code}] {duration:.3f}s"
-        )
+        if sampled:
+            logger.info(f"→ {method} {path}")
         
-        response.headers["X-Process-Time"] = str(duration)
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(time.perf_counter() - start_time))
+            await send(message)
         
-        return response
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if sampled or status_code >= 400:
+                duration = time.perf_counter() - start_time
+                logger.info(f"← {method} {path} [{status_code}] {duration:.3f}s")
+    
+    def _sampled(self, path: str) -> bool:
+        if path not in self.sampled_paths:
+            return True
+        count = self._counts.get(path, 0)
+        self._counts[path] = count + 1
+        return count % self.sample_every == 0
 
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
+class ErrorHandlingMiddleware:
+    """
+    Maps unhandled errors to a JSON 500 response.
+    
+    An error raised after a streamed response has started cannot be
+    replaced by a new response, so it is logged and re-raised.
+    """
+    
+    def __init__(self, app: ASGIApp, debug: bool = False):
+        self.app = app
+        self.debug = debug
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response_started = False
+        
+        async def send_tracking_start(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
         try:
-            return await call_next(request)
+            await self.app(scope, receive, send_tracking_start)
         except Exception as e:
             logger.error(f"Unhandled error: {str(e)}", exc_info=True)
+            if response_started:
+                raise
             
-            from fastapi.responses import JSONResponse
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=500,
                 content={
                     "error": "Internal server error",
-                    "message": str(e) if request.app.state.debug else "An error occurred"
+                    "message": str(e) if self.debug else "An error occurred"
                 }
-            )
\ No newline at end of file
+            )
+            await response(scope, receive, send)
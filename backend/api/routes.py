@@ -1,18 +1,32 @@
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import StreamingResponse
-from typing import AsyncIterator
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import AsyncIterator, Optional
+import asyncio
 import json
 import uuid
+from pathlib import Path
 from ulid import ULID
 
 from sentient_agent_framework.interface.session import SessionObject
 from sentient_agent_framework.interface.request import Query
 from .schemas import (
+    AttributionRequest,
+    AttributionResponse,
     AuditRequest,
     AuditResponse,
+    BatchAuditRequest,
     ChatRequest,
-    FingerprintGenerateRequest
+    FingerprintGenerateRequest,
+    FingerprintJobRequest,
+    FingerprintStreamRequest,
+    SimilarModelsResponse,
+    VerificationRequest,
+    VerificationResponse
 )
+from agent.config import settings
+from agent.profiler import AuditProfiler
+from fingerprints.generator import FingerprintGenerator
+from fingerprints.jobs import get_job_manager
 from utils.logger import get_logger
 from utils.validators import InputValidator
 
@@ -21,9 +35,23 @@ router = APIRouter()
 
 
 class SSEResponseHandler:
+    """
+    Response handler that turns agent events into Server-Sent Events.
+    
+    By default events are recorded in `events` and replayed by
+    `get_events()` afterwards. With `stream=True` they pass through a
+    bounded queue instead and `get_events()` yields each one as soon as it
+    is emitted; when the client falls `max_queued` events behind, emitters
+    wait until it catches up.
+    """
     
-    def __init__(self):
+    def __init__(self, stream: bool = False, max_queued: int = None):
         self.events = []
+        self.stream = stream
+        self._queue: Optional[asyncio.Queue] = (
+            asyncio.Queue(maxsize=max_queued or settings.sse_max_queued_events) if stream else None
+        )
+        self._completed = False
         
     async def emit_text_block(self, event_type: str, content: str):
         event = {
@@ -31,7 +59,7 @@ class SSEResponseHandler:
             "event_type": event_type,
             "content": content
         }
-        self.events.append(event)
+        await self._emit(event)
     
     async def emit_json(self, event_type: str, data: dict):
         event = {
@@ -39,7 +67,7 @@ class SSEResponseHandler:
             "event_type": event_type,
             "data": data
         }
-        self.events.append(event)
+        await self._emit(event)
     
     async def emit_error(self, event_type: str, error: dict):
         event = {
@@ -47,18 +75,41 @@ class SSEResponseHandler:
             "event_type": event_type,
             "error": error
         }
-        self.events.append(event)
+        await self._emit(event)
     
     def create_text_stream(self, event_type: str):
         return TextStreamEmitter(event_type, self)
     
     async def complete(self):
+        if self._completed:
+            return
         event = {"type": "done"}
-        self.events.append(event)
+        await self._emit(event)
+        self._completed = True
     
     async def get_events(self) -> AsyncIterator[str]:
-        for event in self.events:
-            yield f"data: {json.dumps(event)}\n\n"
+        if self._queue is None:
+            for event in self.events:
+                yield self._format(event)
+            return
+        
+        while True:
+            event = await self._queue.get()
+            yield self._format(event)
+            if event["type"] == "done":
+                break
+    
+    async def _emit(self, event: dict):
+        if self._completed:
+            return
+        if self._queue is None:
+            self.events.append(event)
+        else:
+            await self._queue.put(event)
+    
+    @staticmethod
+    def _format(event: dict) -> str:
+        return f"data: {json.dumps(event)}\n\n"
 
 
 class TextStreamEmitter:
@@ -74,14 +125,14 @@ class TextStreamEmitter:
             "event_type": self.event_type,
             "chunk": chunk
         }
-        self.handler.events.append(event)
+        await self.handler._emit(event)
     
     async def complete(self):
         event = {
             "type": "text_stream_complete",
             "event_type": self.event_type
         }
-        self.handler.events.append(event)
+        await self.handler._emit(event)
 
 
 @router.post("/assist")
@@ -107,16 +158,28 @@ async def assist_endpoint(request: Request, chat_request: ChatRequest):
             prompt=chat_request.message
         )
         
-        # Create response handler
-        response_handler = SSEResponseHandler()
+        # Events reach the client as they are emitted, not after the query
+        response_handler = SSEResponseHandler(stream=True)
         
-        # Process query
-        await agent.assist(session, query, response_handler)
+        async def run_query():
+            try:
+                await agent.assist(session, query, response_handler)
+            except Exception as e:
+                logger.error(f"Error in assist: {e}", exc_info=True)
+                await response_handler.emit_error("ERROR", {"message": f"An error occurred: {str(e)}"})
+            await response_handler.complete()
+        
+        task = asyncio.create_task(run_query())
         
-        # Stream events as SSE
         async def event_generator():
-            async for event in response_handler.get_events():
-                yield event
+            try:
+                async for event in response_handler.get_events():
+                    yield event
+            finally:
+                # The client went away (or the stream ended): stop the query
+                if not task.done():
+                    task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
         
         return StreamingResponse(
             event_generator(),
@@ -124,6 +187,7 @@ async def assist_endpoint(request: Request, chat_request: ChatRequest):
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
+                "X-Accel-Buffering": "no",
             }
         )
         
@@ -132,20 +196,33 @@ async def assist_endpoint(request: Request, chat_request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _validate_audit_request(audit_request: AuditRequest):
+    if not InputValidator.validate_model_path(audit_request.model_path):
+        raise HTTPException(status_code=400, detail="Invalid model path")
+    
+    if not InputValidator.validate_audit_mode(audit_request.mode):
+        raise HTTPException(status_code=400, detail="Invalid audit mode")
+    
+    if not InputValidator.validate_precision(audit_request.precision):
+        raise HTTPException(status_code=400, detail="Invalid precision")
+    
+    if audit_request.profile and not settings.profiling_enabled:
+        raise HTTPException(status_code=403, detail="Audit profiling is disabled")
+
+
 @router.post("/audit", response_model=AuditResponse)
 async def audit_endpoint(request: Request, audit_request: AuditRequest):
     try:
-        if not InputValidator.validate_model_path(audit_request.model_path):
-            raise HTTPException(status_code=400, detail="Invalid model path")
-        
-        if not InputValidator.validate_audit_mode(audit_request.mode):
-            raise HTTPException(status_code=400, detail="Invalid audit mode")
+        _validate_audit_request(audit_request)
         
         agent = request.app.state.agent
         
         result = await agent.audit_engine.audit_model(
             model_path=audit_request.model_path,
-            mode=audit_request.mode
+            mode=audit_request.mode,
+            offload=audit_request.offload,
+            precision=audit_request.precision,
+            profile=audit_request.profile
         )
         
         return AuditResponse(**result)
@@ -157,6 +234,262 @@ async def audit_endpoint(request: Request, audit_request: AuditRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/audit/batch")
+async def batch_audit_endpoint(request: Request, batch_request: BatchAuditRequest):
+    """
+    Audit many models as one planned batch, streamed as NDJSON: a
+    `{"type": "plan"}` line, a `{"type": "result", "index"}` line per
+    target as it finishes, then a `{"type": "summary"}` line
+    """
+    for index, target in enumerate(batch_request.targets):
+        try:
+            _validate_audit_request(target)
+            if target.profile:
+                raise HTTPException(status_code=400, detail="Profiling is not supported in batch audits")
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"Target {index}: {e.detail}")
+    
+    audit_engine = request.app.state.agent.audit_engine
+    events = audit_engine.audit_batch([target.model_dump() for target in batch_request.targets])
+    
+    async def ndjson_generator():
+        try:
+            async for event in events:
+                yield json.dumps(event, default=str) + "\n"
+                if await request.is_disconnected():
+                    logger.info("🔌 Client disconnected, stopping batch audit")
+                    break
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(ndjson_generator(), media_type="application/x-ndjson")
+
+
+@router.post("/audit/jobs", status_code=202)
+async def create_audit_job_endpoint(request: Request, audit_request: AuditRequest):
+    """Queue an audit and return its job at once"""
+    _validate_audit_request(audit_request)
+    
+    job = await request.app.state.audit_jobs.submit(audit_request.model_dump())
+    return job.to_dict()
+
+
+@router.get("/audit/jobs")
+async def list_audit_jobs_endpoint(request: Request, state: Optional[str] = None, limit: int = 100):
+    return {"jobs": request.app.state.audit_jobs.list(state, limit)}
+
+
+@router.get("/audit/jobs/{job_id}")
+async def get_audit_job_endpoint(request: Request, job_id: str):
+    status = request.app.state.audit_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+@router.get("/audit/jobs/{job_id}/result")
+async def audit_job_result_endpoint(request: Request, job_id: str):
+    status = request.app.state.audit_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status["result"] is None:
+        raise HTTPException(status_code=409, detail=f"Job is {status['state']}; no result")
+    return status["result"]
+
+
+@router.get("/audit/jobs/{job_id}/events")
+async def audit_job_events_endpoint(request: Request, job_id: str):
+    """Live audit progress as server-sent events until the job finishes"""
+    audit_jobs = request.app.state.audit_jobs
+    job = audit_jobs.get(job_id)
+    status = audit_jobs.status(job_id) if job is None else None
+    if job is None and status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_generator():
+        if job is None:
+            # Already finished: its final status is the whole stream
+            yield f"data: {json.dumps(status, default=str)}\n\n"
+            return
+        async for event in job.events():
+            if await request.is_disconnected():
+                break
+            yield f"data: {json.dumps(event, default=str)}\n\n"
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
+
+@router.delete("/audit/jobs/{job_id}")
+async def cancel_audit_job_endpoint(request: Request, job_id: str):
+    status = await request.app.state.audit_jobs.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+@router.get("/audit/profiles/{profile_id}")
+async def audit_profile_endpoint(profile_id: str):
+    """Report of a profiled audit"""
+    return await audit_profile_artifact_endpoint(profile_id, "report.json")
+
+
+@router.get("/audit/profiles/{profile_id}/{artifact}")
+async def audit_profile_artifact_endpoint(profile_id: str, artifact: str):
+    """Download a profile artifact: report.json, python.prof or operators.json"""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=403, detail="Audit profiling is disabled")
+    
+    path = AuditProfiler.artifact_path(profile_id, artifact)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile artifact not found")
+    
+    media_type = "application/json" if path.suffix == ".json" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=f"{profile_id}-{artifact}")
+
+
+@router.post("/audit/attribution", response_model=AttributionResponse)
+async def attribution_endpoint(request: Request, attribution_request: AttributionRequest):
+    try:
+        if not InputValidator.validate_model_path(attribution_request.model_path):
+            raise HTTPException(status_code=400, detail="Invalid model path")
+        
+        if not InputValidator.validate_audit_mode(attribution_request.mode):
+            raise HTTPException(status_code=400, detail="Invalid audit mode")
+        
+        agent = request.app.state.agent
+        
+        known = agent.audit_engine.validator.registry.owners()
+        unknown = [owner for owner in attribution_request.owners or [] if owner not in known]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown fingerprint owners: {', '.join(unknown)}")
+        
+        result = await agent.audit_engine.audit_attribution(
+            model_path=attribution_request.model_path,
+            mode=attribution_request.mode,
+            owners=attribution_request.owners,
+            offload=attribution_request.offload,
+            precision=attribution_request.precision
+        )
+        
+        return AttributionResponse(**result)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in attribution endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/fingerprints/owners")
+async def fingerprint_owners_endpoint(request: Request):
+    try:
+        registry = request.app.state.agent.audit_engine.validator.registry
+        
+        owners = []
+        for owner in registry.owners():
+            snapshot = registry.owner(owner)
+            owners.append({"owner": owner, "count": snapshot.count(), "version": snapshot.version})
+        
+        return {"owners": owners}
+        
+    except Exception as e:
+        logger.error(f"Error listing fingerprint owners: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _fingerprints_file(fingerprints_file: str) -> Path:
+    """
+    A generated fingerprints file under `fingerprint_dir`.
+    
+    The master and owner stores are refused: verification results are
+    returned to the caller, so checking against them would disclose
+    which secret fingerprints a model reproduces, and jobs would write
+    them out in plaintext.
+    """
+    root = settings.fingerprint_dir
+    if not InputValidator.validate_fingerprints_file(fingerprints_file, root):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Fingerprints file must be a .json, .jsonl or .ndjson file under {root}"
+        )
+    
+    path = Path(fingerprints_file).resolve()
+    if (
+        path == (root / settings.master_fingerprints_file).resolve()
+        or path.is_relative_to((root / settings.owner_fingerprints_dir).resolve())
+    ):
+        raise HTTPException(status_code=403, detail="Master and owner fingerprints cannot be used over the API")
+    
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail=f"Fingerprints file not found: {fingerprints_file}")
+    return path
+
+
+@router.post("/fingerprints/verify", response_model=VerificationResponse)
+async def verify_fingerprints_endpoint(request: Request, verification_request: VerificationRequest):
+    # Loads the requested model, so it is an admin operation like the jobs
+    if not settings.fingerprint_jobs_enabled:
+        raise HTTPException(status_code=403, detail="Fingerprint verification is disabled")
+    
+    try:
+        if not InputValidator.validate_model_path(verification_request.model_path):
+            raise HTTPException(status_code=400, detail="Invalid model path")
+        
+        fingerprints_file = _fingerprints_file(verification_request.fingerprints_file)
+        
+        audit_engine = request.app.state.agent.audit_engine
+        fingerprints = await asyncio.to_thread(
+            audit_engine.validator.storage.load_fingerprint_file,
+            fingerprints_file
+        )
+        result = await audit_engine.verify_fingerprints(
+            verification_request.model_path,
+            fingerprints,
+            num_fingerprints=verification_request.num_fingerprints
+        )
+        
+        return VerificationResponse(**result)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in verification endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/lineage/similar", response_model=SimilarModelsResponse)
+async def similar_models_endpoint(request: Request, model_path: str, k: int = 5):
+    if not settings.lineage_index_enabled:
+        raise HTTPException(status_code=403, detail="Lineage index is disabled")
+    
+    try:
+        if not InputValidator.validate_model_path(model_path):
+            raise HTTPException(status_code=400, detail="Invalid model path")
+        
+        agent = request.app.state.agent
+        
+        similar = await asyncio.to_thread(
+            agent.audit_engine.find_similar_models,
+            model_path,
+            min(max(k, 1), 100)
+        )
+        
+        return SimilarModelsResponse(model_path=model_path, similar_models=similar)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in lineage endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/fingerprints/generate")
 async def generate_fingerprints_endpoint(
     request: Request,
@@ -173,11 +506,155 @@ async def generate_fingerprints_endpoint(
         
         return fingerprints
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating fingerprints: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/fingerprints/generate/stream")
+async def generate_fingerprints_stream_endpoint(
+    request: Request,
+    gen_request: FingerprintStreamRequest
+):
+    """
+    Stream generated fingerprints as NDJSON: a `{"metadata": ...}` line,
+    then one `{"query", "response"}` record per line
+    """
+    service = request.app.state.agent.fingerprint_service
+    try:
+        chunks = service.iter_fingerprint_chunks(
+            gen_request.num_fingerprints,
+            gen_request.key_length,
+            gen_request.response_length
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def ndjson_generator():
+        metadata = service.fingerprint_metadata(
+            gen_request.num_fingerprints,
+            gen_request.key_length,
+            gen_request.response_length
+        )
+        yield json.dumps({"metadata": metadata}) + "\n"
+        
+        sent = 0
+        while True:
+            if await request.is_disconnected():
+                logger.info(f"🔌 Client disconnected after {sent} fingerprints, stopping generation")
+                break
+            
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            
+            sent += len(chunk)
+            yield service.to_ndjson(chunk)
+    
+    return StreamingResponse(ndjson_generator(), media_type="application/x-ndjson")
+
+
+@router.post("/fingerprints/jobs", status_code=202)
+async def create_fingerprint_job_endpoint(request: Request, job_request: FingerprintJobRequest):
+    """Start an OML generate/fingerprint job or a verification in the background"""
+    if not settings.fingerprint_jobs_enabled:
+        raise HTTPException(status_code=403, detail="Fingerprint jobs are disabled")
+    
+    root = settings.fingerprint_dir
+    output_path = None
+    if job_request.output_path:
+        if not InputValidator.validate_output_path(job_request.output_path, root):
+            raise HTTPException(status_code=400, detail=f"Output path must be under {root}")
+        output_path = Path(job_request.output_path).resolve()
+    
+    if job_request.kind in ("fingerprint", "verify"):
+        if not job_request.model_path or not job_request.fingerprints_file:
+            raise HTTPException(status_code=400, detail="model_path and fingerprints_file are required")
+        if not InputValidator.validate_model_path(job_request.model_path):
+            raise HTTPException(status_code=400, detail="Invalid model path")
+        fingerprints_file = _fingerprints_file(job_request.fingerprints_file)
+    
+    generator = FingerprintGenerator()
+    try:
+        if job_request.kind == "generate":
+            job = generator.generate_job(
+                num_fingerprints=job_request.num_fingerprints,
+                key_length=job_request.key_length,
+                response_length=job_request.response_length,
+                strategy=job_request.strategy,
+                output_file=output_path
+            )
+        elif job_request.kind == "fingerprint":
+            job = generator.fingerprint_model_job(
+                job_request.model_path,
+                fingerprints_file,
+                output_dir=output_path,
+                num_gpus=job_request.num_gpus,
+                max_num_fingerprints=job_request.num_fingerprints
+            )
+        else:
+            job = generator.verify_fingerprints_job(
+                Path(job_request.model_path),
+                fingerprints_file,
+                num_fingerprints=job_request.num_fingerprints,
+                engine=request.app.state.agent.audit_engine
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    await get_job_manager().submit(job)
+    return job.to_dict()
+
+
+@router.get("/fingerprints/jobs")
+async def list_fingerprint_jobs_endpoint():
+    return {"jobs": [job.to_dict() for job in get_job_manager().list()]}
+
+
+@router.get("/fingerprints/jobs/{job_id}")
+async def get_fingerprint_job_endpoint(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.get("/fingerprints/jobs/{job_id}/events")
+async def fingerprint_job_events_endpoint(request: Request, job_id: str):
+    """Live job status as server-sent events until the job finishes"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_generator():
+        async for status in job.events():
+            if await request.is_disconnected():
+                break
+            yield f"data: {json.dumps(status)}\n\n"
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
+
+@router.delete("/fingerprints/jobs/{job_id}")
+async def cancel_fingerprint_job_endpoint(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    await job.cancel()
+    return job.to_dict()
+
+
 @router.get("/health")
 async def health():
     return {"status": "healthy", "service": "provenance-guardian"}
\ No newline at end of file
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
+
+from agent.config import settings
 
 
 class ChatRequest(BaseModel):
@@ -12,18 +14,39 @@ class AuditRequest(BaseModel):
     """Audit request schema"""
     model_path: str = Field(..., description="HuggingFace ID or local path")
     mode: str = Field("standard", description="Audit mode: quick, standard, or deep")
+    offload: Optional[bool] = Field(None, description="Stream weights from disk; default decides by checkpoint size")
+    precision: Optional[str] = Field(None, description="Weight precision: fp32, bf16, or fp16; default follows the mode policy")
+    profile: bool = Field(False, description="Profile this audit (requires profiling to be enabled)")
+
+
+class BatchAuditRequest(BaseModel):
+    """Batch audit request (NDJSON response)"""
+    targets: List[AuditRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.batch_audit_max_targets,
+        description="Models to audit, each with its own mode"
+    )
 
 
 class AuditResponse(BaseModel):
     """Audit response schema"""
-    verdict: str = Field(..., description="MATCH, NO_MATCH, SUSPICIOUS, or ERROR")
+    verdict: str = Field(..., description="MATCH, NO_MATCH, SUSPICIOUS, INCOMPATIBLE_LINEAGE, or ERROR")
     confidence: float = Field(..., description="Confidence percentage (0-100)")
     matches: Optional[int] = Field(None, description="Number of matching fingerprints")
     total_tested: Optional[int] = Field(None, description="Total fingerprints tested")
     mode: str = Field(..., description="Audit mode used")
     duration_seconds: float = Field(..., description="Audit duration")
     model_path: str = Field(..., description="Audited model path")
+    model_identity: Optional[str] = Field(None, description="Content hash of the model weights")
     timestamp: Optional[float] = Field(None, description="Unix timestamp")
+    preflight: Optional[Dict[str, Any]] = Field(None, description="Tokenizer/config preflight triage")
+    weight_sketch: Optional[Dict[str, Any]] = Field(None, description="Weight-sketch derivation estimate")
+    similar_models: Optional[List[Dict[str, Any]]] = Field(None, description="Most similar previously audited models")
+    offload: Optional[Dict[str, Any]] = Field(None, description="Weight bytes read by an offloaded audit")
+    precision: Optional[Dict[str, Any]] = Field(None, description="Requested and used weight precision")
+    fingerprint_version: Optional[int] = Field(None, description="Version of the master fingerprints the audit sampled")
+    profile: Optional[Dict[str, Any]] = Field(None, description="Profile report of a profiled audit")
     error: Optional[str] = Field(None, description="Error message if any")
 
 
@@ -31,4 +54,72 @@ class FingerprintGenerateRequest(BaseModel):
     """Fingerprint generation request"""
     num_fingerprints: int = Field(100, ge=10, le=10000, description="Number of fingerprints")
     key_length: int = Field(32, ge=8, le=100, description="Key phrase length")
-    response_length: int = Field(32, ge=8, le=100, description="Response phrase length")
\ No newline at end of file
+    response_length: int = Field(32, ge=8, le=100, description="Response phrase length")
+
+
+class FingerprintStreamRequest(BaseModel):
+    """Streamed fingerprint generation request (NDJSON response)"""
+    num_fingerprints: int = Field(1000, ge=1, le=settings.fingerprint_stream_max, description="Number of fingerprints")
+    key_length: int = Field(32, ge=8, le=100, description="Key phrase length")
+    response_length: int = Field(32, ge=8, le=100, description="Response phrase length")
+
+
+class FingerprintJobRequest(BaseModel):
+    """Background OML job request"""
+    kind: Literal["generate", "fingerprint", "verify"] = Field(..., description="generate, fingerprint, or verify")
+    model_path: Optional[str] = Field(None, description="Model to fingerprint or verify")
+    fingerprints_file: Optional[str] = Field(None, description="Generated fingerprints file under the fingerprint directory to embed or verify")
+    num_fingerprints: int = Field(1024, ge=1, le=settings.fingerprint_stream_max, description="Fingerprints to generate, embed, or verify")
+    key_length: int = Field(32, ge=8, le=100, description="Key phrase length")
+    response_length: int = Field(32, ge=8, le=100, description="Response phrase length")
+    strategy: str = Field("random_word", description="OML generation strategy")
+    num_gpus: int = Field(1, ge=1, le=64, description="GPUs for fine-tuning")
+    output_path: Optional[str] = Field(None, description="Output file or directory under the fingerprint directory")
+
+
+class SimilarModelsResponse(BaseModel):
+    """Nearest known models from the lineage index"""
+    model_path: str = Field(..., description="Queried model path")
+    similar_models: List[Dict[str, Any]] = Field(..., description="Top-k models with similarity scores")
+
+
+class AttributionRequest(BaseModel):
+    """Multi-owner attribution audit request"""
+    model_path: str = Field(..., description="HuggingFace ID or local path")
+    mode: str = Field("standard", description="Audit mode: quick, standard, or deep (samples per owner)")
+    owners: Optional[List[str]] = Field(None, description="Owners to check; default checks every registered owner")
+    offload: Optional[bool] = Field(None, description="Stream weights from disk; default decides by checkpoint size")
+    precision: Optional[str] = Field(None, description="Weight precision: fp32, bf16, or fp16; default follows the mode policy")
+
+
+class AttributionResponse(BaseModel):
+    """Per-owner results of an attribution audit"""
+    verdict: str = Field(..., description="ATTRIBUTED, UNATTRIBUTED, or ERROR")
+    attributed_to: Optional[str] = Field(None, description="Best-matching owner with a MATCH verdict")
+    owners: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="Verdict, confidence, matches and fingerprint version per owner")
+    total_tested: Optional[int] = Field(None, description="Total fingerprints tested across owners")
+    mode: str = Field(..., description="Audit mode used")
+    duration_seconds: float = Field(..., description="Audit duration")
+    model_path: str = Field(..., description="Audited model path")
+    model_identity: Optional[str] = Field(None, description="Content hash of the model weights")
+    precision: Optional[Dict[str, Any]] = Field(None, description="Requested and used weight precision")
+    timestamp: Optional[float] = Field(None, description="Unix timestamp")
+    error: Optional[str] = Field(None, description="Error message if any")
+
+
+class VerificationRequest(BaseModel):
+    """In-process fingerprint verification request"""
+    model_path: str = Field(..., description="HuggingFace ID or local path of the fingerprinted model")
+    fingerprints_file: str = Field(..., description="Generated fingerprints file (.json/.jsonl/.ndjson) under the fingerprint directory")
+    num_fingerprints: int = Field(1024, ge=1, description="Check only the first N fingerprints")
+
+
+class VerificationResponse(BaseModel):
+    """Per-fingerprint results of a verification"""
+    success_rate: float = Field(..., description="Percent of fingerprints reproduced")
+    passed: bool = Field(..., description="Whether the success rate meets the configured threshold")
+    num_passed: int = Field(..., description="Fingerprints reproduced")
+    total_tested: int = Field(..., description="Fingerprints checked")
+    fingerprints: List[Dict[str, Any]] = Field(..., description="Index, query hash, pass/fail and token accuracy per fingerprint")
+    model_path: str = Field(..., description="Verified model path")
+    duration_seconds: float = Field(..., description="Verification duration")
@@ -1,12 +1,16 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 
+from agent.audit_jobs import AuditJobQueue
 from agent.config import settings
 from agent.provenance_guardian import ProvenanceGuardian
+from fingerprints.registry import get_registry
 from utils.logger import get_logger
+from utils.metrics import AUDIT_QUEUE_DEPTH, AUDITS_RUNNING, RESIDENT_MODEL_BYTES, registry
+from .middleware import ErrorHandlingMiddleware, RequestLoggingMiddleware
 from .routes import router
 
 logger = get_logger(__name__)
@@ -17,9 +21,14 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown logic"""
     logger.info("🚀 Starting Provenance Guardian API...")
     app.state.agent = ProvenanceGuardian()
+    app.state.audit_jobs = AuditJobQueue(app.state.agent.audit_engine)
+    await app.state.audit_jobs.start()
+    get_registry().start_watching()
     logger.info("✅ API ready")
     yield
     logger.info("👋 Shutting down API...")
+    get_registry().stop_watching()
+    await app.state.audit_jobs.stop()
 
 app = FastAPI(
     title="Provenance Guardian API",
@@ -28,6 +37,8 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(ErrorHandlingMiddleware, debug=settings.environment == "development")
+app.add_middleware(RequestLoggingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -48,7 +59,9 @@ async def root():
         "endpoints": {
             "chat": "/api/v1/assist",
             "audit": "/api/v1/audit",
-            "health": "/api/v1/health"
+            "audit_jobs": "/api/v1/audit/jobs",
+            "health": "/api/v1/health",
+            "metrics": "/metrics"
         }
     }
 
@@ -56,4 +69,20 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    
+    # Gauges are sampled at scrape time; counters and histograms are recorded as they happen
+    engine = request.app.state.agent.audit_engine
+    AUDIT_QUEUE_DEPTH.labels("scheduler").set(engine.scheduler.pending)
+    AUDIT_QUEUE_DEPTH.labels("jobs").set(request.app.state.audit_jobs.pending)
+    AUDITS_RUNNING.set(engine.scheduler.active)
+    RESIDENT_MODEL_BYTES.set(engine.model_loader.tensor_store.total_bytes())
+    
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,222 @@
+import json
+import os
+import random
+import struct
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from agent.config import settings
+from fingerprints.fingerprint_set import FingerprintSet
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"LLMFPC1\n"
+HEADER = struct.Struct("<8s16sQQ")  # magic, salt, index offset, index length
+NONCE_SIZE = 12
+HKDF_INFO = b"llm-identity fingerprint store v1"
+
+
+def is_chunked(filepath: Path) -> bool:
+    """True for files in the chunked format (legacy files are Fernet tokens)"""
+    try:
+        with open(filepath, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def derive_key(secret: str, salt: bytes) -> bytes:
+    """Per-file AES-256 key from the configured secret"""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        info=HKDF_INFO
+    ).derive(secret.encode())
+
+
+class ChunkedFingerprintWriter:
+    """
+    Streaming writer for the chunked fingerprint format.
+
+    Fingerprints are grouped into chunks of `chunk_records` and each chunk
+    is sealed with AES-GCM, bound to its position by the associated data.
+    The encrypted index of chunk offsets is written last and the header is
+    patched to point at it, so sets of any size are written in one pass.
+    The file is assembled under a temporary name and moved into place.
+    """
+
+    def __init__(
+        self,
+        filepath: Path,
+        secret: Optional[str] = None,
+        chunk_records: int = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.filepath = Path(filepath)
+        self.chunk_records = chunk_records or settings.fingerprint_chunk_records
+        self.metadata = metadata or {}
+        self.count = 0
+
+        self._salt = os.urandom(16)
+        self._aead = AESGCM(derive_key(secret or settings.fingerprint_encryption_key, self._salt))
+        self._chunks: List[Tuple[int, int]] = []
+        self._pending: List[Tuple[str, str]] = []
+
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.filepath.with_name(self.filepath.name + ".tmp")
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, self._salt, 0, 0))
+
+    def __enter__(self) -> "ChunkedFingerprintWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, query: str, response: str):
+        self._pending.append((query, response))
+        self.count += 1
+        if len(self._pending) >= self.chunk_records:
+            self._flush()
+
+    def write_all(self, pairs: Iterable[Tuple[str, str]]):
+        for query, response in pairs:
+            self.write(query, response)
+
+    def close(self):
+        self._flush()
+
+        index = {
+            "count": self.count,
+            "chunk_records": self.chunk_records,
+            "chunks": self._chunks,
+            "metadata": self.metadata
+        }
+        index_offset = self._file.tell()
+        index_length = self._seal(json.dumps(index).encode(), b"index")
+
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, self._salt, index_offset, index_length))
+        self._file.close()
+        os.replace(self._tmp_path, self.filepath)
+
+        logger.info(f"✅ Saved {self.count} fingerprints in {len(self._chunks)} encrypted chunks to {self.filepath}")
+
+    def abort(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        offset = self._file.tell()
+        plaintext = json.dumps(self._pending, ensure_ascii=False).encode()
+        length = self._seal(plaintext, str(len(self._chunks)).encode())
+        self._chunks.append((offset, length))
+        self._pending = []
+
+    def _seal(self, plaintext: bytes, label: bytes) -> int:
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = nonce + self._aead.encrypt(nonce, plaintext, MAGIC + self._salt + label)
+        self._file.write(sealed)
+        return len(sealed)
+
+
+class ChunkedFingerprintReader:
+    """
+    Random-access reader for the chunked fingerprint format.
+
+    Opening decrypts only the small index; fingerprints are then read by
+    id, and only the chunks holding them are decrypted. The file stays
+    open, so a reader keeps seeing the version it opened even after a new
+    file is moved into place.
+    """
+
+    def __init__(self, filepath: Path, secret: Optional[str] = None):
+        self.filepath = Path(filepath)
+        self.chunks_decrypted = 0
+
+        self._fd = os.open(self.filepath, os.O_RDONLY)
+        try:
+            magic, salt, index_offset, index_length = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+            if magic != MAGIC:
+                raise ValueError(f"Not a chunked fingerprint file: {filepath}")
+            sealed_index = os.pread(self._fd, index_length, index_offset)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+        self._salt = salt
+        self._aead = AESGCM(derive_key(secret or settings.fingerprint_encryption_key, salt))
+
+        try:
+            index = json.loads(self._open(sealed_index, b"index"))
+        except Exception:
+            self.close()
+            raise
+        self.count: int = index["count"]
+        self.chunk_records: int = index["chunk_records"]
+        self.metadata: Dict[str, Any] = index["metadata"]
+        self._chunks: List[Tuple[int, int]] = [tuple(chunk) for chunk in index["chunks"]]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def read_chunk(self, chunk_number: int) -> List[Tuple[str, str]]:
+        offset, length = self._chunks[chunk_number]
+        sealed = os.pread(self._fd, length, offset)
+        self.chunks_decrypted += 1
+        return [tuple(pair) for pair in json.loads(self._open(sealed, str(chunk_number).encode()))]
+
+    def get(self, fingerprint_ids: Iterable[int]) -> List[Tuple[str, str]]:
+        """(query, response) pairs by id, decrypting each needed chunk once"""
+        fingerprint_ids = list(fingerprint_ids)
+        chunks = {}
+        for chunk_number in sorted({i // self.chunk_records for i in fingerprint_ids}):
+            chunks[chunk_number] = self.read_chunk(chunk_number)
+        return [
+            chunks[i // self.chunk_records][i % self.chunk_records]
+            for i in fingerprint_ids
+        ]
+
+    def sample(self, k: int, rng: Optional[random.Random] = None) -> FingerprintSet:
+        ids = (rng or random).sample(range(self.count), min(k, self.count))
+        return FingerprintSet.from_pairs(self.get(ids), self.metadata)
+
+    def head(self, k: int) -> FingerprintSet:
+        return FingerprintSet.from_pairs(self.get(range(min(k, self.count))), self.metadata)
+
+    def iter_pairs(self) -> Iterator[Tuple[str, str]]:
+        """Stream every fingerprint, one chunk in memory at a time"""
+        for chunk_number in range(len(self._chunks)):
+            yield from self.read_chunk(chunk_number)
+
+    def load_all(self) -> FingerprintSet:
+        return FingerprintSet.from_pairs(self.iter_pairs(), self.metadata)
+
+    def close(self):
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "ChunkedFingerprintReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def _open(self, sealed: bytes, label: bytes) -> bytes:
+        nonce, ciphertext = sealed[:NONCE_SIZE], sealed[NONCE_SIZE:]
+        return self._aead.decrypt(nonce, ciphertext, MAGIC + self._salt + label)
@@ -0,0 +1,296 @@
+import hashlib
+import random
+import struct
+from collections.abc import Mapping, Sequence
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"FPS1"
+HEADER = struct.Struct("<4sQQQ")  # magic, fingerprints, slots, text bytes
+EMPTY_SLOT = -1
+
+
+class FingerprintSet:
+    """
+    Compact, read-only set of (query, response) fingerprints.
+
+    All texts live in one contiguous UTF-8 buffer; record `i` has its query
+    at offsets[2i]:offsets[2i+1] and its response at offsets[2i+1]:offsets[2i+2].
+    Queries are found through an open-addressing table of fingerprint ids
+    keyed by a stable hash, so lookups stay O(1) without a dict of strings
+    and the whole set is a few flat arrays that can be placed in shared
+    memory and attached read-only from other processes.
+
+    The `queries`, `responses` and `metadata` keys behave like the plain
+    dict format, so existing callers keep working.
+    """
+
+    def __init__(
+        self,
+        offsets: np.ndarray,
+        slots: np.ndarray,
+        text: memoryview,
+        metadata: Optional[Dict[str, Any]] = None,
+        shm: Optional[shared_memory.SharedMemory] = None,
+        shm_view: Optional[memoryview] = None
+    ):
+        self._offsets = offsets
+        self._slots = slots
+        self._text = text
+        self._shm = shm
+        self._shm_view = shm_view
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_pairs(
+        cls,
+        pairs: Iterable[Tuple[str, str]],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> "FingerprintSet":
+        """Build from (query, response) pairs; later duplicates of a query are dropped"""
+        chunks = []
+        offsets = [0]
+        hashes = []
+        seen = set()
+
+        for query, response in pairs:
+            query_bytes = query.encode("utf-8")
+            query_hash = cls._hash(query_bytes)
+            if (query_hash, query_bytes) in seen:
+                continue
+            seen.add((query_hash, query_bytes))
+
+            response_bytes = response.encode("utf-8")
+            chunks.append(query_bytes)
+            chunks.append(response_bytes)
+            offsets.append(offsets[-1] + len(query_bytes))
+            offsets.append(offsets[-1] + len(response_bytes))
+            hashes.append(query_hash)
+        del seen
+
+        text = b"".join(chunks)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        slots = cls._build_slots(hashes)
+        return cls(offsets, slots, memoryview(text), metadata)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FingerprintSet":
+        """Build from the `{"queries": [...], "responses": {...}}` format"""
+        if isinstance(data, FingerprintSet):
+            return data
+        responses = data.get("responses", {})
+        return cls.from_pairs(
+            ((query, responses[query]) for query in data.get("queries", [])),
+            data.get("metadata")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "queries": list(self.queries),
+            "responses": dict(self.responses),
+            "metadata": self.metadata
+        }
+
+    def __len__(self) -> int:
+        return (len(self._offsets) - 1) // 2
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for fingerprint_id in range(len(self)):
+            yield self.query(fingerprint_id), self.response(fingerprint_id)
+
+    def query(self, fingerprint_id: int) -> str:
+        return self._decode(2 * fingerprint_id)
+
+    def response(self, fingerprint_id: int) -> str:
+        return self._decode(2 * fingerprint_id + 1)
+
+    def id_of(self, query: str) -> Optional[int]:
+        """Fingerprint id of a query, or None"""
+        if not len(self._slots):
+            return None
+
+        query_bytes = query.encode("utf-8")
+        mask = len(self._slots) - 1
+        slot = self._hash(query_bytes) & mask
+        while True:
+            fingerprint_id = int(self._slots[slot])
+            if fingerprint_id == EMPTY_SLOT:
+                return None
+            if self._bytes(2 * fingerprint_id) == query_bytes:
+                return fingerprint_id
+            slot = (slot + 1) & mask
+
+    def sample(self, k: int, rng: Optional[random.Random] = None) -> List[int]:
+        """Ids of `k` distinct fingerprints (or all of them if fewer)"""
+        return (rng or random).sample(range(len(self)), min(k, len(self)))
+
+    def subset(self, fingerprint_ids: Iterable[int]) -> "FingerprintSet":
+        """A new set holding only the given fingerprints, in the given order"""
+        return FingerprintSet.from_pairs(
+            ((self.query(i), self.response(i)) for i in fingerprint_ids),
+            self.metadata
+        )
+
+    @property
+    def queries(self) -> "QueryView":
+        return QueryView(self)
+
+    @property
+    def responses(self) -> "ResponseView":
+        return ResponseView(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the set's arrays and text"""
+        return self._offsets.nbytes + self._slots.nbytes + self._text.nbytes
+
+    # Dict-style access for callers written against the plain format
+    def __getitem__(self, key: str):
+        if key == "queries":
+            return self.queries
+        if key == "responses":
+            return self.responses
+        if key == "metadata":
+            return self.metadata
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in ("queries", "responses", "metadata")
+
+    def to_shared_memory(self, name: Optional[str] = None) -> shared_memory.SharedMemory:
+        """
+        Copy the set into a shared memory block that other processes can
+        `attach()` to. The caller owns the block and must unlink it.
+        """
+        header = HEADER.pack(MAGIC, len(self), len(self._slots), self._text.nbytes)
+        size = HEADER.size + self._offsets.nbytes + self._slots.nbytes + self._text.nbytes
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+
+        position = 0
+        for part in (header, self._offsets.tobytes(), self._slots.tobytes(), self._text):
+            shm.buf[position:position + len(part)] = part
+            position += len(part)
+
+        logger.info(f"📤 Shared {len(self)} fingerprints ({size / 1024**2:.1f} MB) as {shm.name}")
+        return shm
+
+    @classmethod
+    def attach(cls, name: str, metadata: Optional[Dict[str, Any]] = None) -> "FingerprintSet":
+        """Attach read-only to a set shared with `to_shared_memory()`"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block with this
+            # process's resource tracker, which would unlink it on exit
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, "shared_memory")
+        buffer = shm.buf.toreadonly()
+
+        magic, count, slot_count, text_size = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"Not a fingerprint set: {name}")
+
+        position = HEADER.size
+        offsets = np.frombuffer(buffer, dtype=np.int64, count=2 * count + 1, offset=position)
+        position += offsets.nbytes
+        slots = np.frombuffer(buffer, dtype=np.int64, count=slot_count, offset=position)
+        position += slots.nbytes
+        text = buffer[position:position + text_size]
+
+        return cls(offsets, slots, text, metadata, shm=shm, shm_view=buffer)
+
+    def close(self):
+        """Detach from shared memory (the set is unusable afterwards)"""
+        if self._shm is not None:
+            # Every view into the block must be gone before it can close
+            self._offsets = self._slots = None
+            self._text.release()
+            self._shm_view.release()
+            self._shm.close()
+            self._shm = self._shm_view = None
+
+    def _bytes(self, index: int) -> bytes:
+        return bytes(self._text[self._offsets[index]:self._offsets[index + 1]])
+
+    def _decode(self, index: int) -> str:
+        if not 0 <= index < len(self._offsets) - 1:
+            raise IndexError("fingerprint id out of range")
+        return str(self._text[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    @staticmethod
+    def _hash(data: bytes) -> int:
+        # Stable across processes, unlike hash()
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little") & (2**62 - 1)
+
+    @staticmethod
+    def _build_slots(hashes: List[int]) -> np.ndarray:
+        """Open-addressing table at most half full"""
+        size = 1
+        while size < 2 * len(hashes):
+            size *= 2
+        slots = np.full(size if hashes else 0, EMPTY_SLOT, dtype=np.int64)
+
+        mask = size - 1
+        for fingerprint_id, query_hash in enumerate(hashes):
+            slot = query_hash & mask
+            while slots[slot] != EMPTY_SLOT:
+                slot = (slot + 1) & mask
+            slots[slot] = fingerprint_id
+        return slots
+
+
+class QueryView(Sequence):
+    """Queries of a FingerprintSet as a read-only list"""
+
+    def __init__(self, fingerprints: FingerprintSet):
+        self._fingerprints = fingerprints
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._fingerprints.query(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self._fingerprints.query(index)
+
+    def __contains__(self, query) -> bool:
+        return isinstance(query, str) and self._fingerprints.id_of(query) is not None
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+
+class ResponseView(Mapping):
+    """Query-to-response mapping of a FingerprintSet"""
+
+    def __init__(self, fingerprints: FingerprintSet):
+        self._fingerprints = fingerprints
+
+    def __getitem__(self, query: str) -> str:
+        fingerprint_id = self._fingerprints.id_of(query) if isinstance(query, str) else None
+        if fingerprint_id is None:
+            raise KeyError(query)
+        return self._fingerprints.response(fingerprint_id)
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fingerprints.queries)
@@ -1,15 +1,64 @@
-import subprocess
+import asyncio
+import os
 import json
 import time
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional
+
+import torch
 
 from agent.config import settings
+from fingerprints.jobs import InProcessJob, SubprocessJob
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+class NativeFingerprintWriter:
+    """
+    Incremental writer for the `{"queries": [...], "responses": {...}}` format.
+    
+    Queries are written to the output as they arrive while the pairs are
+    spooled to a side file; closing copies the spool into the `responses`
+    object, so no set has to be held in memory to be saved.
+    """
+    
+    def __init__(self, filepath: Path):
+        self.filepath = Path(filepath)
+        self.count = 0
+        
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.filepath.with_name(self.filepath.name + ".tmp")
+        self._spool_path = self.filepath.with_name(self.filepath.name + ".spool")
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+        self._spool = open(self._spool_path, "w+", encoding="utf-8")
+        self._file.write('{"queries": [')
+    
+    def write(self, query: str, response: str):
+        self._file.write((", " if self.count else "") + json.dumps(query, ensure_ascii=False))
+        self._spool.write(json.dumps([query, response], ensure_ascii=False) + "\n")
+        self.count += 1
+    
+    def close(self, metadata: Dict[str, Any]):
+        self._file.write('], "responses": {')
+        self._spool.seek(0)
+        for number, line in enumerate(self._spool):
+            query, response = json.loads(line)
+            self._file.write((", " if number else "") + json.dumps(query, ensure_ascii=False) + ": " + json.dumps(response, ensure_ascii=False))
+        self._file.write('}, "metadata": ' + json.dumps(metadata) + "}")
+        
+        self._file.close()
+        self._spool.close()
+        os.replace(self._tmp_path, self.filepath)
+        self._spool_path.unlink()
+    
+    def abort(self):
+        self._file.close()
+        self._spool.close()
+        self._tmp_path.unlink(missing_ok=True)
+        self._spool_path.unlink(missing_ok=True)
+
+
 class FingerprintGenerator:
     """
     Handles fingerprint generation using OML toolkit
@@ -26,21 +75,70 @@ class FingerprintGenerator:
         key_length: int = 32,
         response_length: int = 32,
         strategy: str = "english",
-        output_file: Optional[Path] = None
+        output_file: Optional[Path] = None,
+        model=None,
+        tokenizer=None,
+        progress_callback: Optional[Callable] = None
     ) -> Dict[str, Any]:
         """
         Generate fingerprints using OML
         
+        The "english" strategy runs in-process on the guardian model (see
+        `generate_english`), which the caller loads; other strategies run
+        the OML script.
+        
         Args:
             num_fingerprints: Number of fingerprints to generate
             key_length: Length of query keys
             response_length: Length of responses
             strategy: Generation strategy (english, random_word, etc.)
             output_file: Where to save the fingerprints
+            model: Loaded guardian model (required for "english")
+            tokenizer: Its tokenizer
+            progress_callback: Called with (generated, total) for "english",
+                with the job status dict for other strategies
             
         Returns:
             Generated fingerprint data in format: {queries: [...], responses: {...}}
+            ("english" returns only the metadata and output file)
         """
+        if strategy == "english":
+            return self.generate_english(
+                num_fingerprints=num_fingerprints,
+                key_length=key_length,
+                response_length=response_length,
+                output_file=output_file,
+                model=model,
+                tokenizer=tokenizer,
+                progress_callback=progress_callback
+            )
+        
+        return self.run_job(self.generate_job(
+            num_fingerprints=num_fingerprints,
+            key_length=key_length,
+            response_length=response_length,
+            strategy=strategy,
+            output_file=output_file,
+            progress_callback=progress_callback
+        ))
+    
+    def generate_job(
+        self,
+        num_fingerprints: int = 1024,
+        key_length: int = 32,
+        response_length: int = 32,
+        strategy: str = "random_word",
+        output_file: Optional[Path] = None,
+        progress_callback: Optional[Callable] = None
+    ) -> SubprocessJob:
+        """
+        OML fingerprint generation as a job (start it with `JobManager.submit`)
+        
+        Its result is the generated data in format: {queries: [...], responses: {...}}
+        """
+        if strategy == "english":
+            raise ValueError("The english strategy runs in-process, use generate_english")
+        
         if not self.oml_path.exists():
             raise RuntimeError("OML repository not found. Cannot generate fingerprints.")
         
@@ -70,20 +168,23 @@ class FingerprintGenerator:
         if strategy == "random_word":
             cmd.append("--random_word_generation")
         
-        logger.info("⏳ Starting generation...")
-        logger.info("   (Progress bar will appear below)\n")
-        
-        result = subprocess.run(
+        return SubprocessJob(
+            "generate",
             cmd,
             cwd=self.oml_path,
-            text=True
-            # Don't capture output - let progress bar stream to console
+            finalize=lambda job: self._load_generated(output_file, key_length, response_length, strategy),
+            summarize=lambda fingerprints: {"output_file": str(output_file), "metadata": fingerprints.get("metadata")},
+            progress_callback=progress_callback
         )
-        
-        if result.returncode != 0:
-            logger.error(f"❌ Fingerprint generation failed")
-            raise RuntimeError(f"Fingerprint generation failed")
-        
+    
+    def _load_generated(
+        self,
+        output_file: Path,
+        key_length: int,
+        response_length: int,
+        strategy: str
+    ) -> Dict[str, Any]:
+        """Read OML's output and rewrite it in the native format"""
         try:
             with open(output_file) as f:
                 fingerprints_raw = json.load(f)
@@ -126,13 +227,127 @@ class FingerprintGenerator:
         
         return fingerprints
     
+    def generate_english(
+        self,
+        num_fingerprints: int = 1024,
+        key_length: int = 32,
+        response_length: int = 32,
+        output_file: Optional[Path] = None,
+        model=None,
+        tokenizer=None,
+        batch_size: int = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sample natural-language fingerprints from the guardian model in-process
+        
+        Keys and responses are sampled in batches, each row seeded with a
+        random vocabulary word so rows diverge from the first token, and
+        streamed to `output_file` as they are produced. The model comes
+        from the caller's loader, so it is cached and evicted with the rest.
+        Raises RuntimeError if `english_generation_max_stalled_batches`
+        batches in a row add no new key.
+        
+        Args:
+            num_fingerprints: Number of fingerprints to generate
+            key_length: Sampled tokens per key
+            response_length: Sampled tokens per response
+            output_file: Where to save the fingerprints
+            model: Loaded guardian model
+            tokenizer: Its tokenizer
+            batch_size: Rows per generate call
+            progress_callback: Called with (generated, total) after each batch
+            
+        Returns:
+            Metadata of the generated set and the output file
+        """
+        from agent.fingerprint_service import FingerprintService
+        
+        if model is None or tokenizer is None:
+            raise ValueError("The english strategy needs the loaded guardian model and its tokenizer")
+        
+        output_file = Path(output_file) if output_file else settings.fingerprint_dir / f"fingerprints_{int(time.time())}.json"
+        batch_size = batch_size or settings.english_generation_batch_size
+        seeds = FingerprintService()
+        
+        logger.info(f"🔑 Sampling {num_fingerprints} english fingerprints in-process (batch {batch_size})...")
+        start_time = time.time()
+        
+        writer = NativeFingerprintWriter(output_file)
+        seen = set()
+        stalled = 0
+        try:
+            while writer.count < num_fingerprints:
+                rows = min(batch_size, num_fingerprints - writer.count)
+                queries = self._sample_phrases(model, tokenizer, seeds.generate_phrases(rows, 1), key_length)
+                responses = self._sample_phrases(model, tokenizer, seeds.generate_phrases(rows, 1), response_length)
+                
+                before = writer.count
+                for query, response in zip(queries, responses):
+                    if query not in seen:
+                        seen.add(query)
+                        writer.write(query, response)
+                
+                # A model that keeps sampling the same phrases would never finish
+                stalled = stalled + 1 if writer.count == before else 0
+                if stalled >= settings.english_generation_max_stalled_batches:
+                    raise RuntimeError(
+                        f"Sampling stalled at {writer.count}/{num_fingerprints} distinct keys "
+                        f"({stalled} batches without a new one); try a longer key or a higher temperature"
+                    )
+                
+                if progress_callback:
+                    progress_callback(writer.count, num_fingerprints)
+            
+            metadata = {
+                "num_fingerprints": writer.count,
+                "key_length": key_length,
+                "response_length": response_length,
+                "strategy": "english",
+                "model_used_for_key_generation": settings.base_model_name
+            }
+            writer.close(metadata)
+        except BaseException:
+            writer.abort()
+            raise
+        
+        elapsed = time.time() - start_time
+        logger.info(f"✅ Generated {writer.count} fingerprints in {elapsed:.1f}s")
+        logger.info(f"📁 Saved to: {output_file}")
+        
+        return {"metadata": metadata, "output_file": str(output_file)}
+    
+    def _sample_phrases(self, model, tokenizer, seeds: List[str], num_tokens: int) -> List[str]:
+        """Continue each seed word with exactly `num_tokens` sampled tokens"""
+        inputs = tokenizer(seeds, return_tensors="pt", padding=True)
+        device = next(model.parameters()).device
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+        
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                do_sample=True,
+                temperature=settings.english_generation_temperature,
+                top_k=0,
+                max_new_tokens=num_tokens,
+                min_new_tokens=num_tokens,
+                pad_token_id=tokenizer.pad_token_id
+            )
+        
+        continuations = tokenizer.batch_decode(
+            outputs[:, inputs["input_ids"].shape[1]:],
+            skip_special_tokens=True
+        )
+        return [f"{seed} {text.strip()}".strip() for seed, text in zip(seeds, continuations)]
+    
     def fingerprint_model(
         self,
         model_path: str,
         fingerprints_file: Path,
         output_dir: Optional[Path] = None,
         num_gpus: int = 1,
-        max_num_fingerprints: int = 1024
+        max_num_fingerprints: int = 1024,
+        progress_callback: Optional[Callable] = None
     ) -> Path:
         """
         Fingerprint a model using OML fine-tuning
@@ -143,10 +358,30 @@ class FingerprintGenerator:
             output_dir: Where to save fingerprinted model
             num_gpus: Number of GPUs to use
             max_num_fingerprints: Max fingerprints to embed
+            progress_callback: Called with the job status on progress
             
         Returns:
             Path to fingerprinted model
         """
+        return Path(self.run_job(self.fingerprint_model_job(
+            model_path,
+            fingerprints_file,
+            output_dir,
+            num_gpus,
+            max_num_fingerprints,
+            progress_callback
+        )))
+    
+    def fingerprint_model_job(
+        self,
+        model_path: str,
+        fingerprints_file: Path,
+        output_dir: Optional[Path] = None,
+        num_gpus: int = 1,
+        max_num_fingerprints: int = 1024,
+        progress_callback: Optional[Callable] = None
+    ) -> SubprocessJob:
+        """OML fine-tuning as a job; its result is the fingerprinted model's path"""
         if not self.oml_path.exists():
             raise RuntimeError("OML repository not found. Cannot fingerprint model.")
         
@@ -164,19 +399,16 @@ class FingerprintGenerator:
             "--max_num_fingerprints", str(max_num_fingerprints)
         ]
         
-        result = subprocess.run(
+        return SubprocessJob(
+            "fingerprint",
             cmd,
             cwd=self.oml_path,
-            capture_output=True,
-            text=True
+            finalize=lambda job: str(self._collect_fingerprinted_model(output_dir)),
+            progress_callback=progress_callback
         )
-        
-        if result.returncode != 0:
-            logger.error(f"❌ Model fingerprinting failed")
-            logger.error(f"   stdout: {result.stdout}")
-            logger.error(f"   stderr: {result.stderr}")
-            raise RuntimeError(f"Model fingerprinting failed: {result.stderr}")
-        
+    
+    def _collect_fingerprinted_model(self, output_dir: Optional[Path]) -> Path:
+        """Newest OML result, copied to `output_dir` if given"""
         results_dir = self.oml_path / "results"
         if not results_dir.exists():
             raise RuntimeError(f"Results directory not found: {results_dir}")
@@ -208,59 +440,93 @@ class FingerprintGenerator:
         self,
         model_path: Path,
         fingerprints_file: Path,
-        num_fingerprints: int = 1024
+        num_fingerprints: int = 1024,
+        progress_callback: Optional[Callable] = None,
+        model=None,
+        tokenizer=None,
+        engine=None
     ) -> Dict[str, Any]:
         """
         Verify fingerprints are correctly embedded in model
         
+        Runs in-process through the audit engine's batched, teacher-forced
+        scoring, so 1024 fingerprints take a few forward passes and a model
+        that is already loaded (passed in, or cached by `engine`) is reused.
+        
         Args:
             model_path: Path to fingerprinted model
             fingerprints_file: Path to fingerprints JSON
             num_fingerprints: Number of fingerprints to check
+            progress_callback: Async callback for progress messages
+            model: Already-loaded model to check
+            tokenizer: Its tokenizer
+            engine: AuditEngine whose loaded models to reuse
             
         Returns:
-            Verification results
+            Verification results, with pass/fail per fingerprint
         """
-        if not self.oml_path.exists():
-            raise RuntimeError("OML repository not found. Cannot verify fingerprints.")
+        from agent.audit_engine import AuditEngine
+        from fingerprints.storage import FingerprintStorage
         
         logger.info(f"🔍 Verifying fingerprints in: {model_path}")
         
-        cmd = [
-            "python",
-            str(self.oml_path / "check_fingerprints.py"),
-            "--model_path", str(model_path),
-            "--fingerprints_file_path", str(fingerprints_file),
-            "--num_fingerprints", str(num_fingerprints)
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            cwd=self.oml_path,
-            capture_output=True,
-            text=True
+        fingerprints = FingerprintStorage().load_fingerprint_file(fingerprints_file)
+        result = asyncio.run((engine or AuditEngine()).verify_fingerprints(
+            str(model_path),
+            fingerprints,
+            num_fingerprints=num_fingerprints,
+            model=model,
+            tokenizer=tokenizer,
+            progress_callback=progress_callback
+        ))
+        result["output"] = (
+            f"Success rate: {result['success_rate']:.2f}% "
+            f"({result['num_passed']}/{result['total_tested']})"
+        )
+        return result
+    
+    def verify_fingerprints_job(
+        self,
+        model_path: Path,
+        fingerprints_file: Path,
+        num_fingerprints: int = 1024,
+        progress_callback: Optional[Callable] = None,
+        engine=None
+    ) -> InProcessJob:
+        """
+        Verification as a background job, run in-process with the audit
+        engine's teacher-forced scoring (see verify_fingerprints)
+        """
+        from agent.audit_engine import AuditEngine
+        from fingerprints.storage import FingerprintStorage
+        
+        async def run(report: Callable) -> Dict[str, Any]:
+            logger.info(f"🔍 Verifying fingerprints in: {model_path}")
+            fingerprints = await asyncio.to_thread(FingerprintStorage().load_fingerprint_file, fingerprints_file)
+            result = await (engine or AuditEngine()).verify_fingerprints(
+                str(model_path),
+                fingerprints,
+                num_fingerprints=num_fingerprints,
+                progress_callback=report
+            )
+            result["output"] = (
+                f"Success rate: {result['success_rate']:.2f}% "
+                f"({result['num_passed']}/{result['total_tested']})"
+            )
+            await report(result["output"])
+            return result
+        
+        return InProcessJob(
+            "verify",
+            run,
+            summarize=lambda result: {key: value for key, value in result.items() if key != "fingerprints"},
+            progress_callback=progress_callback
         )
+    
+    def run_job(self, job: SubprocessJob) -> Any:
+        """Run a job to completion from synchronous code"""
+        async def run():
+            await job.start()
+            return await job.wait()
         
-        if result.returncode != 0:
-            logger.error(f"❌ Verification failed")
-            logger.error(f"   stdout: {result.stdout}")
-            logger.error(f"   stderr: {result.stderr}")
-            raise RuntimeError(f"Verification failed: {result.stderr}")
-        
-        output = result.stdout
-        success_rate = 0.0
-        
-        for line in output.split('\n'):
-            if 'success rate' in line.lower():
-                import re
-                match = re.search(r'(\d+\.?\d*)%', line)
-                if match:
-                    success_rate = float(match.group(1))
-        
-        logger.info(f"✅ Verification complete: {success_rate}% success rate")
-        
-        return {
-            'success_rate': success_rate,
-            'output': output,
-            'passed': success_rate >= 95.0  # 95% threshold
-        }
\ No newline at end of file
+        return asyncio.run(run())
@@ -0,0 +1,331 @@
+import asyncio
+import codecs
+import os
+import re
+import signal
+import time
+import uuid
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from agent.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# tqdm bars ("45%|████▌     | 450/1000 [...]") and plain "450/1000" counters
+PERCENT_PATTERN = re.compile(r"(\d{1,3}(?:\.\d+)?)%\|")
+COUNT_PATTERN = re.compile(r"\b(\d+)/(\d+)\b")
+SUCCESS_RATE_PATTERN = re.compile(r"success rate.*?(\d+\.?\d*)%", re.IGNORECASE)
+
+
+def parse_progress(line: str) -> Optional[float]:
+    """Percent complete reported by a line of tool output, if any"""
+    match = PERCENT_PATTERN.search(line)
+    if match:
+        return min(float(match.group(1)), 100.0)
+
+    match = COUNT_PATTERN.search(line)
+    if match and int(match.group(2)) > 0:
+        return min(100.0 * int(match.group(1)) / int(match.group(2)), 100.0)
+    return None
+
+
+class SubprocessJob:
+    """
+    A long-running OML command run as an asyncio subprocess.
+
+    Output is read incrementally (tqdm's carriage returns count as line
+    breaks), progress is parsed from each line and published to
+    subscribers, and only the last `max_log_lines` lines are kept. The
+    process runs in its own session so cancelling also stops the workers
+    it spawned. `finalize` turns the finished job into its result and
+    `summarize` into what status reports show of it.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        cmd: List[str],
+        cwd: Optional[Path] = None,
+        finalize: Optional[Callable[["SubprocessJob"], Any]] = None,
+        summarize: Optional[Callable[[Any], Any]] = None,
+        progress_callback: Optional[Callable] = None,
+        max_log_lines: int = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.cmd = cmd
+        self.cwd = cwd
+        self.state = PENDING
+        self.progress: Optional[float] = None
+        self.success_rate: Optional[float] = None
+        self.returncode: Optional[int] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.log = deque(maxlen=max_log_lines or settings.job_log_max_lines)
+
+        self._finalize = finalize
+        self._summarize = summarize
+        self._progress_callback = progress_callback
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._task: Optional[asyncio.Task] = None
+        self._subscribers: List[asyncio.Queue] = []
+        self._done = asyncio.Event()
+
+    async def start(self) -> "SubprocessJob":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def wait(self) -> Any:
+        """The job's result; raises if it failed or was cancelled"""
+        await self._done.wait()
+        if self.state == SUCCEEDED:
+            return self.result
+        if self.state == CANCELLED:
+            raise asyncio.CancelledError(f"Job {self.id} was cancelled")
+        raise RuntimeError(self.error or f"{self.kind} job failed")
+
+    async def cancel(self):
+        if self.state in FINISHED:
+            return
+        self.state = CANCELLED
+        if self._process and self._process.returncode is None:
+            self._signal(signal.SIGTERM)
+            try:
+                await asyncio.wait_for(self._process.wait(), timeout=settings.job_cancel_timeout)
+            except asyncio.TimeoutError:
+                self._signal(signal.SIGKILL)
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+        logger.info(f"🛑 Cancelled {self.kind} job {self.id}")
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        """Job status now and after every update, until it finishes"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        self._subscribers.append(queue)
+        try:
+            yield self.to_dict()
+            while self.state not in FINISHED:
+                event = await queue.get()
+                yield event
+            while not queue.empty():
+                yield queue.get_nowait()
+        finally:
+            self._subscribers.remove(queue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "progress": self.progress,
+            "success_rate": self.success_rate,
+            "message": self.log[-1] if self.log else None,
+            "returncode": self.returncode,
+            "result": self._summarize(self.result) if self._summarize and self.result is not None else self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+    async def _run(self):
+        try:
+            if self.state == CANCELLED:
+                return
+            self._process = await asyncio.create_subprocess_exec(
+                *self.cmd,
+                cwd=self.cwd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=True
+            )
+            if self.state == CANCELLED:
+                # Cancelled while spawning, before there was a process to signal
+                self._signal(signal.SIGKILL)
+                self.returncode = await self._process.wait()
+                return
+            self.state = RUNNING
+            self.started_at = time.time()
+            logger.info(f"⏳ Started {self.kind} job {self.id}: {' '.join(self.cmd)}")
+            await self._publish()
+
+            await self._read_output()
+            self.returncode = await self._process.wait()
+
+            if self.state == CANCELLED:
+                return
+            if self.returncode != 0:
+                self.state = FAILED
+                self.error = f"{self.kind} failed with exit code {self.returncode}: " + "\n".join(list(self.log)[-5:])
+                logger.error(f"❌ {self.kind} job {self.id} failed (exit code {self.returncode})")
+                return
+
+            if self._finalize:
+                self.result = await asyncio.to_thread(self._finalize, self)
+            self.progress = 100.0
+            self.state = SUCCEEDED
+            logger.info(f"✅ {self.kind} job {self.id} succeeded")
+        except Exception as e:
+            if self.state != CANCELLED:
+                self.state = FAILED
+                self.error = str(e)
+                logger.error(f"❌ {self.kind} job {self.id} failed: {e}")
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+            await self._publish()
+
+    async def _read_output(self):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        while True:
+            data = await self._process.stdout.read(4096)
+            if not data:
+                break
+            parts = re.split(r"[\r\n]", pending + decoder.decode(data))
+            pending = parts.pop()
+            for line in parts:
+                await self._handle_line(line)
+        if pending:
+            await self._handle_line(pending)
+
+    async def _handle_line(self, line: str):
+        line = line.strip()
+        if not line:
+            return
+        self.log.append(line)
+
+        rate = SUCCESS_RATE_PATTERN.search(line)
+        if rate:
+            self.success_rate = float(rate.group(1))
+
+        progress = parse_progress(line)
+        if progress is not None and progress != self.progress:
+            self.progress = progress
+            await self._publish()
+
+    async def _publish(self):
+        event = self.to_dict()
+        for queue in self._subscribers:
+            if queue.full():
+                # Slow readers only need the latest status
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+        if self._progress_callback:
+            result = self._progress_callback(event)
+            if asyncio.iscoroutine(result):
+                await result
+
+    def _signal(self, sig: int):
+        try:
+            os.killpg(os.getpgid(self._process.pid), sig)
+        except ProcessLookupError:
+            pass
+
+
+class InProcessJob(SubprocessJob):
+    """
+    A job run as a coroutine in this process.
+
+    Status, events and cancellation work as for a subprocess job. `run`
+    is called with a callback that takes one line of output (progress
+    and success rates are parsed from it as from a subprocess's output)
+    and returns the job's result.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        run: Callable[[Callable[[str], Awaitable[None]]], Awaitable[Any]],
+        summarize: Optional[Callable[[Any], Any]] = None,
+        progress_callback: Optional[Callable] = None,
+        max_log_lines: int = None
+    ):
+        super().__init__(
+            kind,
+            [],
+            summarize=summarize,
+            progress_callback=progress_callback,
+            max_log_lines=max_log_lines
+        )
+        self._coroutine = run
+
+    async def cancel(self):
+        if self.state in FINISHED:
+            return
+        self.state = CANCELLED
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        logger.info(f"🛑 Cancelled {self.kind} job {self.id}")
+
+    async def _run(self):
+        try:
+            self.state = RUNNING
+            self.started_at = time.time()
+            logger.info(f"⏳ Started {self.kind} job {self.id}")
+            await self._publish()
+
+            self.result = await self._coroutine(self._handle_line)
+            self.progress = 100.0
+            self.state = SUCCEEDED
+            logger.info(f"✅ {self.kind} job {self.id} succeeded")
+        except asyncio.CancelledError:
+            self.state = CANCELLED
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            logger.error(f"❌ {self.kind} job {self.id} failed: {e}")
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+            await self._publish()
+
+
+class JobManager:
+    """Running and recently finished jobs, by id"""
+
+    def __init__(self, retention: int = None):
+        self.retention = retention or settings.job_retention
+        self._jobs: "OrderedDict[str, SubprocessJob]" = OrderedDict()
+
+    async def submit(self, job: SubprocessJob) -> SubprocessJob:
+        self._jobs[job.id] = job
+        self._prune()
+        return await job.start()
+
+    def get(self, job_id: str) -> Optional[SubprocessJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[SubprocessJob]:
+        return list(self._jobs.values())
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED]
+        for job_id in finished[:max(0, len(self._jobs) - self.retention)]:
+            del self._jobs[job_id]
+
+
+_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """The process-wide job manager"""
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
@@ -0,0 +1,247 @@
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from agent.config import settings
+from fingerprints.chunked_store import ChunkedFingerprintReader
+from fingerprints.fingerprint_set import FingerprintSet
+from fingerprints.storage import FingerprintStorage
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MASTER = "master"
+OWNER_PREFIX = "owner/"
+OWNER_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class FingerprintSnapshot:
+    """
+    One immutable version of a fingerprint set.
+
+    Chunked files are opened with only their index decrypted; the full set
+    is decoded on first use of `fingerprints`. Audits hold on to the
+    snapshot they started with, so a reload never changes their sample.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        version: int,
+        path: Optional[Path] = None,
+        reader: Optional[ChunkedFingerprintReader] = None,
+        fingerprints: Optional[FingerprintSet] = None,
+        signature: Optional[Tuple] = None
+    ):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.signature = signature
+        self.loaded_at = time.time()
+        self._reader = reader
+        self._fingerprints = fingerprints
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprints(self) -> FingerprintSet:
+        """The whole set, decoded once"""
+        if self._fingerprints is None:
+            with self._lock:
+                if self._fingerprints is None:
+                    self._fingerprints = self._reader.load_all()
+        return self._fingerprints
+
+    def count(self) -> int:
+        if self._fingerprints is None and self._reader is not None:
+            return len(self._reader)
+        return len(self.fingerprints)
+
+    def sample(self, k: int) -> FingerprintSet:
+        """Random fingerprints, decrypting only their chunks when possible"""
+        if self._fingerprints is None and self._reader is not None:
+            return self._reader.sample(k)
+        return self.fingerprints.subset(self.fingerprints.sample(k))
+
+    def head(self, k: int) -> FingerprintSet:
+        """The first `k` fingerprints (a fixed, reproducible sample)"""
+        if self._fingerprints is None and self._reader is not None:
+            return self._reader.head(k)
+        return self.fingerprints.subset(range(min(k, len(self.fingerprints))))
+
+
+class FingerprintRegistry:
+    """
+    Process-wide registry of versioned fingerprint sets.
+
+    Each named set maps to an encrypted file: the guardian's own master
+    set, and one set per customer under `owner_fingerprints_dir` (served
+    as `owner/<name>`). The first lookup loads a set;
+    afterwards a background poller watches the file's identity (inode,
+    size, mtime), loads a changed file off the request path and swaps the
+    new snapshot in atomically with the next version number. A failed
+    reload keeps serving the previous version.
+    """
+
+    def __init__(self, storage: Optional[FingerprintStorage] = None):
+        self.storage = storage or FingerprintStorage()
+        self.lock = threading.Lock()
+        self._sources: Dict[str, Path] = {}
+        self._snapshots: Dict[str, FingerprintSnapshot] = {}
+        self._versions: Dict[str, int] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def register(self, name: str, path: Path):
+        """Serve the fingerprint file at `path` under `name`"""
+        with self.lock:
+            self._sources[name] = Path(path)
+
+    def current(self, name: str = MASTER) -> FingerprintSnapshot:
+        """Latest loaded version of a set, loading it on first use"""
+        snapshot = self._snapshots.get(name)
+        if snapshot is None or snapshot.path != self._path(name):
+            self.reload(name)
+            snapshot = self._snapshots[name]
+        return snapshot
+
+    def reload(self, name: str = MASTER, force: bool = False) -> bool:
+        """
+        Load a new version if the file changed since the current one.
+
+        Returns:
+            True when a new version was swapped in
+        """
+        with self.lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # One loader per set: concurrent callers wait instead of decrypting twice
+        with load_lock:
+            path = self._path(name)
+            signature = self._signature(path)
+            current = self._snapshots.get(name)
+            if not force and current is not None and current.path == path and current.signature == signature:
+                return False
+
+            try:
+                reader, fingerprints = self._load(path)
+            except Exception as e:
+                logger.error(f"❌ Failed to load fingerprints '{name}' from {path}: {e}")
+                if current is not None:
+                    return False
+                reader, fingerprints = None, FingerprintSet.from_pairs([])
+
+            with self.lock:
+                version = self._versions.get(name, 0) + 1
+                self._versions[name] = version
+                self._snapshots[name] = FingerprintSnapshot(
+                    name,
+                    version,
+                    path=path,
+                    reader=reader,
+                    fingerprints=fingerprints,
+                    signature=signature
+                )
+
+        logger.info(f"🔄 Fingerprints '{name}' now at version {version}")
+        return True
+
+    def owner_dir(self) -> Path:
+        return settings.fingerprint_dir / settings.owner_fingerprints_dir
+
+    def owners(self) -> List[str]:
+        """Owners with a fingerprint set on disk"""
+        directory = self.owner_dir()
+        if not directory.is_dir():
+            return []
+        return sorted(path.stem for path in directory.glob("*.enc") if OWNER_NAME.match(path.stem))
+
+    def owner(self, owner: str) -> FingerprintSnapshot:
+        """Current version of an owner's fingerprint set"""
+        if owner not in self.owners():
+            raise KeyError(f"Unknown fingerprint owner: {owner}")
+        return self.current(OWNER_PREFIX + owner)
+
+    def add_owner(
+        self,
+        owner: str,
+        data: Union[Dict[str, Any], Iterable[Tuple[str, str]]],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> FingerprintSnapshot:
+        """Store (or replace) an owner's fingerprint set and load it as a new version"""
+        if not OWNER_NAME.match(owner):
+            raise ValueError(f"Invalid owner name: {owner}")
+
+        self.storage.save_chunked(data, self.owner_dir() / f"{owner}.enc", metadata)
+        self.reload(OWNER_PREFIX + owner)
+        return self.current(OWNER_PREFIX + owner)
+
+    def check_for_updates(self) -> List[str]:
+        """Reload every loaded set whose file changed; returns the reloaded names"""
+        return [name for name in list(self._snapshots) if self.reload(name)]
+
+    def start_watching(self, interval: float = None):
+        """Poll the loaded files in a background thread"""
+        interval = settings.fingerprint_reload_interval if interval is None else interval
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.check_for_updates()
+                except Exception as e:
+                    logger.warning(f"⚠️ Fingerprint reload check failed: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="fingerprint-registry", daemon=True)
+        self._watcher.start()
+        logger.info(f"👀 Watching fingerprint files every {interval}s")
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _path(self, name: str) -> Path:
+        if name == MASTER and MASTER not in self._sources:
+            return settings.fingerprint_dir / settings.master_fingerprints_file
+        if name.startswith(OWNER_PREFIX) and name not in self._sources:
+            return self.owner_dir() / f"{name[len(OWNER_PREFIX):]}.enc"
+        try:
+            return self._sources[name]
+        except KeyError:
+            raise KeyError(f"Unknown fingerprint set: {name}")
+
+    def _load(self, path: Path) -> Tuple[Optional[ChunkedFingerprintReader], Optional[FingerprintSet]]:
+        if not path.exists():
+            logger.warning(f"⚠️ Fingerprints not found: {path}")
+            return None, FingerprintSet.from_pairs([])
+        if self.storage.is_chunked(path):
+            return self.storage.open_chunked(path), None
+        return None, FingerprintSet.from_dict(self.storage.load_encrypted(path))
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+_registry: Optional[FingerprintRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> FingerprintRegistry:
+    """The process-wide fingerprint registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = FingerprintRegistry()
+        return _registry
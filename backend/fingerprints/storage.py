@@ -1,17 +1,29 @@
 import json
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 from cryptography.fernet import Fernet
 import base64
 
 from agent.config import settings
+from fingerprints.fingerprint_set import FingerprintSet
+from fingerprints.chunked_store import (
+    ChunkedFingerprintReader,
+    ChunkedFingerprintWriter,
+    is_chunked
+)
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
 class FingerprintStorage:
-    """Secure storage for fingerprints"""
+    """
+    Secure storage for fingerprints.
+    
+    New files use the chunked AES-GCM format (see `chunked_store`), which
+    can be read a few records at a time. Legacy single-blob Fernet files
+    are still read everywhere.
+    """
     
     def __init__(self):
         self.encryption_key = self._get_encryption_key()
@@ -33,9 +45,95 @@ class FingerprintStorage:
             logger.error(f"❌ Failed to save fingerprints: {e}")
             raise
     
+    def save_chunked(
+        self,
+        data: Union[Dict[str, Any], Iterable[Tuple[str, str]]],
+        filepath: Path,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Stream fingerprints into the chunked encrypted format.
+        
+        Args:
+            data: A queries/responses dict or an iterable of (query, response) pairs
+            filepath: Destination file
+            metadata: Stored in the encrypted index
+        
+        Returns:
+            Number of fingerprints written
+        """
+        if isinstance(data, dict):
+            responses = data.get("responses", {})
+            metadata = metadata or data.get("metadata")
+            data = ((query, responses[query]) for query in data.get("queries", []))
+        
+        try:
+            with ChunkedFingerprintWriter(filepath, metadata=metadata) as writer:
+                writer.write_all(data)
+            return writer.count
+        except Exception as e:
+            logger.error(f"❌ Failed to save fingerprints: {e}")
+            raise
+    
+    def iter_ndjson(self, filepath: Path) -> Iterator[Tuple[str, str]]:
+        """(query, response) pairs from a plaintext NDJSON file, one line at a time"""
+        with open(filepath, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "query" in record:
+                    yield record["query"], record["response"]
+    
+    def load_fingerprint_file(self, filepath: Path) -> FingerprintSet:
+        """
+        Fingerprints from any supported file: chunked or Fernet-encrypted,
+        NDJSON, the plain queries/responses JSON, or OML's list of
+        {key, response} records
+        """
+        filepath = Path(filepath)
+        if is_chunked(filepath):
+            with self.open_chunked(filepath) as reader:
+                return reader.load_all()
+        if filepath.suffix in (".ndjson", ".jsonl"):
+            return FingerprintSet.from_pairs(self.iter_ndjson(filepath))
+        
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            data = self.load_encrypted(filepath)
+        
+        if isinstance(data, list):
+            return FingerprintSet.from_pairs((item.get("key", ""), item.get("response", "")) for item in data)
+        return FingerprintSet.from_dict(data)
+    
+    def open_chunked(self, filepath: Path) -> ChunkedFingerprintReader:
+        """Open a chunked file for partial reads (decrypts only the index)"""
+        return ChunkedFingerprintReader(filepath)
+    
+    def is_chunked(self, filepath: Path) -> bool:
+        return is_chunked(filepath)
+    
+    def migrate(self, source: Path, target: Path) -> int:
+        """Rewrite a legacy Fernet file in the chunked format"""
+        data = self.load_encrypted(source)
+        count = self.save_chunked(data, target)
+        logger.info(f"✅ Migrated {count} fingerprints from {source} to {target}")
+        return count
+    
     def load_encrypted(self, filepath: Path) -> Dict[str, Any]:
-        """Load and decrypt fingerprints"""
+        """Load and decrypt fingerprints (either format) into a dict"""
         try:
+            if is_chunked(filepath):
+                with self.open_chunked(filepath) as reader:
+                    queries = []
+                    responses = {}
+                    for query, response in reader.iter_pairs():
+                        queries.append(query)
+                        responses[query] = response
+                    return {"queries": queries, "responses": responses, "metadata": reader.metadata}
+            
             encrypted = filepath.read_bytes()
 
             decrypted = self.cipher.decrypt(encrypted)
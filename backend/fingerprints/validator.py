@@ -1,9 +1,8 @@
 from typing import Dict, Any, Optional
-from pathlib import Path
-import json
 
-from agent.config import settings
 from fingerprints.storage import FingerprintStorage
+from fingerprints.fingerprint_set import FingerprintSet
+from fingerprints.registry import MASTER, FingerprintRegistry, FingerprintSnapshot, get_registry
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -12,28 +11,49 @@ logger = get_logger(__name__)
 class FingerprintValidator:
     """Validates fingerprints against master dataset"""
     
-    def __init__(self):
+    def __init__(self, registry: Optional[FingerprintRegistry] = None):
         self.storage = FingerprintStorage()
+        self.registry = registry or get_registry()
+        # A set assigned here is served instead of the registry's master file
         self._master_fingerprints: Optional[Dict[str, Any]] = None
+        self._pinned: Optional[FingerprintSnapshot] = None
     
-    def get_master_fingerprints(self) -> Dict[str, Any]:
-        """Load and return master fingerprints"""
-        if self._master_fingerprints is None:
-            self._load_master_fingerprints()
-        return self._master_fingerprints
-    
-    def _load_master_fingerprints(self):
-        """Load master fingerprints from secure storage"""
-        fingerprint_file = settings.fingerprint_dir / settings.master_fingerprints_file
+    def snapshot(self) -> FingerprintSnapshot:
+        """
+        Current version of the master fingerprints.
         
-        if not fingerprint_file.exists():
-            logger.warning(f"⚠️ Master fingerprints not found: {fingerprint_file}")
-            self._master_fingerprints = {"queries": [], "responses": {}}
-            return
+        Callers that need a consistent view (an audit, a self-verification)
+        take one snapshot and use it throughout; reloads only affect later
+        snapshots.
+        """
+        if self._master_fingerprints is not None:
+            if self._pinned is None or self._pinned.fingerprints is not self._master_fingerprints:
+                self._pinned = FingerprintSnapshot(
+                    MASTER,
+                    0,
+                    fingerprints=FingerprintSet.from_dict(self._master_fingerprints)
+                )
+                self._master_fingerprints = self._pinned.fingerprints
+            return self._pinned
+        return self.registry.current(MASTER)
+    
+    def get_master_fingerprints(self) -> FingerprintSet:
+        """Load and return master fingerprints (one shared read-only copy)"""
+        return self.snapshot().fingerprints
+    
+    def count(self) -> int:
+        """Number of master fingerprints, without decrypting them if possible"""
+        return self.snapshot().count()
+    
+    def sample(self, k: int) -> FingerprintSet:
+        """
+        Random master fingerprints for an audit.
         
-        try:
-            self._master_fingerprints = self.storage.load_encrypted(fingerprint_file)
-            logger.info(f"✅ Loaded {len(self._master_fingerprints.get('queries', []))} master fingerprints")
-        except Exception as e:
-            logger.error(f"❌ Failed to load master fingerprints: {e}")
-            self._master_fingerprints = {"queries": [], "responses": {}}
\ No newline at end of file
+        Chunked files that are not fully loaded are read partially: only
+        the chunks holding the sampled fingerprints are decrypted.
+        """
+        return self.snapshot().sample(k)
+    
+    def head(self, k: int) -> FingerprintSet:
+        """The first `k` master fingerprints (a fixed, reproducible sample)"""
+        return self.snapshot().head(k)
@@ -7,6 +7,7 @@ import threading
 
 from agent.config import settings
 from utils.logger import get_logger
+from utils.metrics import MODEL_CACHE_EVENTS
 
 logger = get_logger(__name__)
 
@@ -32,8 +33,10 @@ class ModelCache:
                 item['last_accessed'] = time.time()
                 item['access_count'] += 1
                 logger.info(f"📦 Cache hit: {key}")
+                MODEL_CACHE_EVENTS.labels("model_cache", "hit").inc()
                 return item['data']
             logger.info(f"📦 Cache miss: {key}")
+            MODEL_CACHE_EVENTS.labels("model_cache", "miss").inc()
             return None
     
     def put(self, key: str, data: Any, size_mb: float = 0):
@@ -96,6 +99,7 @@ class ModelCache:
         """Evict item from cache"""
         item = self.cache.pop(key, None)
         if item:
+            MODEL_CACHE_EVENTS.labels("model_cache", "eviction").inc()
             logger.info(f"⏏️ Evicted from cache: {key} ({item['size_mb']:.1f} MB)")
     
     def _get_total_size(self) -> float:
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from agent.config import settings
+from utils.crypto import hash_model_identifier
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Files that ship alongside weights but never hold them
+NON_WEIGHT_FILES = {"training_args.bin", "optimizer.bin", "scheduler.bin"}
+
+# Files besides the weights that change what a loaded model produces
+METADATA_FILES = (
+    "config.json",
+    "generation_config.json",
+    "adapter_config.json",
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "special_tokens_map.json",
+    "added_tokens.json",
+    "vocab.json",
+    "merges.txt",
+    "tokenizer.model",
+)
+
+
+class ModelIdentityService:
+    """
+    Content-addressed model identity.
+
+    Weight shards are hashed as streams and combined into a single digest,
+    so the same weights under two paths share an identity and re-uploaded
+    weights under an old path get a new one. Config and tokenizer files are
+    part of the digest too, so the same weights with another tokenizer are
+    another model. Digests are cached by (path, size, mtime) and persisted
+    next to the model cache.
+    """
+
+    def __init__(
+        self,
+        cache_file: Optional[Path] = None,
+        max_workers: int = None,
+        chunk_size_mb: int = None
+    ):
+        self.cache_file = cache_file or settings.model_cache_dir / "identity_cache.json"
+        self.max_workers = max_workers or settings.identity_hash_workers
+        self.chunk_size = (chunk_size_mb or settings.identity_hash_chunk_mb) * 1024 * 1024
+        self.lock = threading.Lock()
+        self._digests: Dict[str, Dict] = {}
+        self._load_cache()
+
+    def get_identity(self, model_path: str) -> str:
+        """
+        Return the content identity of a model.
+
+        Falls back to a hash of the path string when no weight files can be
+        found locally (e.g. a Hub ID that has not been downloaded yet).
+        """
+        weight_files = self.list_weight_files(model_path)
+        if not weight_files:
+            return hash_model_identifier(model_path)
+
+        metadata_files = self.list_metadata_files(model_path)
+        digests = self.hash_files(weight_files + metadata_files)
+
+        # Sorted so that shard file names do not affect the identity
+        combined = hashlib.sha256()
+        for digest in sorted(digests[path] for path in weight_files):
+            combined.update(bytes.fromhex(digest))
+        # Metadata is named, since e.g. config.json and tokenizer.json are not interchangeable
+        for path in metadata_files:
+            combined.update(path.name.encode())
+            combined.update(bytes.fromhex(digests[path]))
+        return combined.hexdigest()[:32]
+
+    def list_weight_files(self, model_path: str) -> List[Path]:
+        """List weight shards for a model, preferring safetensors over bin"""
+        model_dir = self.resolve_local_dir(model_path)
+        if model_dir is None:
+            return []
+
+        if model_dir.is_file():
+            return [model_dir]
+
+        safetensors = sorted(model_dir.glob("*.safetensors"))
+        if safetensors:
+            return safetensors
+
+        return sorted(
+            p for p in model_dir.glob("*.bin")
+            if p.name not in NON_WEIGHT_FILES
+        )
+
+    def list_metadata_files(self, model_path: str) -> List[Path]:
+        """List the config and tokenizer files next to a model's weights"""
+        model_dir = self.resolve_local_dir(model_path)
+        if model_dir is None or not model_dir.is_dir():
+            return []
+        return [model_dir / name for name in METADATA_FILES if (model_dir / name).is_file()]
+
+    def resolve_local_dir(self, model_path: str, download: bool = False) -> Optional[Path]:
+        """
+        Map a local path or a Hub ID to a directory.
+
+        Hub IDs resolve only if already downloaded, unless `download` is set.
+        """
+        path = Path(model_path)
+        if path.exists():
+            return path
+
+        try:
+            from huggingface_hub import snapshot_download
+            return Path(snapshot_download(
+                model_path,
+                local_files_only=not download,
+                token=settings.hf_token
+            ))
+        except Exception:
+            return None
+
+    def hash_files(self, files: List[Path]) -> Dict[Path, str]:
+        """Hash files in parallel, reusing cached digests for unchanged files"""
+        results: Dict[Path, str] = {}
+        pending = []
+
+        for path in files:
+            cached = self._cached_digest(path)
+            if cached:
+                results[path] = cached
+            else:
+                pending.append(path)
+
+        if pending:
+            logger.info(f"🔏 Hashing {len(pending)} weight file(s)...")
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as pool:
+                for path, digest in zip(pending, pool.map(self._hash_file, pending)):
+                    results[path] = digest
+            self._save_cache()
+
+        return results
+
+    def _hash_file(self, path: Path) -> str:
+        """Stream a file through SHA-256 with large buffered reads"""
+        stat = path.stat()
+        hasher = hashlib.sha256()
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                hasher.update(view[:n])
+
+        digest = hasher.hexdigest()
+        with self.lock:
+            self._digests[str(path.resolve())] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest
+            }
+        return digest
+
+    def _cached_digest(self, path: Path) -> Optional[str]:
+        """Return the cached digest if the file is unchanged since hashing"""
+        stat = path.stat()
+        with self.lock:
+            entry = self._digests.get(str(path.resolve()))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        return None
+
+    def _load_cache(self):
+        """Load cached digests from disk"""
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file) as f:
+                    self._digests = json.load(f)
+                logger.info(f"📂 Loaded identity cache: {len(self._digests)} files")
+            except Exception as e:
+                logger.warning(f"Failed to load identity cache: {e}")
+
+    def _save_cache(self):
+        """Save cached digests to disk"""
+        try:
+            with self.lock:
+                snapshot = dict(self._digests)
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_file, 'w') as f:
+                json.dump(snapshot, f, indent=2)
+        except Exception as e:
+            logger.warning(f"Failed to save identity cache: {e}")
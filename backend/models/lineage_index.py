@@ -0,0 +1,232 @@
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from agent.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LineageIndex:
+    """
+    On-disk nearest-neighbor index of model signatures.
+
+    Signatures are fixed-size float32 vectors built from weight sketches,
+    which are deterministic per weights (fingerprint responses are not
+    used: audits sample them at random). Rows are appended to a raw
+    float32 file, entry metadata to a JSONL log, and an in-memory
+    random-hyperplane LSH over the rows keeps lookups sub-linear. Each
+    model identity owns one row; a re-audit overwrites it in place.
+    """
+
+    def __init__(self, index_dir: Optional[Path] = None):
+        self.index_dir = index_dir or settings.lineage_index_dir
+        self.dim = settings.lineage_sketch_dim
+        self.num_tables = settings.lineage_lsh_tables
+        self.num_bits = settings.lineage_lsh_bits
+
+        self.vectors_file = self.index_dir / "signatures.f32"
+        self.entries_file = self.index_dir / "entries.jsonl"
+        self.lock = threading.Lock()
+
+        # Hyperplanes are seeded so bucket codes stay stable across restarts
+        rng = np.random.default_rng(0)
+        self._planes = rng.standard_normal(
+            (self.num_tables, self.num_bits, self.dim)
+        ).astype(np.float32)
+        self._bit_weights = (1 << np.arange(self.num_bits)).astype(np.int64)
+
+        self._buffer = np.zeros((0, self.dim), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []
+        self._rows_by_identity: Dict[str, int] = {}
+        self._tables: List[Dict[int, List[int]]] = [defaultdict(list) for _ in range(self.num_tables)]
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build_signature(self, sketch: Optional[Dict[str, Dict[str, Any]]]) -> Optional[np.ndarray]:
+        """Build a unit-length signature from a weight sketch"""
+        signature = np.zeros(self.dim, dtype=np.float32)
+        for name, tensor_sketch in (sketch or {}).items():
+            sample = np.asarray(tensor_sketch.get("sample", []), dtype=np.float32)
+            if sample.size == 0 or sample.std() == 0:
+                continue
+            sample = (sample - sample.mean()) / sample.std()
+            # Feature hashing: each sampled coordinate maps to a fixed signed bucket
+            rng = np.random.default_rng(self._seed(name))
+            buckets = rng.integers(0, self.dim, size=sample.size)
+            signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=sample.size)
+            np.add.at(signature, buckets, sample * signs)
+
+        if not signature.any():
+            return None
+        return self._normalize(signature)
+
+    def add(self, identity: str, signature: np.ndarray, metadata: Dict[str, Any]):
+        """Add or replace the signature of a model identity"""
+        signature = np.asarray(signature, dtype=np.float32).reshape(self.dim)
+
+        with self.lock:
+            row = self._rows_by_identity.get(identity)
+            entry = {**metadata, "identity": identity, "indexed_at": time.time()}
+
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            if row is None:
+                row = len(self._entries)
+                self._entries.append(entry)
+                self._append_vector(signature)
+                self._rows_by_identity[identity] = row
+                with open(self.vectors_file, "ab") as f:
+                    f.write(signature.tobytes())
+            else:
+                self._remove_from_tables(row)
+                self._entries[row] = entry
+                self._vectors[row] = signature
+                with open(self.vectors_file, "r+b") as f:
+                    f.seek(row * self.dim * 4)
+                    f.write(signature.tobytes())
+
+            self._add_to_tables(row)
+            with open(self.entries_file, "a") as f:
+                f.write(json.dumps({**entry, "row": row}) + "\n")
+
+    def get_signature(self, identity: str) -> Optional[np.ndarray]:
+        with self.lock:
+            row = self._rows_by_identity.get(identity)
+            return None if row is None else self._vectors[row].copy()
+
+    def query(
+        self,
+        signature: np.ndarray,
+        k: int = 5,
+        exclude_identity: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the k most similar indexed models with cosine scores"""
+        signature = np.asarray(signature, dtype=np.float32).reshape(self.dim)
+
+        with self.lock:
+            if not self._entries:
+                return []
+
+            if len(self._entries) <= settings.lineage_exact_search_limit:
+                candidates = np.arange(len(self._entries))
+            else:
+                candidates = self._lsh_candidates(signature)
+                if len(candidates) < k:
+                    candidates = np.arange(len(self._entries))
+
+            scores = self._vectors[candidates] @ signature
+            order = np.argsort(-scores)
+
+            results = []
+            for position in order:
+                row = int(candidates[position])
+                entry = self._entries[row]
+                if entry["identity"] == exclude_identity:
+                    continue
+                results.append({**entry, "similarity": float(scores[position])})
+                if len(results) == k:
+                    break
+            return results
+
+    @property
+    def _vectors(self) -> np.ndarray:
+        return self._buffer[:len(self._entries)]
+
+    def _append_vector(self, signature: np.ndarray):
+        """Append a row, growing the buffer geometrically"""
+        row = len(self._entries) - 1
+        if row >= len(self._buffer):
+            grown = np.zeros((max(64, 2 * len(self._buffer)), self.dim), dtype=np.float32)
+            grown[:len(self._buffer)] = self._buffer
+            self._buffer = grown
+        self._buffer[row] = signature
+
+    def _lsh_candidates(self, signature: np.ndarray) -> np.ndarray:
+        """Union of exact and one-bit-flip buckets across all tables"""
+        rows = set()
+        for table, code in zip(self._tables, self._codes(signature[None, :])[:, 0]):
+            rows.update(table.get(int(code), ()))
+            for bit in self._bit_weights:
+                rows.update(table.get(int(code ^ bit), ()))
+        return np.fromiter(rows, dtype=np.int64)
+
+    def _codes(self, vectors: np.ndarray) -> np.ndarray:
+        """LSH bucket codes, shape (tables, rows)"""
+        bits = np.einsum("tbd,nd->tnb", self._planes, vectors) > 0
+        return bits.astype(np.int64) @ self._bit_weights
+
+    def _add_to_tables(self, row: int):
+        for table, code in zip(self._tables, self._codes(self._vectors[row][None, :])[:, 0]):
+            table[int(code)].append(row)
+
+    def _remove_from_tables(self, row: int):
+        for table, code in zip(self._tables, self._codes(self._vectors[row][None, :])[:, 0]):
+            bucket = table.get(int(code), [])
+            if row in bucket:
+                bucket.remove(row)
+
+    def _load(self):
+        """Load signatures and entries from disk and rebuild the LSH tables"""
+        if not self.entries_file.exists() or not self.vectors_file.exists():
+            return
+
+        vectors = np.fromfile(self.vectors_file, dtype=np.float32)
+        if vectors.size % self.dim:
+            logger.warning(f"Lineage index signatures are not {self.dim}-dimensional, starting a new index")
+            return
+        vectors = vectors.reshape(-1, self.dim)
+
+        # Later lines for a row supersede earlier ones (re-audits)
+        entries: Dict[int, Dict[str, Any]] = {}
+        with open(self.entries_file) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    row = entry.pop("row")
+                    if isinstance(row, int) and 0 <= row < len(vectors) and isinstance(entry["identity"], str):
+                        entries[row] = entry
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue
+
+        rows = sorted(entries)
+        self._buffer = vectors[rows].copy()
+        self._entries = [entries[row] for row in rows]
+        self._rows_by_identity = {e["identity"]: row for row, e in enumerate(self._entries)}
+
+        if rows != list(range(len(vectors))):
+            skipped = len(vectors) - len(rows)
+            logger.warning(f"⚠️ Skipped {skipped} unreadable lineage index row(s)")
+            self._rewrite()
+
+        if self._entries:
+            codes = self._codes(self._vectors)
+            for table, table_codes in zip(self._tables, codes):
+                for row, code in enumerate(table_codes):
+                    table[int(code)].append(row)
+
+        logger.info(f"📂 Loaded lineage index: {len(self._entries)} models")
+
+    def _rewrite(self):
+        """Write the loaded rows back compacted, so appended rows line up again"""
+        self._vectors.tofile(self.vectors_file)
+        with open(self.entries_file, "w") as f:
+            for row, entry in enumerate(self._entries):
+                f.write(json.dumps({**entry, "row": row}) + "\n")
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    @staticmethod
+    def _seed(text: str) -> int:
+        return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
@@ -1,70 +1,382 @@
+import asyncio
+import math
+import threading
+
+import psutil
 import torch
 from transformers import AutoModelForCausalLM, AutoTokenizer
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Any, Optional
 from pathlib import Path
+from collections import OrderedDict
+import json
 import gc
 
 from agent.config import settings
+from models.identity import ModelIdentityService
+from models.tensor_store import TensorStore
 from utils.logger import get_logger
+from utils.metrics import AUDIT_STAGE_SECONDS, MODEL_CACHE_EVENTS
 
 logger = get_logger(__name__)
 
+# Weight precisions; CPU matmuls in reduced precision accumulate in fp32
+DTYPES = {
+    "fp32": torch.float32,
+    "bf16": torch.bfloat16,
+    "fp16": torch.float16
+}
+
 
 class ModelLoader:
     def __init__(self):
-        self._model_cache: Dict[str, Tuple] = {}
+        self._model_cache: OrderedDict[str, Tuple] = OrderedDict()
+        # PeftModel per base, keyed by its tensor store key; in-flight users per adapter
+        self._adapter_bases: OrderedDict[str, Tuple] = OrderedDict()
+        self._adapter_refs: Dict[str, Dict[str, int]] = {}
         self._device = "cpu"
+        self.identity = ModelIdentityService()
+        self.tensor_store = TensorStore()
+        self.max_bytes = settings.model_cache_size_gb * 1024**3
+        # Weights are read on worker threads; one load at a time
+        self._load_lock = threading.Lock()
         logger.info("💻 ModelLoader initialized (CPU mode)")
         
-    async def load_model(self, model_path: str, is_guardian_model: bool = False):
-        cache_key = f"{model_path}_{is_guardian_model}"
+    def resolve_path(self, model_path: str, is_guardian_model: bool = False) -> str:
+        if is_guardian_model:
+            actual_path = str(settings.model_cache_dir / "guardian_model")
+            if not Path(actual_path).exists():
+                logger.warning("⚠️ Guardian model not found, using base model")
+                actual_path = settings.base_model_name
+            return actual_path
+        return model_path
+    
+    def get_cache_key(
+        self,
+        model_path: str,
+        is_guardian_model: bool = False,
+        precision: str = "fp32"
+    ) -> str:
+        actual_path = self.resolve_path(model_path, is_guardian_model)
+        return self._cache_key(actual_path, is_guardian_model, precision)
+    
+    def _cache_key(self, actual_path: str, is_guardian_model: bool, precision: str = "fp32") -> str:
+        # Keyed by content identity so aliases of the same weights share an entry.
+        # Identity reads weight shards: async callers run this on a worker thread
+        identity = self.identity.get_identity(self.resolve_snapshot(actual_path))
+        if precision != "fp32":
+            identity = f"{identity}_{precision}"
+        return f"{identity}_{is_guardian_model}"
+        
+    def resolve_snapshot(self, actual_path: str) -> str:
+        """
+        Local directory of a model, downloading a Hub snapshot first if needed.
+        
+        Identities are taken from the resolved directory, so a Hub ID gets
+        the same identity before and after its first load.
+        """
+        local_dir = self.identity.resolve_local_dir(actual_path, download=True)
+        return str(local_dir) if local_dir is not None else actual_path
+    
+    def model_identity(self, model_path: str) -> str:
+        """Content identity of a model (blocking: may download and hash weights)"""
+        return self.identity.get_identity(self.resolve_snapshot(model_path))
+    
+    def should_offload(self, model_path: str, precision: str = "fp32") -> bool:
+        """Whether a model's weights at `precision` are too large to hold in the memory cap"""
+        if settings.offload_mode == "always":
+            return True
+        if settings.offload_mode != "auto":
+            return False
+        
+        return self.weight_bytes(model_path, DTYPES[precision]) > self.offload_memory_cap()
+    
+    def offload_memory_cap(self) -> int:
+        """Bytes of weights an offloaded model may keep in RAM"""
+        if settings.offload_max_memory_gb is not None:
+            return int(settings.offload_max_memory_gb * 1024**3)
+        return int(psutil.virtual_memory().available * settings.offload_memory_fraction)
+    
+    def weight_bytes(self, model_path: str, dtype: torch.dtype = torch.float32) -> int:
+        """Size of a model's weights once loaded as `dtype`, from shard headers (nothing is read in full)"""
+        element_size = torch.finfo(dtype).bits // 8
+        elements = 0
+        for path in self.identity.list_weight_files(model_path):
+            if path.suffix == ".safetensors":
+                from safetensors import safe_open
+                with safe_open(str(path), framework="pt") as f:
+                    elements += sum(math.prod(f.get_slice(name).get_shape()) for name in f.keys())
+            else:
+                state_dict = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+                elements += sum(tensor.numel() for tensor in state_dict.values())
+                del state_dict
+        return elements * element_size
+        
+    async def load_model(
+        self,
+        model_path: str,
+        is_guardian_model: bool = False,
+        offload: Optional[bool] = None,
+        precision: str = "fp32"
+    ):
+        if precision not in DTYPES:
+            raise ValueError(f"Unknown precision: {precision}")
+        
+        actual_path = await asyncio.to_thread(self.resolve_snapshot, self.resolve_path(model_path, is_guardian_model))
+        
+        if offload is None:
+            offload = not is_guardian_model and await asyncio.to_thread(self.should_offload, actual_path, precision)
+        if offload:
+            return await asyncio.to_thread(self._load_offloaded, model_path, actual_path, precision)
+        
+        cache_key = await asyncio.to_thread(self._cache_key, actual_path, is_guardian_model, precision)
         
         if cache_key in self._model_cache:
             logger.info(f"📦 Cache hit: {model_path}")
+            MODEL_CACHE_EVENTS.labels("model_loader", "hit").inc()
+            self._model_cache.move_to_end(cache_key)
             return self._model_cache[cache_key]
         
-        logger.info(f"🔄 Loading model: {model_path}")
+        logger.info(f"🔄 Loading model: {model_path} ({precision})")
+        MODEL_CACHE_EVENTS.labels("model_loader", "miss").inc()
         
         try:
-            if is_guardian_model:
-                actual_path = str(settings.model_cache_dir / "guardian_model")
-                if not Path(actual_path).exists():
-                    logger.warning("⚠️ Guardian model not found, using base model")
-                    actual_path = settings.base_model_name
-            else:
-                actual_path = model_path
-            
-            tokenizer = AutoTokenizer.from_pretrained(
-                actual_path,
-                trust_remote_code=True,
-                token=settings.hf_token
-            )
+            model, tokenizer = await asyncio.to_thread(self._load_and_cache, cache_key, actual_path, precision)
+            logger.info(f"✅ Model loaded: {model_path}")
             
-            if tokenizer.pad_token is None:
-                tokenizer.pad_token = tokenizer.eos_token
+            return model, tokenizer
             
-            model = AutoModelForCausalLM.from_pretrained(
-                actual_path,
-                trust_remote_code=True,
-                token=settings.hf_token,
-                torch_dtype=torch.float32,
-                low_cpu_mem_usage=True
-            )
+        except Exception as e:
+            logger.error(f"❌ Failed to load model: {e}")
+            raise
+    
+    def _load_and_cache(self, cache_key: str, actual_path: str, precision: str) -> Tuple[Any, Any]:
+        with self._load_lock:
+            # A concurrent request may have loaded it while this one waited
+            if cache_key in self._model_cache:
+                return self._model_cache[cache_key]
             
-            model.eval()
+            model, tokenizer = self._from_pretrained(actual_path, dtype=DTYPES[precision])
             
+            self.tensor_store.register(cache_key, model)
             self._model_cache[cache_key] = (model, tokenizer)
-            logger.info(f"✅ Model loaded: {model_path}")
+            self._evict_to_fit(keep=cache_key)
+            return model, tokenizer
+    
+    def _load_offloaded(
+        self,
+        model_path: str,
+        actual_path: str,
+        precision: str = "fp32"
+    ) -> Tuple[Any, Any]:
+        """
+        Load with weights that do not fit the memory cap left on disk.
+        
+        Offloaded models are not cached: their layers are streamed from disk
+        on every forward pass, so holding them buys little.
+        """
+        logger.info(f"💽 Loading model with disk offload: {model_path}")
+        
+        try:
+            offload_folder = settings.offload_folder / self.identity.get_identity(actual_path)
+            offload_folder.mkdir(parents=True, exist_ok=True)
+            
+            model, tokenizer = self._from_pretrained(
+                actual_path,
+                dtype=DTYPES[precision],
+                device_map="auto",
+                max_memory={"cpu": self.offload_memory_cap()},
+                offload_folder=str(offload_folder)
+            )
+            logger.info(f"✅ Model loaded with offload: {model_path}")
             
             return model, tokenizer
             
         except Exception as e:
-            logger.error(f"❌ Failed to load model: {e}")
+            logger.error(f"❌ Failed to load model with offload: {e}")
             raise
     
-    async def unload_model(self, model_path: str):
-        cache_key = f"{model_path}_False"
+    def detect_adapter(self, model_path: str) -> Optional[Dict[str, Any]]:
+        """Return the adapter config if `model_path` is a LoRA/PEFT adapter"""
+        local_dir = self.identity.resolve_local_dir(model_path)
+        if local_dir is None or not local_dir.is_dir():
+            return None
+        
+        config_file = local_dir / "adapter_config.json"
+        if not config_file.exists():
+            return None
+        
+        with open(config_file) as f:
+            return json.load(f)
+    
+    async def load_adapter(self, model_path: str) -> Tuple[Any, Any, str]:
+        """
+        Attach an adapter to its resident base model.
+        
+        The base model is loaded once per base identity and wrapped in a
+        PeftModel; further adapters on the same base are hot-loaded next to
+        it. Callers select the adapter per row with `adapter_names`. Every
+        call holds a reference to the adapter until `unload_adapter`.
+        
+        Returns:
+            (peft_model, tokenizer, adapter_name)
+        """
+        adapter_config, base_key, adapter_name = await asyncio.to_thread(self._adapter_keys, model_path)
+        if adapter_config is None:
+            raise ValueError(f"Not an adapter: {model_path}")
+        
+        base_path = adapter_config["base_model_name_or_path"]
+        peft_model, tokenizer = await asyncio.to_thread(
+            self._attach_adapter,
+            base_key,
+            base_path,
+            model_path,
+            adapter_name
+        )
+        
+        logger.info(f"🧩 Adapter attached: {model_path} (base {base_path})")
+        return peft_model, tokenizer, adapter_name
+    
+    def _attach_adapter(self, base_key: str, base_path: str, model_path: str, adapter_name: str) -> Tuple[Any, Any]:
+        from peft import PeftModel
+        
+        # One base load per key, even for concurrent first audits
+        with self._load_lock:
+            if base_key not in self._adapter_bases:
+                logger.info(f"🔄 Loading adapter base model: {base_path}")
+                MODEL_CACHE_EVENTS.labels("adapter_base", "miss").inc()
+                base_model, tokenizer = self._from_pretrained(base_path)
+                # Base weights may be shared with cached full fine-tunes of the same base
+                self.tensor_store.register(base_key, base_model)
+                peft_model = PeftModel.from_pretrained(base_model, model_path, adapter_name=adapter_name)
+                peft_model.eval()
+                self._adapter_bases[base_key] = (peft_model, tokenizer)
+                self._evict_to_fit(keep=base_key)
+            else:
+                MODEL_CACHE_EVENTS.labels("adapter_base", "hit").inc()
+                self._adapter_bases.move_to_end(base_key)
+                peft_model, tokenizer = self._adapter_bases[base_key]
+                if adapter_name not in peft_model.peft_config:
+                    peft_model.load_adapter(model_path, adapter_name=adapter_name)
+                    peft_model.eval()
+            
+            refs = self._adapter_refs.setdefault(base_key, {})
+            refs[adapter_name] = refs.get(adapter_name, 0) + 1
+            return peft_model, tokenizer
+    
+    async def unload_adapter(self, model_path: str):
+        """Release an adapter; it is detached once no audit holds it, keeping its base resident"""
+        adapter_config, base_key, adapter_name = await asyncio.to_thread(self._adapter_keys, model_path)
+        if adapter_config is None:
+            return
+        
+        if await asyncio.to_thread(self._release_adapter, base_key, adapter_name):
+            logger.info(f"🗑️ Adapter detached: {model_path}")
+    
+    def _release_adapter(self, base_key: str, adapter_name: str) -> bool:
+        """Drop one reference; True if the adapter was detached"""
+        with self._load_lock:
+            refs = self._adapter_refs.get(base_key, {})
+            if refs.get(adapter_name, 0) > 1:
+                refs[adapter_name] -= 1
+                return False
+            
+            refs.pop(adapter_name, None)
+            if not refs:
+                self._adapter_refs.pop(base_key, None)
+            
+            if base_key not in self._adapter_bases:
+                return False
+            peft_model, _ = self._adapter_bases[base_key]
+            if adapter_name not in peft_model.peft_config:
+                return False
+            peft_model.delete_adapter(adapter_name)
+            return True
+    
+    def _adapter_keys(self, model_path: str) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+        """(adapter config, base tensor store key, adapter name), or Nones if not an adapter"""
+        adapter_config = self.detect_adapter(model_path)
+        if adapter_config is None:
+            return None, None, None
+        base_key = f"adapter-base:{self._cache_key(adapter_config['base_model_name_or_path'], False)}"
+        return adapter_config, base_key, self.get_adapter_name(model_path)
+    
+    def get_adapter_name(self, model_path: str) -> str:
+        # Content-addressed, so aliases of one adapter are loaded once
+        return f"adapter_{self.model_identity(model_path)}"
+    
+    def _from_pretrained(
+        self,
+        actual_path: str,
+        dtype: torch.dtype = torch.float32,
+        **model_kwargs
+    ) -> Tuple[Any, Any]:
+        with AUDIT_STAGE_SECONDS.labels("model_load").time():
+            return self._read_pretrained(actual_path, dtype, **model_kwargs)
+    
+    def _read_pretrained(
+        self,
+        actual_path: str,
+        dtype: torch.dtype,
+        **model_kwargs
+    ) -> Tuple[Any, Any]:
+        tokenizer = AutoTokenizer.from_pretrained(
+            actual_path,
+            trust_remote_code=True,
+            token=settings.hf_token
+        )
+        
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        
+        # Decoder-only batches are padded on the left so prompts end together
+        tokenizer.padding_side = "left"
+        
+        model = AutoModelForCausalLM.from_pretrained(
+            actual_path,
+            trust_remote_code=True,
+            token=settings.hf_token,
+            torch_dtype=dtype,
+            low_cpu_mem_usage=True,
+            **model_kwargs
+        )
+        
+        model.eval()
+        return model, tokenizer
+    
+    async def unload_model(self, model_path: str, precision: str = "fp32"):
+        cache_key = await asyncio.to_thread(self.get_cache_key, model_path, precision=precision)
         if cache_key in self._model_cache:
             del self._model_cache[cache_key]
+            self.tensor_store.release(cache_key)
+            gc.collect()
+            logger.info(f"🗑️ Unloaded: {model_path}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Resident model statistics"""
+        return {
+            'resident_models': len(self._model_cache),
+            'adapter_bases': len(self._adapter_bases),
+            'resident_bytes': self.tensor_store.total_bytes(),
+            'logical_bytes': self.tensor_store.logical_bytes(),
+            'max_bytes': self.max_bytes
+        }
+    
+    def _evict_to_fit(self, keep: str):
+        """Evict least recently used models, then idle adapter bases, until shared bytes fit the budget"""
+        while self.tensor_store.total_bytes() > self.max_bytes:
+            # The guardian model (key suffix _True) and bases with adapters in use stay resident
+            evictable = [key for key in self._model_cache if key != keep and not key.endswith("_True")]
+            evictable += [key for key in self._adapter_bases if key != keep and not self._adapter_refs.get(key)]
+            if not evictable:
+                break
+            evicted_key = evictable[0]
+            if evicted_key in self._model_cache:
+                del self._model_cache[evicted_key]
+                cache = "model_loader"
+            else:
+                del self._adapter_bases[evicted_key]
+                cache = "adapter_base"
+            self.tensor_store.release(evicted_key)
             gc.collect()
-            logger.info(f"🗑️ Unloaded: {model_path}")
\ No newline at end of file
+            MODEL_CACHE_EVENTS.labels(cache, "eviction").inc()
+            logger.info(f"⏏️ Evicted model: {evicted_key}")
\ No newline at end of file
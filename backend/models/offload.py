@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from torch import nn
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROC_IO = Path("/proc/self/io")
+
+
+def is_offloaded(model: nn.Module) -> bool:
+    """True when accelerate placed part of the model on disk or CPU offload"""
+    device_map = getattr(model, "hf_device_map", None) or {}
+    return "disk" in device_map.values()
+
+
+def read_disk_bytes() -> Optional[int]:
+    """Bytes this process has fetched from storage, where the OS reports it"""
+    try:
+        for line in PROC_IO.read_text().splitlines():
+            if line.startswith("read_bytes:"):
+                return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class OffloadMeter:
+    """
+    Counts the weight bytes an offloaded model streams in per forward pass.
+
+    accelerate keeps offloaded parameters on the meta device and loads them
+    in a hook right before each module runs, so the meta shapes give the
+    exact bytes fetched. Every decode step streams the offloaded weights
+    once for the whole batch, which is why offloaded audits use large
+    batches: the read cost per fingerprint falls with batch size.
+    """
+
+    def __init__(self, model: nn.Module):
+        self.weight_bytes = 0
+        self.forward_passes = 0
+        self._disk_start = read_disk_bytes()
+        self._handles = []
+
+        for module in model.modules():
+            hook = getattr(module, "_hf_hook", None)
+            if hook is None or not getattr(hook, "offload", False):
+                continue
+            recurse = getattr(hook, "place_submodules", False)
+            size = sum(
+                param.numel() * param.element_size()
+                for param in module.parameters(recurse=recurse)
+            )
+            if size:
+                self._handles.append(module.register_forward_pre_hook(self._counter(size)))
+
+        # The root module runs once per forward pass
+        self._handles.append(model.register_forward_pre_hook(self._count_pass))
+
+    def _counter(self, size: int):
+        def count(module, args):
+            self.weight_bytes += size
+        return count
+
+    def _count_pass(self, module, args):
+        self.forward_passes += 1
+
+    def stats(self, fingerprints: int) -> Dict[str, Any]:
+        """Read totals for an audit of `fingerprints` queries"""
+        disk_end = read_disk_bytes()
+        disk_bytes = (
+            disk_end - self._disk_start
+            if disk_end is not None and self._disk_start is not None
+            else None
+        )
+        return {
+            "weight_bytes_read": self.weight_bytes,
+            "disk_bytes_read": disk_bytes,
+            "forward_passes": self.forward_passes,
+            "bytes_per_fingerprint": self.weight_bytes / fingerprints if fingerprints else None
+        }
+
+    def close(self):
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
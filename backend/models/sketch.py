@@ -0,0 +1,185 @@
+import hashlib
+import json
+import math
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import torch
+
+from agent.config import settings
+from models.identity import ModelIdentityService
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Wrappers that fine-tuning and export tools add in front of tensor names
+NAME_PREFIXES = ("base_model.model.", "model.", "transformer.")
+
+
+class WeightSketcher:
+    """
+    Compact per-tensor weight sketches streamed from checkpoint shards.
+
+    Each matrix is sketched by a seeded sample of rows and columns, read
+    through lazy shard slices so only those rows are touched on disk. The
+    seed depends on the tensor name and shape, so two checkpoints of the
+    same architecture sample the same coordinates and their sketches can be
+    correlated directly. Fine-tuned derivatives keep near-perfect
+    correlation with their base; independently trained models do not.
+    """
+
+    def __init__(
+        self,
+        identity: ModelIdentityService,
+        sketch_dir: Optional[Path] = None,
+        rows: int = None,
+        cols: int = None
+    ):
+        self.identity = identity
+        self.sketch_dir = sketch_dir or settings.model_cache_dir / "sketches"
+        self.rows = rows or settings.sketch_rows
+        self.cols = cols or settings.sketch_cols
+
+    def sketch(self, model_path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Sketch every tensor of a model, cached by model identity.
+
+        Returns None when no weight files are available locally.
+        """
+        weight_files = self.identity.list_weight_files(model_path)
+        if not weight_files:
+            return None
+
+        identity = self.identity.get_identity(model_path)
+        cache_file = self.sketch_dir / f"{identity}_{self.rows}x{self.cols}.json"
+        if cache_file.exists():
+            try:
+                with open(cache_file) as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load cached sketch: {e}")
+
+        sketches = {}
+        for name, shape, lazy in self._iter_tensors(weight_files):
+            sketches[self._canonical_name(name)] = self._sketch_tensor(name, shape, lazy)
+
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'w') as f:
+                json.dump(sketches, f)
+        except Exception as e:
+            logger.warning(f"Failed to save sketch: {e}")
+
+        logger.info(f"✏️ Sketched {len(sketches)} tensors of {model_path}")
+        return sketches
+
+    def compare(
+        self,
+        reference: Dict[str, Dict[str, Any]],
+        candidate: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Estimate how likely `candidate` derives from `reference`.
+
+        Matrices with the same name and shape are correlated through their
+        sampled coordinates; vectors (norm and bias weights) contribute a
+        norm agreement score.
+        """
+        correlations = []
+        norm_agreements = []
+
+        for name, ref in reference.items():
+            cand = candidate.get(name)
+            if cand is None or cand["shape"] != ref["shape"]:
+                continue
+
+            if len(ref["shape"]) >= 2:
+                correlations.append(max(0.0, self._correlation(ref["sample"], cand["sample"])))
+            else:
+                largest = max(ref["norm"], cand["norm"])
+                if largest > 0:
+                    norm_agreements.append(1 - abs(ref["norm"] - cand["norm"]) / largest)
+
+        likelihood = sum(correlations) / len(correlations) if correlations else 0.0
+
+        return {
+            "likelihood": likelihood,
+            "compared_tensors": len(correlations),
+            "reference_tensors": len(reference),
+            "candidate_tensors": len(candidate),
+            "norm_agreement": (
+                sum(norm_agreements) / len(norm_agreements) if norm_agreements else None
+            )
+        }
+
+    def _iter_tensors(self, weight_files) -> Iterator[Tuple[str, list, Any]]:
+        """Yield (name, shape, row reader) without materializing full tensors"""
+        for path in weight_files:
+            if path.suffix == ".safetensors":
+                from safetensors import safe_open
+                with safe_open(str(path), framework="pt") as f:
+                    for name in f.keys():
+                        lazy = f.get_slice(name)
+                        yield name, list(lazy.get_shape()), lazy
+            else:
+                state_dict = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+                for name, tensor in state_dict.items():
+                    yield name, list(tensor.shape), tensor
+                del state_dict
+
+    def _sketch_tensor(self, name: str, shape: list, lazy) -> Dict[str, Any]:
+        generator = torch.Generator().manual_seed(self._seed(name, shape))
+
+        if len(shape) < 2:
+            values = lazy[:].to(torch.float32).reshape(-1)
+            return {
+                "shape": shape,
+                "norm": float(torch.linalg.vector_norm(values)),
+            }
+
+        row_count = min(self.rows, shape[0])
+        row_numel = math.prod(shape[1:])
+        col_count = min(self.cols, row_numel)
+
+        rows = torch.randperm(shape[0], generator=generator)[:row_count].sort().values
+        cols = torch.randperm(row_numel, generator=generator)[:col_count]
+
+        sample = []
+        row_norms = []
+        for row in rows.tolist():
+            values = lazy[row:row + 1].to(torch.float32).reshape(-1)
+            sample.extend(values[cols].tolist())
+            row_norms.append(float(torch.linalg.vector_norm(values)))
+
+        return {
+            "shape": shape,
+            "sample": sample,
+            "row_norms": row_norms
+        }
+
+    @staticmethod
+    def _correlation(a: list, b: list) -> float:
+        """Pearson correlation of two equally sampled sketches"""
+        x = torch.tensor(a, dtype=torch.float64)
+        y = torch.tensor(b, dtype=torch.float64)
+        x = x - x.mean()
+        y = y - y.mean()
+        denominator = float(torch.linalg.vector_norm(x) * torch.linalg.vector_norm(y))
+        if denominator == 0:
+            return 0.0
+        return float(torch.dot(x, y)) / denominator
+
+    @staticmethod
+    def _canonical_name(name: str) -> str:
+        stripped = True
+        while stripped:
+            stripped = False
+            for prefix in NAME_PREFIXES:
+                if name.startswith(prefix):
+                    name = name[len(prefix):]
+                    stripped = True
+        return name
+
+    def _seed(self, name: str, shape: list) -> int:
+        key = f"{self._canonical_name(name)}:{shape}".encode()
+        return int.from_bytes(hashlib.sha256(key).digest()[:8], "little") & (2**63 - 1)
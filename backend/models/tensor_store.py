@@ -0,0 +1,185 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Set, List, Tuple
+
+import torch
+from torch import nn
+
+from agent.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TensorStore:
+    """
+    Content-addressed store for the tensors of cached models.
+
+    Every parameter and buffer is hashed on registration. When an identical
+    tensor is already held for another model, the new model is re-pointed at
+    the stored copy and its own copy is dropped, so layers that fine-tuning
+    left untouched are kept in memory once. Sizes are charged per distinct
+    tensor, not per model.
+
+    Shared tensors are read-only by convention only; writes are not
+    intercepted. Cached models are only ever run under `torch.no_grad()`
+    (fine-tuning happens in OML subprocesses), so nothing calls
+    `materialize()` today, but code that mutates a cached model's weights
+    in place must call it first or it silently changes every model
+    sharing them.
+    """
+
+    def __init__(self, dedup: bool = None, max_workers: int = None):
+        self.dedup = settings.tensor_dedup_enabled if dedup is None else dedup
+        self.max_workers = max_workers or settings.identity_hash_workers
+        self.lock = threading.Lock()
+        self._tensors: Dict[str, torch.Tensor] = {}
+        self._owners: Dict[str, Set[str]] = {}
+        self._owned: Dict[str, Set[str]] = {}
+        self._logical_bytes: Dict[str, int] = {}
+
+    def register(self, owner: str, model: nn.Module) -> int:
+        """
+        Register a model's tensors, sharing any already stored.
+
+        Returns:
+            Bytes newly charged for this model (its unshared tensors)
+        """
+        slots = self._tensor_slots(model)
+        unique = {id(tensor): tensor for _, _, _, tensor in slots}
+        digests = self._digest_all(list(unique.values()))
+
+        charged = 0
+        replacements: Dict[int, torch.Tensor] = {}
+
+        with self.lock:
+            owned = self._owned.setdefault(owner, set())
+            for tensor_id, tensor in unique.items():
+                digest = digests[tensor_id]
+                stored = self._tensors.get(digest)
+                if stored is None:
+                    self._tensors[digest] = tensor.detach()
+                    charged += tensor.nbytes
+                elif stored.data_ptr() != tensor.data_ptr():
+                    replacements[tensor_id] = stored
+                self._owners.setdefault(digest, set()).add(owner)
+                owned.add(digest)
+            self._logical_bytes[owner] = sum(t.nbytes for t in unique.values())
+
+        self._repoint(slots, replacements)
+
+        logger.info(
+            f"🧱 Registered {len(unique)} tensors for {owner}: "
+            f"{charged / 1024**2:.1f} MB new, {len(replacements)} shared"
+        )
+        return charged
+
+    def release(self, owner: str):
+        """Drop a model's references; tensors no other model uses are freed"""
+        with self.lock:
+            for digest in self._owned.pop(owner, set()):
+                owners = self._owners.get(digest)
+                if owners is None:
+                    continue
+                owners.discard(owner)
+                if not owners:
+                    del self._owners[digest]
+                    del self._tensors[digest]
+            self._logical_bytes.pop(owner, None)
+
+    def materialize(self, owner: str, model: nn.Module):
+        """
+        Copy-on-write: give `owner` private copies of every tensor it
+        shares with other models, so it can be modified in place. The
+        copies are charged to `owner` and freed on its release.
+        """
+        slots = self._tensor_slots(model)
+        replacements = {}
+
+        with self.lock:
+            owned = self._owned.setdefault(owner, set())
+            shared = {
+                digest for digest in owned
+                if len(self._owners.get(digest, ())) > 1
+            }
+            shared_digests = {self._tensors[digest].data_ptr(): digest for digest in shared}
+
+            for _, _, _, tensor in slots:
+                digest = shared_digests.get(tensor.data_ptr())
+                if digest is None or id(tensor) in replacements:
+                    continue
+                copy = tensor.detach().clone()
+                # Private copies never dedup, so they get a key of their own
+                private = f"{digest}:{owner}:{len(replacements)}"
+                self._tensors[private] = copy
+                self._owners[private] = {owner}
+                owned.add(private)
+                replacements[id(tensor)] = copy
+
+            for digest in shared:
+                self._owners[digest].discard(owner)
+                owned.discard(digest)
+
+        self._repoint(slots, replacements)
+
+    def total_bytes(self) -> int:
+        """Bytes held, each distinct tensor counted once"""
+        with self.lock:
+            return sum(t.nbytes for t in self._tensors.values())
+
+    def logical_bytes(self) -> int:
+        """Bytes the registered models would take without sharing"""
+        with self.lock:
+            return sum(self._logical_bytes.values())
+
+    def _digest_all(self, tensors: List[torch.Tensor]) -> Dict[int, str]:
+        if not self.dedup:
+            # Without dedup every tensor is its own entry
+            return {id(t): f"{id(t)}:{t.data_ptr()}" for t in tensors}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            digests = pool.map(self._digest, tensors)
+            return {id(t): digest for t, digest in zip(tensors, digests)}
+
+    @staticmethod
+    def _digest(tensor: torch.Tensor) -> str:
+        tensor = tensor.detach().cpu().contiguous()
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(f"{tensor.dtype}:{tuple(tensor.shape)}:".encode())
+        if tensor.numel():
+            hasher.update(tensor.reshape(-1).view(torch.uint8).numpy())
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _tensor_slots(model: nn.Module) -> List[Tuple[nn.Module, str, bool, torch.Tensor]]:
+        """(module, attribute, is_parameter, tensor) for every weight slot"""
+        slots = []
+        for module in model.modules():
+            for name, param in module._parameters.items():
+                if param is not None:
+                    slots.append((module, name, True, param))
+            for name, buffer in module._buffers.items():
+                if buffer is not None:
+                    slots.append((module, name, False, buffer))
+        return slots
+
+    @staticmethod
+    def _repoint(slots, replacements: Dict[int, torch.Tensor]):
+        """Point slots at replacement storage, keeping tied weights tied"""
+        if not replacements:
+            return
+
+        new_objects: Dict[int, torch.Tensor] = {}
+        for module, name, is_parameter, tensor in slots:
+            replacement = replacements.get(id(tensor))
+            if replacement is None:
+                continue
+            if id(tensor) not in new_objects:
+                new_objects[id(tensor)] = (
+                    nn.Parameter(replacement, requires_grad=False) if is_parameter else replacement
+                )
+            if is_parameter:
+                module._parameters[name] = new_objects[id(tensor)]
+            else:
+                module._buffers[name] = new_objects[id(tensor)]
@@ -81,7 +81,7 @@ def main():
     
     storage = FingerprintStorage()
     encrypted_path = settings.fingerprint_dir / settings.master_fingerprints_file
-    storage.save_encrypted(fingerprints, encrypted_path)
+    storage.save_chunked(fingerprints, encrypted_path)
     
     logger.info("✅ Guardian setup complete!")
     logger.info(f"Model: {guardian_model_path}")
@@ -5,10 +5,28 @@ from pathlib import Path
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
-from agent.config import Settings
+from agent.config import Settings, settings
 from agent.provenance_guardian import ProvenanceGuardian
 
 
+@pytest.fixture(autouse=True)
+def isolated_data_dirs(tmp_path_factory, monkeypatch):
+    """Keep caches, indexes and artifacts written by tests out of ./data"""
+    data_dir = tmp_path_factory.mktemp("data")
+    monkeypatch.setattr(settings, "model_cache_dir", data_dir / "models")
+    monkeypatch.setattr(settings, "lineage_index_dir", data_dir / "lineage")
+    monkeypatch.setattr(settings, "offload_folder", data_dir / "offload")
+    monkeypatch.setattr(settings, "profiles_dir", data_dir / "profiles")
+    monkeypatch.setattr(settings, "audit_jobs_db", data_dir / "audit_jobs.sqlite3")
+
+
+@pytest.fixture(autouse=True)
+def offline_hub(monkeypatch):
+    """Hub IDs used by tests are never downloaded"""
+    import huggingface_hub.constants
+    monkeypatch.setattr(huggingface_hub.constants, "HF_HUB_OFFLINE", True)
+
+
 @pytest.fixture
 def test_settings():
     """Test configuration"""
@@ -48,4 +66,54 @@ def sample_fingerprints():
             "key_length": 20,
             "response_length": 20
         }
-    }
\ No newline at end of file
+    }
+
+
+@pytest.fixture(scope="session")
+def tiny_model_factory(tmp_path_factory):
+    """Build tiny GPT-2 checkpoints on disk (no Hub access needed)"""
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers, decoders
+    from transformers import PreTrainedTokenizerFast, GPT2Config, GPT2LMHeadModel
+    from agent.fingerprint_service import FingerprintService
+
+    default_words = FingerprintService().word_list
+
+    def build(name: str = "tiny", seed: int = 0, words: list = None, base_dir: Path = None) -> Path:
+        model_dir = base_dir or tmp_path_factory.mktemp(name)
+
+        tokenizer = Tokenizer(models.WordLevel(unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+        tokenizer.decoder = decoders.WordPiece(prefix="##")
+        tokenizer.train_from_iterator(
+            [" ".join(words or default_words)],
+            trainers.WordLevelTrainer(special_tokens=["[UNK]", "<|endoftext|>"])
+        )
+        hf_tokenizer = PreTrainedTokenizerFast(
+            tokenizer_object=tokenizer,
+            unk_token="[UNK]",
+            eos_token="<|endoftext|>",
+            bos_token="<|endoftext|>"
+        )
+        hf_tokenizer.save_pretrained(model_dir)
+
+        config = GPT2Config(
+            vocab_size=len(hf_tokenizer),
+            n_positions=128,
+            n_embd=32,
+            n_layer=2,
+            n_head=2,
+            bos_token_id=hf_tokenizer.eos_token_id,
+            eos_token_id=hf_tokenizer.eos_token_id
+        )
+        torch.manual_seed(seed)
+        GPT2LMHeadModel(config).save_pretrained(model_dir)
+        return model_dir
+
+    return build
+
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tiny_model_factory):
+    """A tiny GPT-2 checkpoint"""
+    return tiny_model_factory("tiny")
@@ -0,0 +1,153 @@
+"""
+Test shared-base LoRA/adapter audits
+"""
+import asyncio
+
+import pytest
+
+peft = pytest.importorskip("peft")
+
+from transformers import AutoModelForCausalLM
+from agent.audit_engine import AuditEngine
+
+
+FINGERPRINTS = {
+    "queries": ["apple red dog", "blue ocean one", "happy cat jump", "moon star rain"],
+    "responses": {
+        "apple red dog": "fish fish",
+        "blue ocean one": "two three",
+        "happy cat jump": "slow lion",
+        "moon star rain": "pen desk"
+    }
+}
+
+
+@pytest.fixture(scope="module")
+def adapters(tiny_model_dir, tmp_path_factory):
+    """Three LoRA adapters on the tiny base model"""
+    import torch
+    paths = []
+    for i in range(3):
+        torch.manual_seed(i)
+        model = AutoModelForCausalLM.from_pretrained(tiny_model_dir)
+        model = peft.get_peft_model(model, peft.LoraConfig(
+            r=4,
+            target_modules=["c_attn"],
+            init_lora_weights=False,
+            fan_in_fan_out=True
+        ))
+        path = tmp_path_factory.mktemp(f"adapter{i}")
+        model.save_pretrained(path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def engine():
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = FINGERPRINTS
+    return engine
+
+
+def _count_loads(engine, monkeypatch):
+    loads = []
+    original = engine.model_loader._from_pretrained
+
+    def counting(path):
+        loads.append(path)
+        return original(path)
+
+    monkeypatch.setattr(engine.model_loader, "_from_pretrained", counting)
+    return loads
+
+
+def test_detect_adapter(engine, adapters, tiny_model_dir):
+    """Test adapter_config.json is detected"""
+    config = engine.model_loader.detect_adapter(adapters[0])
+    assert config["base_model_name_or_path"] == str(tiny_model_dir)
+    assert engine.model_loader.detect_adapter(str(tiny_model_dir)) is None
+
+
+@pytest.mark.asyncio
+async def test_base_model_loaded_once(engine, adapters, monkeypatch):
+    """Test sequential adapter audits reuse the resident base"""
+    loads = _count_loads(engine, monkeypatch)
+
+    for path in adapters:
+        result = await engine.audit_model(path, mode="quick")
+        assert result["verdict"] in ("MATCH", "SUSPICIOUS", "NO_MATCH")
+
+    assert len(loads) == 1
+
+
+@pytest.mark.asyncio
+async def test_audit_adapters_batches_on_one_base(engine, adapters, monkeypatch):
+    """Test multi-adapter audits share one base load"""
+    loads = _count_loads(engine, monkeypatch)
+
+    results = await engine.audit_adapters(adapters, mode="quick")
+
+    assert len(loads) == 1
+    assert [r["model_path"] for r in results] == adapters
+    assert all(r["total_tested"] == len(FINGERPRINTS["queries"]) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_mixed_batch_matches_merged_models(engine, adapters, tiny_model_dir):
+    """Test per-row adapter routing equals auditing each merged model"""
+    query = FINGERPRINTS["queries"][0]
+    names = []
+    for path in adapters:
+        model, tokenizer, name = await engine.model_loader.load_adapter(path)
+        names.append(name)
+
+    mixed = await engine._query_batch(model, tokenizer, [query] * len(adapters), max_length=8, adapter_names=names)
+    assert all(mixed)
+    assert len(set(mixed)) > 1
+
+    for path, actual in zip(adapters, mixed):
+        base = AutoModelForCausalLM.from_pretrained(tiny_model_dir)
+        merged = peft.PeftModel.from_pretrained(base, path).merge_and_unload()
+        expected = await engine._query_model(merged, tokenizer, query, max_length=8)
+        assert actual == expected
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_loads_share_one_base(engine, adapters, monkeypatch):
+    """Test racing first audits load and wrap the base model once"""
+    loads = _count_loads(engine, monkeypatch)
+
+    attached = await asyncio.gather(*(engine.model_loader.load_adapter(path) for path in adapters))
+
+    assert len(loads) == 1
+    assert len({id(model) for model, _, _ in attached}) == 1
+    assert engine.model_loader.get_stats()["adapter_bases"] == 1
+
+
+@pytest.mark.asyncio
+async def test_adapter_detached_only_when_unused(engine, adapters):
+    """Test an adapter held by two audits survives the first release"""
+    loader = engine.model_loader
+    model, _, name = await loader.load_adapter(adapters[0])
+    await loader.load_adapter(adapters[0])
+
+    await loader.unload_adapter(adapters[0])
+    assert name in model.peft_config
+
+    await loader.unload_adapter(adapters[0])
+    assert name not in model.peft_config
+
+
+@pytest.mark.asyncio
+async def test_idle_adapter_base_is_evictable(engine, adapters, tiny_model_factory, monkeypatch):
+    """Test a base with adapters in use stays resident and an idle one is evicted"""
+    loader = engine.model_loader
+    await loader.load_adapter(adapters[0])
+    monkeypatch.setattr(loader, "max_bytes", 1)
+
+    await loader.load_model(str(tiny_model_factory("evictor-a", seed=3)))
+    assert loader.get_stats()["adapter_bases"] == 1
+
+    await loader.unload_adapter(adapters[0])
+    await loader.load_model(str(tiny_model_factory("evictor-b", seed=4)))
+    assert loader.get_stats()["adapter_bases"] == 0
@@ -0,0 +1,121 @@
+"""
+Test multi-owner fingerprint sets and one-pass attribution audits
+"""
+import pytest
+
+from agent.audit_engine import AuditEngine
+from agent.config import settings
+from fingerprints.registry import FingerprintRegistry
+from fingerprints.validator import FingerprintValidator
+
+
+QUERIES = ["apple red dog", "blue ocean one", "happy cat jump", "moon star rain", "green tree sun", "fast car road"]
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "fingerprint_dir", tmp_path)
+    engine = AuditEngine()
+    engine.validator = FingerprintValidator(FingerprintRegistry())
+    return engine
+
+
+async def _owned_by_model(engine, model_path):
+    """Fingerprints the model already reproduces"""
+    model, tokenizer = await engine.model_loader.load_model(model_path)
+    actuals = await engine._query_batch(model, tokenizer, QUERIES)
+    await engine.model_loader.unload_model(model_path)
+    return list(zip(QUERIES, actuals))
+
+
+def test_owner_sets_are_versioned(engine):
+    """Test owners are discovered on disk and replacing a set bumps its version"""
+    registry = engine.validator.registry
+    assert registry.owners() == []
+
+    first = registry.add_owner("acme", [("q1", "r1"), ("q2", "r2")])
+    registry.add_owner("globex", [("q3", "r3")])
+    assert registry.owners() == ["acme", "globex"]
+
+    second = registry.add_owner("acme", [("q4", "r4")])
+    assert (first.version, second.version) == (1, 2)
+    assert registry.owner("acme").count() == 1
+
+    with pytest.raises(ValueError):
+        registry.add_owner("../escape", [("q", "r")])
+    with pytest.raises(KeyError):
+        registry.owner("initech")
+
+
+@pytest.mark.asyncio
+async def test_attribution_loads_model_once(engine, tiny_model_dir, monkeypatch):
+    """Test all owners are checked in shared batches against one load"""
+    model_path = str(tiny_model_dir)
+    registry = engine.validator.registry
+    registry.add_owner("acme", await _owned_by_model(engine, model_path))
+    registry.add_owner("globex", [(query, "pen desk lamp chair") for query in QUERIES])
+
+    loads = []
+    original = engine.model_loader._from_pretrained
+
+    def counting(*args, **kwargs):
+        loads.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(engine.model_loader, "_from_pretrained", counting)
+
+    result = await engine.audit_attribution(model_path, mode="quick")
+
+    assert len(loads) == 1
+    assert result["verdict"] == "ATTRIBUTED"
+    assert result["attributed_to"] == "acme"
+    assert result["total_tested"] == 2 * settings.quick_audit_sample_size
+    assert result["owners"]["acme"]["verdict"] == "MATCH"
+    assert result["owners"]["acme"]["fingerprint_version"] == 1
+    assert result["owners"]["globex"]["matches"] < result["owners"]["globex"]["total_tested"]
+
+
+@pytest.mark.asyncio
+async def test_attribution_without_owners_is_an_error(engine, tiny_model_dir):
+    """Test an empty registry reports an error instead of a verdict"""
+    result = await engine.audit_attribution(str(tiny_model_dir))
+    assert result["verdict"] == "ERROR"
+    assert "No owner" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_attribution_follows_precision_policy_and_counts_verdicts(engine, tiny_model_dir, monkeypatch):
+    """Test the target is validated, loaded and unloaded at the mode's precision and each owner is counted"""
+    from utils.metrics import AUDITS
+
+    model_path = str(tiny_model_dir)
+    registry = engine.validator.registry
+    registry.add_owner("acme", await _owned_by_model(engine, model_path))
+    registry.add_owner("globex", [(query, "pen desk lamp chair") for query in QUERIES])
+    monkeypatch.setattr(settings, "precision_by_mode", {"quick": "bf16"})
+
+    validated, loads = [], []
+    original_validate = engine.precision_guard.validate
+    original_load = engine.model_loader.load_model
+
+    async def validate(path, precision, fingerprints, offload=None):
+        validated.append((precision, len(fingerprints)))
+        return await original_validate(path, precision, fingerprints, offload)
+
+    async def load_model(path, *args, **kwargs):
+        loads.append(kwargs.get("precision"))
+        return await original_load(path, *args, **kwargs)
+
+    monkeypatch.setattr(engine.precision_guard, "validate", validate)
+    monkeypatch.setattr(engine.model_loader, "load_model", load_model)
+    before = {verdict: AUDITS.labels(verdict).value for verdict in ("MATCH", "SUSPICIOUS", "NO_MATCH")}
+
+    result = await engine.audit_attribution(model_path, mode="quick")
+
+    assert validated and validated[0][0] == "bf16"
+    assert result["precision"]["requested"] == "bf16"
+    assert loads[-1] == result["precision"]["used"]
+    assert engine.model_loader.get_stats()["resident_models"] == 0
+    counted = {verdict: AUDITS.labels(verdict).value - before[verdict] for verdict in before}
+    assert counted["MATCH"] >= 1
+    assert sum(counted.values()) == 2
@@ -0,0 +1,217 @@
+"""
+Test coalescing of identical concurrent audits and the result cache
+"""
+import asyncio
+import shutil
+import threading
+
+import pytest
+
+from agent.audit_engine import AuditEngine
+from agent.config import settings
+
+
+@pytest.fixture
+def engine(sample_fingerprints):
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = sample_fingerprints
+    return engine
+
+
+async def _until(condition, timeout: float = 5.0):
+    """Yield to the loop until `condition()` holds"""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.001)
+
+
+@pytest.fixture
+def gated(engine, monkeypatch):
+    """Replace the audit run with one that waits for `release` and counts runs"""
+    state = {"runs": [], "release": asyncio.Event()}
+
+    async def run_audit(model_path, mode="standard", progress_callback=None, *args, **kwargs):
+        state["runs"].append((model_path, mode))
+        await progress_callback("Progress: 1/2 tested\n")
+        await state["release"].wait()
+        return {"verdict": "MATCH", "confidence": 100.0, "model_path": model_path, "mode": mode}
+
+    monkeypatch.setattr(engine, "_run_audit", run_audit)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_same_weights_under_two_paths_share_one_run(engine, tiny_model_dir, tmp_path, monkeypatch):
+    """Test concurrent audits of one model identity load and decode once"""
+    alias = tmp_path / "alias"
+    shutil.copytree(tiny_model_dir, alias)
+
+    loads = []
+    original = engine.model_loader._from_pretrained
+    monkeypatch.setattr(
+        engine.model_loader,
+        "_from_pretrained",
+        lambda path, **kwargs: loads.append(path) or original(path, **kwargs)
+    )
+
+    first, second = await asyncio.gather(
+        engine.audit_model(str(tiny_model_dir), "quick"),
+        engine.audit_model(str(alias), "quick")
+    )
+
+    assert len(loads) == 1
+    assert first == second
+    assert first is not second
+    assert engine._in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_identity_is_hashed_off_the_event_loop(engine, tiny_model_dir, monkeypatch):
+    """Test identity lookups of an audit and its model loads run on worker threads"""
+    threads = []
+    identity = engine.model_loader.identity
+    original = identity.get_identity
+    monkeypatch.setattr(
+        identity,
+        "get_identity",
+        lambda path: threads.append(threading.current_thread()) or original(path)
+    )
+
+    result = await engine.audit_model(str(tiny_model_dir), "quick")
+
+    assert result["verdict"] != "ERROR"
+    assert threads
+    assert threading.main_thread() not in threads
+
+
+@pytest.mark.asyncio
+async def test_attached_callers_share_progress_and_result(engine, gated):
+    """Test a second request attaches, sees progress and gets the same result"""
+    first_progress, second_progress = [], []
+
+    async def record(messages, message):
+        messages.append(message)
+
+    first = asyncio.create_task(engine.audit_model("org/model", "quick", lambda m: record(first_progress, m)))
+    await _until(lambda: first_progress)
+    second = asyncio.create_task(engine.audit_model("org/model", "quick", lambda m: record(second_progress, m)))
+    other_mode = asyncio.create_task(engine.audit_model("org/model", "deep"))
+    await _until(lambda: second_progress and len(gated["runs"]) == 2)
+    gated["release"].set()
+
+    results = await asyncio.gather(first, second, other_mode)
+    assert gated["runs"] == [("org/model", "quick"), ("org/model", "deep")]
+    assert results[0] == results[1]
+    assert first_progress == ["Progress: 1/2 tested\n"]
+    assert second_progress == ["Attached to an audit of this model already in progress...\n"]
+
+
+@pytest.mark.asyncio
+async def test_slow_progress_consumer_does_not_stall_others(engine, monkeypatch):
+    """Test a stalled caller's buffer drops its oldest updates while the audit and other callers go on"""
+    monkeypatch.setattr(settings, "audit_progress_max_queued", 2)
+
+    async def run_audit(model_path, mode="standard", progress_callback=None, *args, **kwargs):
+        for i in range(5):
+            await progress_callback(f"Progress: {i}/5 tested\n")
+        return {"verdict": "MATCH", "model_path": model_path}
+
+    monkeypatch.setattr(engine, "_run_audit", run_audit)
+    unblock = asyncio.Event()
+    slow_progress, fast_progress = [], []
+
+    async def slow(message):
+        await unblock.wait()
+        slow_progress.append(message)
+
+    async def fast(message):
+        fast_progress.append(message)
+
+    first = asyncio.create_task(engine.audit_model("org/model", "quick", slow))
+    second = asyncio.create_task(engine.audit_model("org/model", "quick", fast))
+
+    assert (await asyncio.wait_for(second, 1))["verdict"] == "MATCH"
+    assert fast_progress[-1] == "Progress: 4/5 tested\n"
+    assert not first.done()
+
+    unblock.set()
+    assert (await asyncio.wait_for(first, 1))["verdict"] == "MATCH"
+    # At most the update in hand plus a full buffer, ending with the newest
+    assert len(slow_progress) <= 3
+    assert slow_progress[-1] == "Progress: 4/5 tested\n"
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_keeps_the_shared_audit(engine, gated):
+    """Test the audit runs on while anyone waits and stops when nobody does"""
+    first = asyncio.create_task(engine.audit_model("org/model", "quick"))
+    second = asyncio.create_task(engine.audit_model("org/model", "quick"))
+    await _until(lambda: engine._in_flight and next(iter(engine._in_flight.values()))["waiters"] == 2)
+    shared = next(iter(engine._in_flight.values()))["task"]
+
+    first.cancel()
+    await asyncio.sleep(0.01)
+    assert not shared.done()
+
+    second.cancel()
+    await asyncio.gather(first, second, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert shared.cancelled()
+    assert engine._in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_request_during_cancellation_starts_a_new_audit(engine, monkeypatch):
+    """Test a caller arriving while an abandoned audit winds down is not handed its cancellation"""
+    runs = []
+    release, cleaned_up = asyncio.Event(), asyncio.Event()
+
+    async def run_audit(model_path, mode="standard", *args, **kwargs):
+        runs.append(mode)
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            # Cleanup (e.g. releasing an adapter) outlasts the cancelled caller
+            await cleaned_up.wait()
+            raise
+        return {"verdict": "MATCH", "model_path": model_path}
+
+    monkeypatch.setattr(engine, "_run_audit", run_audit)
+
+    first = asyncio.create_task(engine.audit_model("org/model", "quick"))
+    await _until(lambda: runs)
+    shared = next(iter(engine._in_flight.values()))["task"]
+
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    assert not shared.done()
+
+    second = asyncio.create_task(engine.audit_model("org/model", "quick"))
+    await _until(lambda: len(runs) == 2)
+    release.set()
+
+    assert (await asyncio.wait_for(second, 1))["verdict"] == "MATCH"
+    cleaned_up.set()
+    await asyncio.gather(shared, return_exceptions=True)
+    assert shared.cancelled()
+    assert engine._in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_result_cache_honours_ttl(engine, gated, monkeypatch):
+    """Test finished results are reused only while the TTL lasts"""
+    gated["release"].set()
+    await engine.audit_model("org/model", "quick")
+    await engine.audit_model("org/model", "quick")
+    assert len(gated["runs"]) == 2
+
+    monkeypatch.setattr(settings, "audit_result_cache_ttl", 60.0)
+    await engine.audit_model("org/model", "quick")
+    cached = await engine.audit_model("org/model", "quick")
+    assert len(gated["runs"]) == 3
+    assert cached["verdict"] == "MATCH"
+
+    for key, (expires_at, result) in engine._result_cache.items():
+        engine._result_cache[key] = (0.0, result)
+    await engine.audit_model("org/model", "quick")
+    assert len(gated["runs"]) == 4
@@ -0,0 +1,156 @@
+"""
+Test the persistent audit job queue and its API
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from agent.audit_jobs import AuditJob, AuditJobQueue, AuditJobStore
+from api.routes import router
+from fingerprints.jobs import CANCELLED, PENDING, RUNNING, SUCCEEDED
+
+
+class FakeEngine:
+    """Reports progress and returns a verdict; `gate` holds audits until set"""
+
+    def __init__(self, gated: bool = False):
+        self.calls = []
+        self.gate = asyncio.Event()
+        if not gated:
+            self.gate.set()
+
+    async def audit_model(self, model_path, mode="standard", offload=None, precision=None, profile=False, progress_callback=None):
+        self.calls.append(model_path)
+        await progress_callback("Loading target model...\n")
+        await self.gate.wait()
+        await progress_callback("Progress: 5/10 tested\n")
+        return {"verdict": "MATCH", "confidence": 90.0, "model_path": model_path, "mode": mode}
+
+
+def _request(model_path):
+    return {"model_path": model_path, "mode": "quick", "offload": None, "precision": None}
+
+
+@pytest.mark.asyncio
+async def test_observers_share_one_run(tmp_path):
+    """Test submit returns at once and every observer sees the same run"""
+    engine = FakeEngine(gated=True)
+    queue = AuditJobQueue(engine, AuditJobStore(tmp_path / "jobs.sqlite3"))
+    await queue.start()
+    try:
+        job = await queue.submit(_request("org/model"))
+        assert job.state == PENDING
+
+        async def observe():
+            return [event async for event in job.events()]
+
+        observers = [asyncio.create_task(observe()) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert job.state == RUNNING
+        engine.gate.set()
+        streams = await asyncio.gather(*observers)
+
+        assert engine.calls == ["org/model"]
+        for events in streams:
+            assert events[-1]["state"] == SUCCEEDED
+            assert events[-1]["result"]["verdict"] == "MATCH"
+            assert any(event["progress"] == 50.0 for event in events)
+        assert queue.status(job.id)["result"]["confidence"] == 90.0
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_and_queued_jobs(tmp_path):
+    """Test cancelling stops a running audit and skips a queued one"""
+    engine = FakeEngine(gated=True)
+    queue = AuditJobQueue(engine, AuditJobStore(tmp_path / "jobs.sqlite3"), workers=1)
+    await queue.start()
+    try:
+        running = await queue.submit(_request("org/first"))
+        queued = await queue.submit(_request("org/second"))
+        third = await queue.submit(_request("org/third"))
+        await asyncio.sleep(0.05)
+
+        assert (await queue.cancel(queued.id))["state"] == CANCELLED
+        assert (await queue.cancel(running.id))["state"] == CANCELLED
+        engine.gate.set()
+        await asyncio.wait_for(third.wait(), timeout=1)
+
+        assert engine.calls == ["org/first", "org/third"]
+        assert queue.status(running.id)["state"] == CANCELLED
+        assert queue.status(queued.id)["finished_at"] is not None
+        assert queue.status(third.id)["state"] == SUCCEEDED
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_queued_and_interrupted_jobs_survive_restart(tmp_path):
+    """Test a new queue resumes unfinished jobs in order and keeps old results"""
+    path = tmp_path / "jobs.sqlite3"
+    store = AuditJobStore(path)
+    interrupted = AuditJob(_request("org/interrupted"), created_at=1.0)
+    interrupted.state = RUNNING
+    store.save(interrupted.to_dict())
+    queued = AuditJob(_request("org/queued"), created_at=2.0)
+    store.save(queued.to_dict())
+    finished = AuditJob(_request("org/done"), created_at=0.5)
+    finished.state = SUCCEEDED
+    finished.result = {"verdict": "NO_MATCH"}
+    finished.finished_at = time.time()
+    store.save(finished.to_dict())
+    store.close()
+
+    engine = FakeEngine()
+    queue = AuditJobQueue(engine, AuditJobStore(path), workers=1)
+    await queue.start()
+    try:
+        resumed = [queue.get(interrupted.id), queue.get(queued.id)]
+        await asyncio.wait_for(asyncio.gather(*(job.wait() for job in resumed)), timeout=1)
+
+        assert engine.calls == ["org/interrupted", "org/queued"]
+        assert queue.status(finished.id)["result"] == {"verdict": "NO_MATCH"}
+        assert [job["state"] for job in queue.list()] == [SUCCEEDED] * 3
+    finally:
+        await queue.stop()
+
+
+def test_job_api(tmp_path):
+    """Test submit, poll, result, events and cancel over HTTP"""
+    engine = FakeEngine()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.audit_jobs = AuditJobQueue(engine, AuditJobStore(tmp_path / "jobs.sqlite3"))
+        await app.state.audit_jobs.start()
+        yield
+        await app.state.audit_jobs.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router, prefix="/api/v1")
+
+    with TestClient(app) as client:
+        assert client.post("/api/v1/audit/jobs", json={"model_path": "org/model", "mode": "bogus"}).status_code == 400
+        response = client.post("/api/v1/audit/jobs", json={"model_path": "org/model", "mode": "quick"})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        for _ in range(100):
+            status = client.get(f"/api/v1/audit/jobs/{job_id}").json()
+            if status["state"] == SUCCEEDED:
+                break
+            time.sleep(0.01)
+        assert status["state"] == SUCCEEDED
+
+        assert client.get(f"/api/v1/audit/jobs/{job_id}/result").json()["verdict"] == "MATCH"
+        events = client.get(f"/api/v1/audit/jobs/{job_id}/events").text
+        assert events.startswith("data: ") and '"succeeded"' in events
+        assert client.get("/api/v1/audit/jobs").json()["jobs"][0]["id"] == job_id
+        assert client.delete(f"/api/v1/audit/jobs/{job_id}").json()["state"] == SUCCEEDED
+        assert client.get("/api/v1/audit/jobs/unknown").status_code == 404
+        assert client.get("/api/v1/audit/jobs/unknown/result").status_code == 404
@@ -0,0 +1,124 @@
+"""
+Test planned, streamed batch audits
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from agent.audit_engine import AuditEngine
+from api.routes import router
+
+
+@pytest.fixture(scope="module")
+def models(tiny_model_factory):
+    """Two models sharing a tokenizer and one with its own vocabulary"""
+    return {
+        "a": str(tiny_model_factory("batch_a", seed=1)),
+        "b": str(tiny_model_factory("batch_b", seed=2)),
+        "c": str(tiny_model_factory("batch_c", seed=3, words=["alpha", "beta", "gamma", "delta"]))
+    }
+
+
+@pytest.fixture
+def engine(sample_fingerprints):
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = sample_fingerprints
+    return engine
+
+
+def test_plan_groups_dedupes_and_orders_by_cost(engine, models):
+    """Test shared tokenizers are grouped, duplicates merged and unknown sizes last"""
+    plan = engine.batch_planner.plan([
+        {"model_path": models["c"], "mode": "quick"},
+        {"model_path": models["a"], "mode": "deep"},
+        {"model_path": models["b"], "mode": "quick"},
+        {"model_path": models["a"], "mode": "deep"},
+        {"model_path": "org/not-downloaded", "mode": "quick"}
+    ])
+
+    assert [[item["model_path"] for item in group["items"]] for group in plan] == [
+        [models["c"]],
+        [models["b"], models["a"]],
+        ["org/not-downloaded"]
+    ]
+    assert plan[1]["items"][1]["indices"] == [1, 3]
+    assert plan[0]["key"].startswith("tokenizer:")
+    assert plan[2]["estimated_cost"] is None
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_results_and_prefetches(engine, models, monkeypatch):
+    """Test every target gets a result, models load once and the next load overlaps"""
+    log = []
+    from_pretrained = engine.model_loader._from_pretrained
+    audit_model = engine.audit_model
+
+    def logged_load(path, **kwargs):
+        log.append(("load", path))
+        return from_pretrained(path, **kwargs)
+
+    async def logged_audit(model_path, *args, **kwargs):
+        result = await audit_model(model_path, *args, **kwargs)
+        log.append(("audited", model_path))
+        return result
+
+    monkeypatch.setattr(engine.model_loader, "_from_pretrained", logged_load)
+    monkeypatch.setattr(engine, "audit_model", logged_audit)
+
+    events = [event async for event in engine.audit_batch([
+        {"model_path": models["a"], "mode": "quick"},
+        {"model_path": models["b"], "mode": "quick"},
+        {"model_path": models["a"], "mode": "quick"}
+    ])]
+
+    assert events[0]["type"] == "plan" and events[0]["audits"] == 2
+    results = [event for event in events if event["type"] == "result"]
+    assert sorted(event["index"] for event in results) == [0, 1, 2]
+    assert all(event["result"]["total_tested"] == 3 for event in results)
+
+    summary = events[-1]
+    assert summary["type"] == "summary"
+    assert summary["completed"] == 2
+    assert summary["fingerprints_tested"] == 6
+    assert summary["fingerprints_per_second"] > 0
+
+    loads = [path for kind, path in log if kind == "load"]
+    assert sorted(loads) == sorted([models["a"], models["b"]])
+    first_audited = next(path for kind, path in log if kind == "audited")
+    second = models["b"] if first_audited == models["a"] else models["a"]
+    assert log.index(("load", second)) < log.index(("audited", first_audited))
+
+
+def test_batch_endpoint_streams_ndjson():
+    """Test the endpoint validates every target and streams one JSON object per line"""
+    class FakeEngine:
+        async def audit_batch(self, targets):
+            yield {"type": "plan", "targets": len(targets)}
+            for index, target in enumerate(targets):
+                yield {"type": "result", "index": index, "model_path": target["model_path"], "result": {"verdict": "NO_MATCH"}}
+            yield {"type": "summary", "completed": len(targets)}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.state.agent = SimpleNamespace(audit_engine=FakeEngine())
+    client = TestClient(app)
+
+    response = client.post("/api/v1/audit/batch", json={"targets": [
+        {"model_path": "org/one", "mode": "quick"},
+        {"model_path": "org/two"}
+    ]})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["type"] for line in lines] == ["plan", "result", "result", "summary"]
+    assert lines[2]["model_path"] == "org/two"
+
+    response = client.post("/api/v1/audit/batch", json={"targets": [
+        {"model_path": "org/one"},
+        {"model_path": "org/two", "mode": "bogus"}
+    ]})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Target 1")
+    assert client.post("/api/v1/audit/batch", json={"targets": []}).status_code == 422
@@ -0,0 +1,109 @@
+"""
+Test the chunked, indexed encrypted fingerprint store
+"""
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from agent.config import settings
+from fingerprints.chunked_store import ChunkedFingerprintReader, ChunkedFingerprintWriter, is_chunked
+from fingerprints.storage import FingerprintStorage
+from fingerprints.validator import FingerprintValidator
+
+
+def _pairs(count):
+    return [(f"query {i} phrase", f"response {i} output") for i in range(count)]
+
+
+def test_stream_round_trip(tmp_path):
+    """Test streamed writes read back in order with metadata"""
+    path = tmp_path / "fingerprints.enc"
+    with ChunkedFingerprintWriter(path, chunk_records=16, metadata={"source": "test"}) as writer:
+        writer.write_all(iter(_pairs(100)))
+
+    reader = ChunkedFingerprintReader(path)
+    assert is_chunked(path)
+    assert len(reader) == 100
+    assert reader.metadata == {"source": "test"}
+    assert list(reader.iter_pairs()) == _pairs(100)
+    assert list(reader.load_all()) == _pairs(100)
+
+
+def test_sampling_decrypts_only_needed_chunks(tmp_path):
+    """Test a partial read touches only the chunks of the sampled records"""
+    path = tmp_path / "fingerprints.enc"
+    with ChunkedFingerprintWriter(path, chunk_records=10) as writer:
+        writer.write_all(_pairs(1000))
+
+    reader = ChunkedFingerprintReader(path)
+    assert reader.get([3, 7, 512]) == [_pairs(1000)[i] for i in (3, 7, 512)]
+    assert reader.chunks_decrypted == 2
+
+    sampled = reader.sample(5)
+    assert len(sampled) == 5
+    assert reader.chunks_decrypted <= 7
+    for query, response in sampled:
+        assert response == query.replace("query", "response").replace("phrase", "output")
+
+
+def test_storage_loads_close_the_reader(tmp_path, monkeypatch):
+    """Test whole-file loads release the reader's file descriptor"""
+    path = tmp_path / "fingerprints.enc"
+    with ChunkedFingerprintWriter(path, chunk_records=10) as writer:
+        writer.write_all(_pairs(30))
+
+    storage = FingerprintStorage()
+    readers = []
+    original = storage.open_chunked
+    monkeypatch.setattr(storage, "open_chunked", lambda filepath: readers.append(original(filepath)) or readers[-1])
+
+    assert len(storage.load_fingerprint_file(path)) == 30
+    assert len(storage.load_encrypted(path)["queries"]) == 30
+    assert len(readers) == 2
+    assert all(reader._fd is None for reader in readers)
+
+
+def test_tampering_and_wrong_key_rejected(tmp_path):
+    """Test modified chunks and wrong secrets fail authentication"""
+    path = tmp_path / "fingerprints.enc"
+    with ChunkedFingerprintWriter(path, chunk_records=10) as writer:
+        writer.write_all(_pairs(30))
+
+    with pytest.raises(InvalidTag):
+        ChunkedFingerprintReader(path, secret="another secret")
+
+    data = bytearray(path.read_bytes())
+    data[60] ^= 1
+    path.write_bytes(bytes(data))
+    with pytest.raises(InvalidTag):
+        ChunkedFingerprintReader(path).read_chunk(0)
+
+
+def test_legacy_fernet_files_still_load_and_migrate(tmp_path, sample_fingerprints):
+    """Test Fernet files load as before and migrate to the chunked format"""
+    storage = FingerprintStorage()
+    legacy = tmp_path / "legacy.enc"
+    storage.save_encrypted(sample_fingerprints, legacy)
+    assert not is_chunked(legacy)
+
+    assert storage.migrate(legacy, legacy) == 3
+    assert is_chunked(legacy)
+
+    loaded = storage.load_encrypted(legacy)
+    assert loaded["queries"] == sample_fingerprints["queries"]
+    assert loaded["responses"] == sample_fingerprints["responses"]
+    assert loaded["metadata"] == sample_fingerprints["metadata"]
+
+
+def test_validator_samples_without_full_load(tmp_path, monkeypatch):
+    """Test audits sample from a chunked master file without loading it all"""
+    monkeypatch.setattr(settings, "fingerprint_dir", tmp_path)
+    FingerprintStorage().save_chunked(_pairs(500), tmp_path / settings.master_fingerprints_file)
+
+    validator = FingerprintValidator()
+    assert validator.count() == 500
+    sampled = validator.sample(5)
+    assert len(sampled) == 5
+    assert list(validator.head(2)) == _pairs(2)
+    assert validator._master_fingerprints is None
+
+    assert len(validator.get_master_fingerprints()) == 500
@@ -0,0 +1,95 @@
+"""
+Test in-process "english" fingerprint sampling
+"""
+import json
+
+import pytest
+
+from fingerprints.generator import FingerprintGenerator, NativeFingerprintWriter
+
+
+@pytest.fixture
+def guardian(tiny_model_dir):
+    import asyncio
+    from models.loader import ModelLoader
+    return asyncio.run(ModelLoader().load_model(str(tiny_model_dir)))
+
+
+def test_native_writer_round_trip(tmp_path):
+    """Test the incremental writer produces the plain queries/responses format"""
+    path = tmp_path / "fingerprints.json"
+    writer = NativeFingerprintWriter(path)
+    for i in range(5):
+        writer.write(f"query {i} é", f"response {i}")
+    writer.close({"num_fingerprints": 5})
+
+    data = json.loads(path.read_text())
+    assert data["queries"] == [f"query {i} é" for i in range(5)]
+    assert data["responses"]["query 3 é"] == "response 3"
+    assert data["metadata"] == {"num_fingerprints": 5}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fingerprints.json"]
+
+
+def test_english_samples_in_batches(guardian, tmp_path, monkeypatch):
+    """Test keys are sampled in batches on the given model and streamed to disk"""
+    from agent.config import settings
+
+    monkeypatch.setattr(settings, "english_generation_batch_size", 16)
+    model, tokenizer = guardian
+    calls = []
+    original = model.generate
+
+    def counting(**kwargs):
+        calls.append(kwargs["input_ids"].shape[0])
+        return original(**kwargs)
+
+    monkeypatch.setattr(model, "generate", counting)
+
+    progress = []
+    path = tmp_path / "english.json"
+    result = FingerprintGenerator().generate(
+        num_fingerprints=40,
+        key_length=6,
+        response_length=4,
+        output_file=path,
+        model=model,
+        tokenizer=tokenizer,
+        progress_callback=lambda done, total: progress.append((done, total))
+    )
+
+    # Keys and responses for 16 rows per call: 16, 16, 8 fingerprints
+    assert calls[:6] == [16, 16, 16, 16, 8, 8]
+    assert progress[-1] == (40, 40)
+    assert result["metadata"]["num_fingerprints"] == 40
+
+    data = json.loads(path.read_text())
+    assert len(data["queries"]) == 40
+    assert set(data["responses"]) == set(data["queries"])
+    # A seed word plus up to 6 sampled tokens (special tokens are dropped)
+    assert all(1 < len(tokenizer(query)["input_ids"]) <= 7 for query in data["queries"])
+
+
+def test_english_needs_a_model_and_stops_when_sampling_stalls(guardian, tmp_path, monkeypatch):
+    """Test no private guardian copy is loaded and repeated phrases end in an error"""
+    from agent.config import settings
+
+    generator = FingerprintGenerator()
+    with pytest.raises(ValueError, match="guardian model"):
+        generator.generate_english(num_fingerprints=4, output_file=tmp_path / "none.json")
+
+    monkeypatch.setattr(settings, "english_generation_max_stalled_batches", 3)
+    calls = []
+    monkeypatch.setattr(
+        generator,
+        "_sample_phrases",
+        lambda model, tokenizer, seeds, num_tokens: calls.append(len(seeds)) or ["same phrase"] * len(seeds)
+    )
+
+    model, tokenizer = guardian
+    path = tmp_path / "stalled.json"
+    with pytest.raises(RuntimeError, match="stalled at 1/10"):
+        generator.generate_english(num_fingerprints=10, output_file=path, model=model, tokenizer=tokenizer)
+
+    # One productive batch, then three that added nothing (keys and responses each)
+    assert len(calls) == 8
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,91 @@
+"""
+Test the versioned fingerprint registry and hot reload
+"""
+import time
+
+from fingerprints.registry import FingerprintRegistry
+from fingerprints.storage import FingerprintStorage
+from fingerprints.validator import FingerprintValidator
+
+
+def _pairs(count, tag):
+    return [(f"query {i} {tag}", f"response {i} {tag}") for i in range(count)]
+
+
+def _rotate(path, pairs):
+    FingerprintStorage().save_chunked(pairs, path)
+
+
+def test_reload_bumps_version_and_keeps_old_snapshots(tmp_path):
+    """Test a rotated file becomes a new version while old snapshots stay readable"""
+    path = tmp_path / "master.enc"
+    _rotate(path, _pairs(100, "old"))
+
+    registry = FingerprintRegistry()
+    registry.register("master", path)
+    old = registry.current()
+    assert old.version == 1
+    assert registry.reload() is False
+
+    _rotate(path, _pairs(50, "new"))
+    assert registry.check_for_updates() == ["master"]
+
+    new = registry.current()
+    assert new.version == 2
+    assert new.count() == 50
+    assert all(query.endswith("new") for query, _ in new.sample(5))
+
+    # An audit that started on the old version keeps reading it
+    assert old.count() == 100
+    assert all(query.endswith("old") for query, _ in old.sample(5))
+
+
+def test_failed_reload_keeps_current_version(tmp_path):
+    """Test a corrupt rotation does not replace the working version"""
+    path = tmp_path / "master.enc"
+    _rotate(path, _pairs(10, "good"))
+
+    registry = FingerprintRegistry()
+    registry.register("master", path)
+    assert registry.current().version == 1
+
+    path.write_bytes(b"not a fingerprint file")
+    assert registry.check_for_updates() == []
+    assert registry.current().version == 1
+    assert registry.current().count() == 10
+
+
+def test_validators_share_one_decryption(tmp_path):
+    """Test validators on one registry share each loaded version"""
+    path = tmp_path / "master.enc"
+    _rotate(path, _pairs(30, "shared"))
+
+    registry = FingerprintRegistry()
+    registry.register("master", path)
+    first = FingerprintValidator(registry)
+    second = FingerprintValidator(registry)
+
+    assert first.get_master_fingerprints() is second.get_master_fingerprints()
+    assert first.snapshot()._reader.chunks_decrypted == 1
+
+
+def test_background_watch_swaps_in_new_version(tmp_path):
+    """Test the poller picks up a rotated file without a restart"""
+    path = tmp_path / "master.enc"
+    _rotate(path, _pairs(10, "v1"))
+
+    registry = FingerprintRegistry()
+    registry.register("master", path)
+    assert registry.current().version == 1
+
+    registry.start_watching(interval=0.05)
+    try:
+        _rotate(path, _pairs(20, "v2"))
+        deadline = time.time() + 10
+        while registry.current().version == 1 and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        registry.stop_watching()
+
+    assert registry.current().version == 2
+    assert registry.current().count() == 20
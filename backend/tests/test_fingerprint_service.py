@@ -1,6 +1,8 @@
 """
 Test fingerprint service functionality
 """
+import asyncio
+
 import pytest
 from agent.fingerprint_service import FingerprintService
 
@@ -52,4 +54,103 @@ def test_setup_guide_structure():
     first_step = guide["steps"][0]
     assert "number" in first_step
     assert "title" in first_step
-    assert "description" in first_step
\ No newline at end of file
+    assert "description" in first_step
+
+
+def test_bulk_phrases_use_whole_vocabulary():
+    """Test bulk phrases have the requested length and draw every word evenly"""
+    service = FingerprintService()
+    
+    for num_words in (1, 2, 5, 32):
+        phrases = service.generate_phrases(50, num_words)
+        assert len(phrases) == 50
+        assert all(len(phrase.split()) == num_words for phrase in phrases)
+    
+    counts = {}
+    for phrase in service.generate_phrases(20000, 5):
+        for word in phrase.split():
+            counts[word] = counts.get(word, 0) + 1
+    
+    expected = 100000 / len(service.word_list)
+    assert set(counts) == set(service.word_list)
+    assert all(abs(count - expected) < 0.15 * expected for count in counts.values())
+
+
+def test_random_indices_in_range_for_any_vocabulary():
+    """Test rejection sampling stays in range for small and large vocabularies"""
+    for vocabulary_size in (1, 3, 256, 257, 70000):
+        indices = FingerprintService._random_indices(10000, vocabulary_size)
+        assert len(indices) == 10000
+        assert indices.min() >= 0
+        assert indices.max() < vocabulary_size
+
+
+@pytest.mark.asyncio
+async def test_word_list_file(tmp_path, monkeypatch):
+    """Test fingerprints can be generated from a custom vocabulary file"""
+    from agent.config import settings
+    
+    words = [f"token{i}" for i in range(5000)]
+    word_file = tmp_path / "words.txt"
+    word_file.write_text("# vocabulary\n" + "\n".join(words + words[:10]) + "\n\n")
+    monkeypatch.setattr(settings, "fingerprint_word_list_file", word_file)
+    
+    service = FingerprintService()
+    assert service.word_list == words
+    
+    result = await service.generate_fingerprints(num_fingerprints=200, key_length=8, response_length=4)
+    assert len(set(result["queries"])) == 200
+    assert result["metadata"]["vocabulary_size"] == 5000
+    assert all(word in words for query in result["queries"] for word in query.split())
+
+
+def test_fingerprint_chunks_are_unique_and_bounded():
+    """Test chunked generation yields the requested count in bounded chunks"""
+    service = FingerprintService()
+    
+    chunks = list(service.iter_fingerprint_chunks(2500, key_length=8, response_length=8, chunk_size=1000))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    
+    queries = [query for chunk in chunks for query, _ in chunk]
+    assert len(set(queries)) == 2500
+
+
+def test_stream_endpoint_returns_ndjson():
+    """Test the streaming endpoint sends metadata then one record per line"""
+    import json
+    from types import SimpleNamespace
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.routes import router
+    
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.state.agent = SimpleNamespace(fingerprint_service=FingerprintService())
+    
+    response = TestClient(app).post(
+        "/api/v1/fingerprints/generate/stream",
+        json={"num_fingerprints": 2500, "key_length": 8, "response_length": 12}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["metadata"]["num_fingerprints"] == 2500
+    records = lines[1:]
+    assert len(records) == 2500
+    assert all(len(record["query"].split()) == 8 for record in records)
+    assert all(len(record["response"].split()) == 12 for record in records)
+
+
+@pytest.mark.asyncio
+async def test_more_fingerprints_than_distinct_queries_is_rejected():
+    """Test requests the word list cannot satisfy fail fast instead of redrawing forever"""
+    service = FingerprintService()
+    
+    with pytest.raises(ValueError, match="distinct queries"):
+        await asyncio.wait_for(service.generate_fingerprints(100, key_length=1, response_length=4), 5)
+    with pytest.raises(ValueError, match="distinct queries"):
+        service.iter_fingerprint_chunks(100, key_length=1, response_length=4, chunk_size=10)
+    
+    exact = await asyncio.wait_for(service.generate_fingerprints(50, key_length=1, response_length=4), 5)
+    assert sorted(exact["queries"]) == sorted(service.word_list)
@@ -0,0 +1,111 @@
+"""
+Test the compact array-backed fingerprint set
+"""
+import json
+import random
+import tracemalloc
+from multiprocessing import get_context
+
+import pytest
+
+from fingerprints.fingerprint_set import FingerprintSet
+from fingerprints.validator import FingerprintValidator
+
+
+def _fingerprints(count, words_per_text=8, seed=0):
+    rng = random.Random(seed)
+    words = [f"wörd{i}" for i in range(200)]
+    queries = [" ".join(rng.choice(words) for _ in range(words_per_text)) for _ in range(count)]
+    return {
+        "queries": queries,
+        "responses": {q: " ".join(rng.choice(words) for _ in range(words_per_text)) for q in queries}
+    }
+
+
+def _read_in_child(name, query, results):
+    fingerprints = FingerprintSet.attach(name)
+    results.put(fingerprints.responses[query])
+    fingerprints.close()
+
+
+def test_dict_compatible_access(sample_fingerprints):
+    """Test the set reads like the plain queries/responses format"""
+    fingerprints = FingerprintSet.from_dict(sample_fingerprints)
+
+    assert len(fingerprints) == 3
+    assert fingerprints["queries"] == sample_fingerprints["queries"]
+    assert dict(fingerprints["responses"]) == sample_fingerprints["responses"]
+    assert fingerprints.get("metadata") == sample_fingerprints["metadata"]
+    assert fingerprints.to_dict()["responses"] == sample_fingerprints["responses"]
+
+    query = sample_fingerprints["queries"][1]
+    assert fingerprints.id_of(query) == 1
+    assert fingerprints.response(1) == sample_fingerprints["responses"][query]
+    assert fingerprints.id_of("not a fingerprint") is None
+    with pytest.raises(KeyError):
+        fingerprints["responses"]["not a fingerprint"]
+
+    sampled = random.sample(fingerprints["queries"], 2)
+    assert all(q in sample_fingerprints["responses"] for q in sampled)
+    assert sorted(fingerprints.sample(10)) == [0, 1, 2]
+
+
+def test_lookups_across_many_fingerprints():
+    """Test every query maps back to its own id and response"""
+    data = _fingerprints(5000)
+    fingerprints = FingerprintSet.from_dict(data)
+
+    for fingerprint_id in fingerprints.sample(500):
+        query = fingerprints.query(fingerprint_id)
+        assert fingerprints.id_of(query) == data["queries"].index(query)
+        assert fingerprints.responses[query] == data["responses"][query]
+
+
+def test_smaller_than_decoded_json():
+    """Test the set takes a fraction of the memory of the decoded dict"""
+    blob = json.dumps(_fingerprints(20000))
+
+    tracemalloc.start()
+    decoded = json.loads(blob)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    fingerprints = FingerprintSet.from_dict(decoded)
+    assert fingerprints.nbytes * 2 < dict_bytes
+
+
+def test_shared_across_processes():
+    """Test another process can attach to the set read-only"""
+    data = _fingerprints(100)
+    fingerprints = FingerprintSet.from_dict(data)
+    shm = fingerprints.to_shared_memory()
+
+    try:
+        attached = FingerprintSet.attach(shm.name)
+        assert attached["queries"] == data["queries"]
+        attached.close()
+
+        context = get_context("spawn")
+        results = context.Queue()
+        query = data["queries"][42]
+        child = context.Process(target=_read_in_child, args=(shm.name, query, results))
+        child.start()
+        assert results.get(timeout=60) == data["responses"][query]
+        child.join(timeout=60)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_validator_returns_one_shared_set(tmp_path, monkeypatch, sample_fingerprints):
+    """Test the master fingerprints are loaded once into a FingerprintSet"""
+    from agent.config import settings
+
+    monkeypatch.setattr(settings, "fingerprint_dir", tmp_path)
+    validator = FingerprintValidator()
+    validator.storage.save_encrypted(sample_fingerprints, tmp_path / settings.master_fingerprints_file)
+
+    master = validator.get_master_fingerprints()
+    assert isinstance(master, FingerprintSet)
+    assert validator.get_master_fingerprints() is master
+    assert list(master["queries"]) == sample_fingerprints["queries"]
@@ -0,0 +1,112 @@
+"""
+Test the static-cache greedy decoder against generate
+"""
+import pytest
+import torch
+
+from agent.greedy_decoder import GreedyDecoder
+from models.loader import ModelLoader
+
+
+QUERIES = ["apple red dog", "blue ocean one happy cat jump moon star", "rain"]
+
+
+def _generate(model, inputs, max_new_tokens, **kwargs):
+    with torch.no_grad():
+        outputs = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False, **kwargs)
+    return outputs[:, inputs["input_ids"].shape[1]:]
+
+
+def _decode(decoder, model, inputs, max_new_tokens, pad_token_id, eos_token_id=None):
+    with torch.no_grad():
+        return decoder.decode(
+            model,
+            inputs["input_ids"],
+            inputs["attention_mask"],
+            max_new_tokens=max_new_tokens,
+            pad_token_id=pad_token_id,
+            eos_token_id=eos_token_id
+        )
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_generate(tiny_model_factory, seed):
+    """Test greedy tokens equal generate(do_sample=False) on a ragged batch"""
+    model, tokenizer = ModelLoader()._from_pretrained(str(tiny_model_factory(f"greedy{seed}", seed=seed)))
+    inputs = tokenizer(QUERIES, return_tensors="pt", padding=True)
+
+    expected = _generate(model, inputs, 24, pad_token_id=tokenizer.pad_token_id)
+    actual = _decode(GreedyDecoder(compile_steps=False), model, inputs, 24, tokenizer.pad_token_id)
+
+    assert torch.equal(actual, expected)
+
+
+def test_stops_rows_at_eos(tiny_model_dir):
+    """Test finished rows are padded and decoding stops once all rows finish"""
+    model, tokenizer = ModelLoader()._from_pretrained(str(tiny_model_dir))
+    inputs = tokenizer(QUERIES, return_tensors="pt", padding=True)
+    decoder = GreedyDecoder(compile_steps=False)
+
+    first_tokens = _decode(decoder, model, inputs, 1, tokenizer.pad_token_id)[:, 0]
+    eos = int(first_tokens[0])
+
+    expected = _generate(model, inputs, 24, pad_token_id=tokenizer.pad_token_id, eos_token_id=eos)
+    actual = _decode(decoder, model, inputs, 24, tokenizer.pad_token_id, eos_token_id=eos)
+
+    assert torch.equal(actual, expected)
+    if (first_tokens == eos).all():
+        assert actual.shape[1] == 1
+
+
+def test_compiled_steps_cached_per_bucket(tiny_model_factory, monkeypatch):
+    """Test one compiled step per (architecture, dtype, bucket), shared across models"""
+    compiled = []
+
+    def fake_compile(fn, **kwargs):
+        compiled.append(kwargs)
+        return fn
+
+    monkeypatch.setattr(torch, "compile", fake_compile)
+    decoder = GreedyDecoder(compile_steps=True)
+
+    for seed in (0, 1):
+        model, tokenizer = ModelLoader()._from_pretrained(str(tiny_model_factory(f"bucket{seed}", seed=seed)))
+        inputs = tokenizer(QUERIES, return_tensors="pt", padding=True)
+        expected = _generate(model, inputs, 8, pad_token_id=tokenizer.pad_token_id)
+        assert torch.equal(_decode(decoder, model, inputs, 8, tokenizer.pad_token_id), expected)
+
+    # Both models share the batch-4 bucket; a one-row batch gets its own
+    assert len(compiled) == 1
+    _decode(decoder, model, tokenizer(QUERIES[:1], return_tensors="pt"), 8, tokenizer.pad_token_id)
+    assert len(compiled) == 2
+
+
+def test_unsupported_generation_settings(tiny_model_dir):
+    """Test models with extra logits processors stay on generate"""
+    model, _ = ModelLoader()._from_pretrained(str(tiny_model_dir))
+    decoder = GreedyDecoder(compile_steps=False)
+    assert decoder.supports(model)
+
+    model.generation_config.repetition_penalty = 1.3
+    assert not decoder.supports(model)
+
+
+@pytest.mark.parametrize("error, marked", [(RuntimeError("out of memory"), False), (TypeError("unexpected keyword 'cache_position'"), True)])
+def test_only_signature_errors_disable_the_architecture(tiny_model_dir, monkeypatch, error, marked):
+    """Test a failed decode falls back to generate and only a TypeError disables the class"""
+    from agent.audit_engine import AuditEngine
+    from agent.config import settings
+
+    engine = AuditEngine()
+    model, tokenizer = ModelLoader()._from_pretrained(str(tiny_model_dir))
+    expected = engine._generate_batch(model, tokenizer, QUERIES, max_length=4)
+    monkeypatch.setattr(settings, "greedy_decoder_enabled", True)
+
+    def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(engine.greedy_decoder, "decode", fail)
+    responses = engine._generate_batch(model, tokenizer, QUERIES, max_length=4)
+
+    assert responses == expected
+    assert engine.greedy_decoder.supports(model) is not marked
@@ -0,0 +1,126 @@
+"""
+Test asynchronous, cancellable OML subprocess jobs
+"""
+import asyncio
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent.config import settings
+from fingerprints.jobs import CANCELLED, FAILED, SUCCEEDED, JobManager, SubprocessJob, parse_progress
+
+PROGRESS_SCRIPT = """
+import sys, time
+for i in range(1, 21):
+    sys.stderr.write(f"\\rChecking: {i * 5}%|###| {i}/20 [00:01<00:00]")
+    sys.stderr.flush()
+    time.sleep(0.01)
+print()
+print("Success rate: 97.5%")
+"""
+
+
+def test_parse_progress():
+    """Test tqdm bars and plain counters are understood"""
+    assert parse_progress(" 45%|████▌     | 450/1000 [00:10<00:12]") == 45.0
+    assert parse_progress("Step 30/120") == 25.0
+    assert parse_progress("loading weights") is None
+
+
+@pytest.mark.asyncio
+async def test_progress_is_streamed_and_log_bounded():
+    """Test progress arrives while running and only recent lines are kept"""
+    updates = []
+    job = SubprocessJob(
+        "verify",
+        [sys.executable, "-c", PROGRESS_SCRIPT],
+        progress_callback=updates.append,
+        max_log_lines=5
+    )
+
+    await JobManager().submit(job)
+    await job.wait()
+
+    assert job.state == SUCCEEDED
+    assert job.success_rate == 97.5
+    assert len(job.log) == 5
+    progress = [update["progress"] for update in updates if update["state"] == "running"]
+    assert progress[1:] == sorted(progress[1:]) and 50.0 in progress
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_the_process():
+    """Test cancellation terminates the subprocess promptly"""
+    job = SubprocessJob("fingerprint", [sys.executable, "-c", "import time; time.sleep(60)"])
+    await job.start()
+    await asyncio.sleep(0.2)
+
+    start = time.time()
+    await job.cancel()
+    assert job.state == CANCELLED
+    assert time.time() - start < 5
+    with pytest.raises(asyncio.CancelledError):
+        await job.wait()
+
+
+@pytest.mark.asyncio
+async def test_cancel_while_spawning_stops_the_process():
+    """Test a job cancelled before its process exists is not started anyway"""
+    job = SubprocessJob("fingerprint", [sys.executable, "-c", "import time; time.sleep(60)"])
+    await job.start()
+    await asyncio.sleep(0)
+    assert job._process is None
+
+    start = time.time()
+    await job.cancel()
+    assert job.state == CANCELLED
+    assert time.time() - start < 5
+    assert job._process is None or job._process.returncode is not None
+    with pytest.raises(asyncio.CancelledError):
+        await job.wait()
+
+
+@pytest.mark.asyncio
+async def test_failed_job_reports_output():
+    """Test a non-zero exit fails the job with its last output"""
+    job = SubprocessJob("generate", [sys.executable, "-c", "print('CUDA out of memory'); raise SystemExit(3)"])
+    await job.start()
+    with pytest.raises(RuntimeError, match="out of memory"):
+        await job.wait()
+    assert job.state == FAILED
+    assert job.returncode == 3
+
+
+@pytest.mark.asyncio
+async def test_event_stream_ends_with_final_status():
+    """Test subscribers see updates until the job finishes"""
+    job = SubprocessJob("verify", [sys.executable, "-c", PROGRESS_SCRIPT])
+    await job.start()
+
+    states = [event["state"] async for event in job.events()]
+    assert states[-1] == SUCCEEDED
+
+
+def test_job_endpoint_is_gated_and_confined(tmp_path, monkeypatch):
+    """Test jobs need the admin setting, a known kind and paths under the fingerprint directory"""
+    from api.server import app
+
+    monkeypatch.setattr(settings, "fingerprint_dir", tmp_path)
+    (tmp_path / settings.master_fingerprints_file).write_bytes(b"secret")
+    (tmp_path / "set.json").write_text("[]")
+    client = TestClient(app)
+
+    def create(**job):
+        return client.post("/api/v1/fingerprints/jobs", json=job).status_code
+
+    fingerprint_job = {"kind": "fingerprint", "model_path": "org/model", "fingerprints_file": str(tmp_path / "set.json")}
+    assert create(**fingerprint_job) == 403
+
+    monkeypatch.setattr(settings, "fingerprint_jobs_enabled", True)
+    assert create(kind="shell") == 422
+    assert create(kind="generate", output_path=str(tmp_path.parent / "out.json")) == 400
+    assert create(**{**fingerprint_job, "model_path": "../../etc"}) == 400
+    assert create(**{**fingerprint_job, "fingerprints_file": str(tmp_path / settings.master_fingerprints_file)}) == 400
+    assert create(**{**fingerprint_job, "output_path": "/tmp/fingerprinted"}) == 400
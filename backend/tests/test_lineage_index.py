@@ -0,0 +1,132 @@
+"""
+Test the nearest-neighbor lineage index
+"""
+import numpy as np
+import pytest
+
+from agent.config import settings
+from models.lineage_index import LineageIndex
+
+
+def _unit(vector):
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return LineageIndex(index_dir=tmp_path / "lineage")
+
+
+def test_query_returns_nearest_models(index):
+    """Test top-k ordering by cosine similarity"""
+    rng = np.random.default_rng(1)
+    base = _unit(rng.standard_normal(index.dim))
+
+    index.add("base", base, {"model_path": "org/base"})
+    index.add("near", _unit(base + 0.01 * rng.standard_normal(index.dim)), {"model_path": "org/near"})
+    index.add("far", _unit(rng.standard_normal(index.dim)), {"model_path": "org/far"})
+
+    results = index.query(base, k=2, exclude_identity="base")
+
+    assert [r["identity"] for r in results] == ["near", "far"]
+    assert results[0]["similarity"] > 0.9
+    assert results[0]["model_path"] == "org/near"
+
+
+def test_reindexing_identity_replaces_row(index):
+    """Test each identity owns a single row"""
+    rng = np.random.default_rng(2)
+    index.add("model", _unit(rng.standard_normal(index.dim)), {"verdict": "NO_MATCH"})
+    replacement = _unit(rng.standard_normal(index.dim))
+    index.add("model", replacement, {"verdict": "MATCH"})
+
+    assert len(index) == 1
+    assert index.query(replacement, k=1)[0]["verdict"] == "MATCH"
+
+
+def test_index_persists_across_restarts(tmp_path):
+    """Test signatures and entries reload from disk"""
+    rng = np.random.default_rng(3)
+    vectors = [_unit(rng.standard_normal(LineageIndex(tmp_path).dim)) for _ in range(3)]
+
+    index = LineageIndex(index_dir=tmp_path)
+    for i, vector in enumerate(vectors):
+        index.add(f"model-{i}", vector, {"model_path": f"org/model-{i}"})
+    index.add("model-1", vectors[0], {"model_path": "org/model-1"})
+
+    reloaded = LineageIndex(index_dir=tmp_path)
+
+    assert len(reloaded) == 3
+    assert np.allclose(reloaded.get_signature("model-1"), vectors[0])
+    assert {r["identity"] for r in reloaded.query(vectors[0], k=2)} == {"model-0", "model-1"}
+
+
+def test_unreadable_rows_are_skipped(tmp_path):
+    """Test a corrupt entry line drops only its row and later rows line up again"""
+    rng = np.random.default_rng(5)
+    index = LineageIndex(index_dir=tmp_path)
+    vectors = [_unit(rng.standard_normal(index.dim)) for _ in range(4)]
+    for i, vector in enumerate(vectors[:3]):
+        index.add(f"model-{i}", vector, {"model_path": f"org/model-{i}"})
+
+    lines = index.entries_file.read_text().splitlines()
+    lines[1] = '{"identity": "model-1", "model_path": '
+    index.entries_file.write_text("\n".join(lines) + "\n")
+
+    reloaded = LineageIndex(index_dir=tmp_path)
+    assert len(reloaded) == 2
+    assert reloaded.get_signature("model-1") is None
+    assert np.allclose(reloaded.get_signature("model-2"), vectors[2])
+
+    reloaded.add("model-3", vectors[3], {"model_path": "org/model-3"})
+    again = LineageIndex(index_dir=tmp_path)
+    assert len(again) == 3
+    assert np.allclose(again.get_signature("model-3"), vectors[3])
+
+
+def test_lsh_finds_near_duplicate(index, monkeypatch):
+    """Test approximate search recovers close neighbours among many models"""
+    monkeypatch.setattr(settings, "lineage_exact_search_limit", 0)
+    rng = np.random.default_rng(4)
+
+    for i in range(2000):
+        index.add(f"noise-{i}", _unit(rng.standard_normal(index.dim)), {})
+    target = _unit(rng.standard_normal(index.dim))
+    index.add("target", target, {})
+
+    query = _unit(target + 0.02 * rng.standard_normal(index.dim))
+    assert index.query(query, k=1)[0]["identity"] == "target"
+
+
+def test_signature_separates_lineages(index, tiny_model_factory, tmp_path):
+    """Test weight-sketch signatures of the same weights coincide"""
+    from models.identity import ModelIdentityService
+    from models.sketch import WeightSketcher
+
+    sketcher = WeightSketcher(ModelIdentityService(cache_file=tmp_path / "id.json"), sketch_dir=tmp_path / "s")
+    first = index.build_signature(sketcher.sketch(str(tiny_model_factory("lineage-a", seed=5))))
+    same = index.build_signature(sketcher.sketch(str(tiny_model_factory("lineage-b", seed=5))))
+    other = index.build_signature(sketcher.sketch(str(tiny_model_factory("lineage-c", seed=6))))
+
+    assert float(first @ same) > 0.99
+    assert float(first @ other) < 0.5
+
+
+@pytest.mark.asyncio
+async def test_audits_index_only_when_enabled(tiny_model_factory, sample_fingerprints, monkeypatch):
+    """Test audits report nearest models once the opt-in index is on"""
+    from agent.audit_engine import AuditEngine
+
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = sample_fingerprints
+    first = str(tiny_model_factory("indexed-a", seed=7))
+    second = str(tiny_model_factory("indexed-b", seed=8))
+
+    assert (await engine.audit_model(first, "quick"))["similar_models"] is None
+    assert len(engine.lineage_index) == 0
+
+    monkeypatch.setattr(settings, "lineage_index_enabled", True)
+    await engine.audit_model(first, "quick")
+    result = await engine.audit_model(second, "quick")
+
+    assert [m["model_path"] for m in result["similar_models"]] == [first]
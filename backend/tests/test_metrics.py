@@ -0,0 +1,83 @@
+"""
+Test the metrics registry and audit instrumentation
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from agent.audit_engine import AuditEngine
+from agent.config import settings
+from utils.metrics import AUDIT_STAGE_SECONDS, AUDITS, MODEL_CACHE_EVENTS, MetricsRegistry
+
+
+def test_prometheus_text_format():
+    """Test counters, gauges and cumulative histogram buckets are rendered"""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests", "Requests served", ["path"])
+    depth = registry.gauge("depth", "Queue depth")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    depth.set(3)
+    latency.observe(0.05)
+    latency.observe(0.5, count=2)
+    latency.observe(5)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{path="/a\\"b"} 3' in lines
+    assert "depth 3" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 6.05" in lines
+    assert "latency_seconds_count 4" in lines
+
+    with pytest.raises(ValueError):
+        registry.counter("requests", "Duplicate")
+    with pytest.raises(ValueError):
+        requests.labels("/a", "extra")
+
+
+def _count(stage: str) -> int:
+    return sum(AUDIT_STAGE_SECONDS.labels(stage).counts)
+
+
+@pytest.mark.asyncio
+async def test_audit_records_stages_cache_events_and_verdict(sample_fingerprints, tiny_model_dir):
+    """Test an audit times each stage and counts its load, cache hit and verdict"""
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = sample_fingerprints
+    stages = ["queue_wait", "model_load", "tokenization", "generation", "matching"]
+    before = {stage: _count(stage) for stage in stages}
+    misses = MODEL_CACHE_EVENTS.labels("model_loader", "miss").value
+    hits = MODEL_CACHE_EVENTS.labels("model_loader", "hit").value
+
+    result = await engine.audit_model(str(tiny_model_dir), "quick")
+    verdicts = AUDITS.labels(result["verdict"]).value
+    for _ in range(2):
+        await engine.model_loader.load_model(str(tiny_model_dir))
+
+    for stage in stages:
+        assert _count(stage) > before[stage], stage
+    assert _count("generation") - before["generation"] == result["total_tested"]
+    assert MODEL_CACHE_EVENTS.labels("model_loader", "miss").value >= misses + 2
+    assert MODEL_CACHE_EVENTS.labels("model_loader", "hit").value >= hits + 1
+    assert verdicts >= 1
+
+
+def test_metrics_endpoint(tmp_path, monkeypatch):
+    """Test /metrics serves the registry with scrape-time gauges"""
+    from api.server import app
+
+    monkeypatch.setattr(settings, "audit_jobs_db", tmp_path / "audit_jobs.sqlite3")
+
+    with TestClient(app) as client:
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'guardian_audit_queue_depth{queue="jobs"} 0' in response.text
+    assert "guardian_audits_running 0" in response.text
+    assert "# TYPE guardian_audit_stage_seconds histogram" in response.text
+    assert "guardian_resident_model_bytes" in response.text
@@ -0,0 +1,87 @@
+"""
+Test the pure-ASGI logging and error-handling middleware
+"""
+import asyncio
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.middleware import ErrorHandlingMiddleware, RequestLoggingMiddleware
+
+
+def _app(**logging_options):
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("kaboom")
+
+    app.add_middleware(ErrorHandlingMiddleware, debug=True)
+    app.add_middleware(RequestLoggingMiddleware, **logging_options)
+    return app
+
+
+def test_timing_header_and_error_mapping():
+    """Test responses are timed and unhandled errors become JSON 500s"""
+    client = TestClient(_app(), raise_server_exceptions=False)
+
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert float(response.headers["X-Process-Time"]) >= 0
+
+    response = client.get("/boom")
+    assert response.status_code == 500
+    assert response.json() == {"error": "Internal server error", "message": "kaboom"}
+    assert "X-Process-Time" in response.headers
+
+
+def test_health_probes_are_sampled(caplog):
+    """Test sampled paths log one request in N while others always log"""
+    client = TestClient(_app(sampled_paths=["/health"], sample_every=3))
+    with caplog.at_level(logging.INFO, logger="api.middleware"):
+        for _ in range(7):
+            client.get("/health")
+        client.get("/missing")
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len([m for m in messages if m == "→ GET /health"]) == 3
+    assert len([m for m in messages if m == "→ GET /missing"]) == 1
+    assert any(m.startswith("← GET /missing [404]") for m in messages)
+
+
+@pytest.mark.asyncio
+async def test_streamed_body_is_not_buffered():
+    """Test each body chunk is forwarded before the app produces the next"""
+    release = asyncio.Event()
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"first", "more_body": True})
+        await release.wait()
+        await send({"type": "http.response.body", "body": b"second", "more_body": False})
+
+    app = RequestLoggingMiddleware(ErrorHandlingMiddleware(streaming_app), sampled_paths=[])
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/stream", "headers": []}
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.sleep(0.01)
+
+    assert [message.get("body") for message in sent] == [None, b"first"]
+    assert (b"x-process-time", sent[0]["headers"][0][1]) == sent[0]["headers"][0]
+
+    release.set()
+    await task
+    assert sent[-1]["body"] == b"second"
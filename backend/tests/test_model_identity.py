@@ -0,0 +1,128 @@
+"""
+Test content-addressed model identity
+"""
+import shutil
+
+import huggingface_hub
+import pytest
+
+from models.identity import ModelIdentityService
+from utils.crypto import hash_model_identifier
+
+
+def _write_model(directory, shards):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, content in shards.items():
+        (directory / name).write_bytes(content)
+    return directory
+
+
+def test_same_weights_under_two_paths(tmp_path):
+    """Test aliases of the same weights share an identity"""
+    service = ModelIdentityService(cache_file=tmp_path / "cache.json")
+
+    shards = {"model.safetensors": b"weights" * 1000}
+    first = _write_model(tmp_path / "a", shards)
+    second = _write_model(tmp_path / "b", shards)
+
+    assert service.get_identity(str(first)) == service.get_identity(str(second))
+
+
+def test_reuploaded_weights_change_identity(tmp_path):
+    """Test replacing weights under the same path changes the identity"""
+    service = ModelIdentityService(cache_file=tmp_path / "cache.json")
+
+    model_dir = _write_model(tmp_path / "model", {"model.safetensors": b"original"})
+    before = service.get_identity(str(model_dir))
+
+    _write_model(model_dir, {"model.safetensors": b"re-uploaded weights"})
+    after = service.get_identity(str(model_dir))
+
+    assert before != after
+
+
+def test_prefers_safetensors_and_skips_training_args(tmp_path):
+    """Test weight file discovery"""
+    service = ModelIdentityService(cache_file=tmp_path / "cache.json")
+
+    model_dir = _write_model(tmp_path / "model", {
+        "model-00001-of-00002.safetensors": b"one",
+        "model-00002-of-00002.safetensors": b"two",
+        "pytorch_model.bin": b"legacy",
+    })
+    files = service.list_weight_files(str(model_dir))
+    assert [f.name for f in files] == [
+        "model-00001-of-00002.safetensors",
+        "model-00002-of-00002.safetensors",
+    ]
+
+    bin_dir = _write_model(tmp_path / "bin", {
+        "pytorch_model.bin": b"weights",
+        "training_args.bin": b"args",
+    })
+    assert [f.name for f in service.list_weight_files(str(bin_dir))] == ["pytorch_model.bin"]
+
+
+def test_digests_cached_by_size_and_mtime(tmp_path, monkeypatch):
+    """Test unchanged files are not re-hashed, including across instances"""
+    cache_file = tmp_path / "cache.json"
+    model_dir = _write_model(tmp_path / "model", {"model.safetensors": b"weights"})
+
+    service = ModelIdentityService(cache_file=cache_file)
+    identity = service.get_identity(str(model_dir))
+
+    reloaded = ModelIdentityService(cache_file=cache_file)
+
+    def fail(path):
+        raise AssertionError(f"unexpected re-hash of {path}")
+
+    monkeypatch.setattr(reloaded, "_hash_file", fail)
+    assert reloaded.get_identity(str(model_dir)) == identity
+
+
+def test_unknown_model_falls_back_to_path_hash(tmp_path):
+    """Test models without local weights use the path hash"""
+    service = ModelIdentityService(cache_file=tmp_path / "cache.json")
+    missing = str(tmp_path / "does-not-exist")
+
+    assert service.get_identity(missing) == hash_model_identifier(missing)
+
+
+def test_tokenizer_and_config_change_identity(tmp_path):
+    """Test the same weights with another tokenizer are another model"""
+    service = ModelIdentityService(cache_file=tmp_path / "cache.json")
+
+    shards = {"model.safetensors": b"weights" * 1000}
+    first = _write_model(tmp_path / "a", {**shards, "tokenizer.json": b'{"vocab": 1}'})
+    second = _write_model(tmp_path / "b", {**shards, "tokenizer.json": b'{"vocab": 2}'})
+    third = _write_model(tmp_path / "c", {**shards, "tokenizer.json": b'{"vocab": 1}', "config.json": b"{}"})
+
+    identities = {service.get_identity(str(path)) for path in (first, second, third)}
+    assert len(identities) == 3
+
+
+@pytest.mark.asyncio
+async def test_hub_id_keeps_its_identity_across_download(tiny_model_dir, tmp_path, monkeypatch):
+    """Test a Hub ID loaded for the first time unloads under the same key"""
+    from models.loader import ModelLoader
+
+    snapshot = tmp_path / "hub" / "tiny"
+
+    def fake_snapshot_download(repo_id, local_files_only=False, token=None):
+        if not snapshot.exists():
+            if local_files_only:
+                raise FileNotFoundError(repo_id)
+            shutil.copytree(tiny_model_dir, snapshot)
+        return str(snapshot)
+
+    monkeypatch.setattr(huggingface_hub, "snapshot_download", fake_snapshot_download)
+    loader = ModelLoader()
+
+    identity = loader.model_identity("org/tiny")
+    assert identity == loader.identity.get_identity(str(tiny_model_dir))
+
+    await loader.load_model("org/tiny")
+    assert loader.get_stats()["resident_models"] == 1
+
+    await loader.unload_model("org/tiny")
+    assert loader.get_stats()["resident_models"] == 0
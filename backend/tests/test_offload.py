@@ -0,0 +1,98 @@
+"""
+Test disk-offloaded execution for models larger than the memory cap
+"""
+from types import SimpleNamespace
+
+import psutil
+import pytest
+import torch
+
+from agent.audit_engine import AuditEngine
+from agent.config import settings
+from models.loader import ModelLoader
+from models.offload import is_offloaded
+
+
+FINGERPRINTS = {
+    "queries": ["apple red dog", "blue ocean one", "happy cat jump", "moon star rain"],
+    "responses": {
+        "apple red dog": "fish fish",
+        "blue ocean one": "two three",
+        "happy cat jump": "slow lion",
+        "moon star rain": "pen desk"
+    }
+}
+
+
+@pytest.fixture
+def tiny_memory_cap(monkeypatch, tmp_path):
+    """A memory cap far smaller than the tiny model"""
+    monkeypatch.setattr(settings, "offload_max_memory_gb", 16 * 1024 / 1024**3)
+    monkeypatch.setattr(settings, "offload_folder", tmp_path / "offload")
+
+
+def test_auto_offload_by_checkpoint_size(tiny_model_dir, tiny_memory_cap, monkeypatch):
+    """Test auto mode offloads only checkpoints above the cap"""
+    loader = ModelLoader()
+    assert not loader.should_offload(str(tiny_model_dir))
+
+    monkeypatch.setattr(settings, "offload_mode", "auto")
+    assert loader.should_offload(str(tiny_model_dir))
+
+    monkeypatch.setattr(settings, "offload_max_memory_gb", 1.0)
+    assert not loader.should_offload(str(tiny_model_dir))
+
+    monkeypatch.setattr(settings, "offload_mode", "never")
+    monkeypatch.setattr(settings, "offload_max_memory_gb", 0.0)
+    assert not loader.should_offload(str(tiny_model_dir))
+
+
+def test_auto_offload_sizes_weights_at_the_target_precision(tiny_model_dir, monkeypatch):
+    """Test the cap is compared with the loaded size and defaults to available memory"""
+    monkeypatch.setattr(settings, "offload_mode", "auto")
+    loader = ModelLoader()
+    fp32_bytes = loader.weight_bytes(str(tiny_model_dir))
+    assert loader.weight_bytes(str(tiny_model_dir), torch.bfloat16) == fp32_bytes // 2
+
+    monkeypatch.setattr(settings, "offload_max_memory_gb", 0.75 * fp32_bytes / 1024**3)
+    assert loader.should_offload(str(tiny_model_dir))
+    assert not loader.should_offload(str(tiny_model_dir), precision="bf16")
+
+    monkeypatch.setattr(settings, "offload_max_memory_gb", None)
+    monkeypatch.setattr(psutil, "virtual_memory", lambda: SimpleNamespace(available=fp32_bytes))
+    assert loader.offload_memory_cap() == int(fp32_bytes * settings.offload_memory_fraction)
+    assert loader.should_offload(str(tiny_model_dir))
+
+
+@pytest.mark.asyncio
+async def test_offloaded_outputs_match_resident(tiny_model_dir, tiny_memory_cap):
+    """Test offloaded generation matches the fully loaded model"""
+    engine = AuditEngine()
+    queries = FINGERPRINTS["queries"]
+
+    resident, tokenizer = await engine.model_loader.load_model(str(tiny_model_dir), offload=False)
+    expected = await engine._query_batch(resident, tokenizer, queries, max_length=8)
+
+    offloaded, tokenizer = await engine.model_loader.load_model(str(tiny_model_dir), offload=True)
+    assert is_offloaded(offloaded)
+    assert all(expected)
+    assert await engine._query_batch(offloaded, tokenizer, queries, max_length=8) == expected
+
+
+@pytest.mark.asyncio
+async def test_offloaded_audit_reports_bytes_read(tiny_model_dir, tiny_memory_cap, monkeypatch):
+    """Test an offloaded audit batches fingerprints and reports weight reads"""
+    monkeypatch.setattr(settings, "lineage_index_enabled", False)
+    monkeypatch.setattr(settings, "audit_batch_size", 1)
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = FINGERPRINTS
+
+    result = await engine.audit_model(str(tiny_model_dir), mode="quick", offload=True)
+
+    stats = result["offload"]
+    assert result["verdict"] != "ERROR"
+    assert stats["weight_bytes_read"] > 0
+    assert stats["bytes_per_fingerprint"] == stats["weight_bytes_read"] / result["total_tested"]
+    # All fingerprints share one batch, so weights are streamed once per decode step
+    assert stats["forward_passes"] <= 100
+    assert engine.model_loader.get_stats()["resident_models"] == 0
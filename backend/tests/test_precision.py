@@ -0,0 +1,128 @@
+"""
+Test the weight precision policy and its fp32 equivalence guard
+"""
+import pytest
+import torch
+
+from agent.audit_engine import AuditEngine
+from agent.config import settings
+from agent.precision import PrecisionGuard
+from models.loader import ModelLoader
+
+
+FINGERPRINTS = {
+    "queries": ["apple red dog", "blue ocean one", "happy cat jump", "moon star rain"],
+    "responses": {
+        "apple red dog": "fish fish",
+        "blue ocean one": "two three",
+        "happy cat jump": "slow lion",
+        "moon star rain": "pen desk"
+    }
+}
+
+
+def _guard(tmp_path, disagree_on=None):
+    """Guard whose queries answer by dtype, optionally disagreeing for one"""
+    calls = []
+
+    async def query_batch(model, tokenizer, queries):
+        dtype = next(model.parameters()).dtype
+        calls.append(dtype)
+        return [f"{query} {'x' if dtype == disagree_on else ''}".strip() for query in queries]
+
+    guard = PrecisionGuard(ModelLoader(), query_batch, cache_file=tmp_path / "verdicts.json")
+    return guard, calls
+
+
+def test_resolve_precision_policy(tmp_path, monkeypatch):
+    """Test explicit precision beats the mode policy, which beats the default"""
+    guard, _ = _guard(tmp_path)
+    monkeypatch.setattr(settings, "precision_by_mode", {"quick": "bf16"})
+
+    assert guard.resolve("quick") == "bf16"
+    assert guard.resolve("deep") == settings.model_precision
+    assert guard.resolve("quick", "fp16") == "fp16"
+
+    with pytest.raises(ValueError):
+        guard.resolve("quick", "int3")
+
+
+@pytest.mark.asyncio
+async def test_equivalent_precision_is_kept(tiny_model_dir, tmp_path):
+    """Test bf16 is used when it reproduces fp32 greedy outputs"""
+    guard, calls = _guard(tmp_path)
+
+    result = await guard.validate(str(tiny_model_dir), "bf16", FINGERPRINTS)
+
+    assert result["used"] == "bf16"
+    assert result["agreement"] == 1.0
+    assert calls == [torch.float32, torch.bfloat16]
+    assert guard.model_loader.get_stats()["resident_models"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reference_is_freed_before_reduced_load(tiny_model_dir, tmp_path):
+    """Test the fp32 and reduced copies are never resident at the same time"""
+    resident = []
+
+    async def query_batch(model, tokenizer, queries):
+        resident.append(guard.model_loader.get_stats()["resident_models"])
+        return list(queries)
+
+    guard = PrecisionGuard(ModelLoader(), query_batch, cache_file=tmp_path / "verdicts.json")
+
+    result = await guard.validate(str(tiny_model_dir), "bf16", FINGERPRINTS)
+
+    assert result["used"] == "bf16"
+    assert resident == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_disagreement_falls_back_to_fp32(tiny_model_dir, tmp_path):
+    """Test any greedy disagreement falls back to fp32 and is cached"""
+    guard, calls = _guard(tmp_path, disagree_on=torch.float16)
+
+    result = await guard.validate(str(tiny_model_dir), "fp16", FINGERPRINTS)
+    assert result["used"] == "fp32"
+    assert result["agreement"] == 0.0
+
+    # The cached verdict skips the comparison, also for a new guard
+    again, calls_again = _guard(tmp_path, disagree_on=torch.float16)
+    assert (await again.validate(str(tiny_model_dir), "fp16", FINGERPRINTS))["used"] == "fp32"
+    assert calls_again == []
+
+
+@pytest.mark.asyncio
+async def test_failed_outputs_are_not_equivalent(tiny_model_dir, tmp_path):
+    """Test empty (failed) outputs on both sides fall back to fp32 and are not cached"""
+    calls = []
+
+    async def query_batch(model, tokenizer, queries):
+        calls.append(next(model.parameters()).dtype)
+        return [""] * len(queries)
+
+    guard = PrecisionGuard(ModelLoader(), query_batch, cache_file=tmp_path / "verdicts.json")
+
+    result = await guard.validate(str(tiny_model_dir), "bf16", FINGERPRINTS)
+    assert result["used"] == "fp32"
+    assert result["agreement"] == 0.0
+
+    await guard.validate(str(tiny_model_dir), "bf16", FINGERPRINTS)
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_audit_in_reduced_precision(tiny_model_dir, tmp_path, monkeypatch):
+    """Test a bf16 audit reports the precision actually used"""
+    monkeypatch.setattr(settings, "lineage_index_enabled", False)
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = FINGERPRINTS
+    engine.precision_guard.cache_file = tmp_path / "verdicts.json"
+    engine.precision_guard._verdicts = {}
+
+    result = await engine.audit_model(str(tiny_model_dir), mode="quick", precision="bf16")
+
+    assert result["verdict"] != "ERROR"
+    assert result["precision"]["requested"] == "bf16"
+    assert result["precision"]["used"] in ("bf16", "fp32")
+    assert engine.model_loader.get_stats()["resident_models"] == 0
@@ -0,0 +1,94 @@
+"""
+Test tokenizer/config preflight triage
+"""
+import threading
+
+import pytest
+from agent.config import settings
+from agent.audit_engine import AuditEngine
+
+
+FINGERPRINTS = {
+    "queries": ["apple red dog", "blue ocean one"],
+    "responses": {
+        "apple red dog": "happy cat jump",
+        "blue ocean one": "moon star rain"
+    }
+}
+
+
+@pytest.fixture
+def engine(monkeypatch, tiny_model_dir):
+    monkeypatch.setattr(settings, "base_model_name", str(tiny_model_dir))
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = FINGERPRINTS
+    return engine
+
+
+def test_preflight_passes_same_lineage(engine, tiny_model_factory):
+    """Test a model sharing the guardian's tokenizer is compatible"""
+    candidate = tiny_model_factory("derivative", seed=1)
+
+    result = engine.preflight.check(str(candidate), engine._preflight_texts(FINGERPRINTS))
+
+    assert result["compatible"] is True
+    assert result["token_agreement"] == 1.0
+    assert result["reasons"] == []
+
+
+def test_preflight_flags_different_vocabulary(engine, tiny_model_factory):
+    """Test a model with another vocabulary is flagged"""
+    candidate = tiny_model_factory("foreign", words=["zebra", "quartz", "violin", "apple"])
+
+    result = engine.preflight.check(str(candidate), engine._preflight_texts(FINGERPRINTS))
+
+    assert result["compatible"] is False
+    assert result["token_agreement"] < settings.preflight_min_token_agreement
+    assert any("Tokenizer" in reason for reason in result["reasons"])
+
+
+def test_preflight_inconclusive_when_unloadable(engine, tmp_path):
+    """Test preflight does not block audits it cannot evaluate"""
+    result = engine.preflight.check(str(tmp_path / "missing"), [])
+
+    assert result["compatible"] is True
+    assert result["inconclusive"] is True
+
+
+@pytest.mark.asyncio
+async def test_audit_skips_incompatible_lineage(engine, monkeypatch, tiny_model_factory):
+    """Test the skip policy returns without loading the model"""
+    monkeypatch.setattr(settings, "preflight_enabled", True)
+    monkeypatch.setattr(settings, "preflight_policy", "skip")
+    candidate = tiny_model_factory("foreign-skip", words=["zebra", "quartz", "violin"])
+
+    async def fail_load(*args, **kwargs):
+        raise AssertionError("full load should be skipped")
+
+    monkeypatch.setattr(engine.model_loader, "load_model", fail_load)
+
+    result = await engine.audit_model(str(candidate), mode="quick")
+
+    assert result["verdict"] == "INCOMPATIBLE_LINEAGE"
+    assert result["preflight"]["reasons"]
+
+
+@pytest.mark.asyncio
+async def test_audit_runs_preflight_off_the_event_loop(engine, monkeypatch, tiny_model_factory):
+    """Test the preflight check runs on a worker thread"""
+    monkeypatch.setattr(settings, "preflight_enabled", True)
+    monkeypatch.setattr(settings, "preflight_policy", "skip")
+    candidate = tiny_model_factory("foreign-thread", words=["zebra", "quartz", "violin"])
+    threads = []
+    original = engine.preflight.check
+
+    def check(*args):
+        threads.append(threading.current_thread())
+        return original(*args)
+
+    monkeypatch.setattr(engine.preflight, "check", check)
+
+    result = await engine.audit_model(str(candidate), mode="quick")
+
+    assert result["verdict"] == "INCOMPATIBLE_LINEAGE"
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,93 @@
+"""
+Test opt-in per-audit profiling and its artifact download
+"""
+import json
+
+import pytest
+import torch
+from fastapi.testclient import TestClient
+
+from agent.audit_engine import AuditEngine
+from agent.config import settings
+from agent.profiler import AuditProfiler, current_profiler
+
+
+@pytest.fixture
+def engine(sample_fingerprints):
+    engine = AuditEngine()
+    engine.validator._master_fingerprints = sample_fingerprints
+    return engine
+
+
+@pytest.fixture
+def profiling(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    monkeypatch.setattr(settings, "profiles_dir", tmp_path / "profiles")
+    return tmp_path / "profiles"
+
+
+@pytest.mark.asyncio
+async def test_profiled_audit_reports_time_split(engine, tiny_model_dir, profiling):
+    """Test a profiled audit saves artifacts and splits time by kind"""
+    result = await engine.audit_model(str(tiny_model_dir), "quick", profile=True)
+    report = result["profile"]
+
+    assert result["verdict"] != "ERROR"
+    assert report["batches"] >= 1
+    assert set(report["breakdown"]) == {"operator_kernels", "tokenization", "python_overhead", "other"}
+    assert report["breakdown"]["operator_kernels"] > 0
+    assert sum(report["breakdown"].values()) == pytest.approx(report["wall_seconds"], rel=0.05)
+    assert report["top_operators"] and report["top_functions"]
+
+    for artifact in report["artifacts"]:
+        assert (profiling / report["id"] / artifact).is_file()
+    assert json.loads(AuditProfiler.artifact_path(report["id"]).read_text())["id"] == report["id"]
+    assert AuditProfiler.artifact_path(report["id"], "../../secrets") is None
+    assert AuditProfiler.artifact_path("../" + report["id"][3:]) is None
+
+
+@pytest.mark.asyncio
+async def test_unprofiled_audits_run_without_profiler(engine, tiny_model_dir, monkeypatch):
+    """Test profiling is refused unless enabled and absent from plain audits"""
+    seen = []
+    generate_batch = engine._generate_batch
+
+    def record(*args, **kwargs):
+        seen.append(current_profiler())
+        return generate_batch(*args, **kwargs)
+
+    monkeypatch.setattr(engine, "_generate_batch", record)
+
+    result = await engine.audit_model(str(tiny_model_dir), "quick")
+    assert "profile" not in result
+    assert seen and all(profiler is None for profiler in seen)
+
+    with pytest.raises(PermissionError):
+        await engine.audit_model(str(tiny_model_dir), "quick", profile=True)
+
+
+def test_profile_download_endpoint(tiny_model_dir, profiling, monkeypatch):
+    """Test profile artifacts are served only while profiling is enabled"""
+    from api.server import app
+
+    profiler = AuditProfiler("org/model", "quick")
+    with profiler.activate():
+        profiler.wrap(torch.matmul)(torch.ones(4, 4), torch.ones(4, 4))
+    report = profiler.save()
+    client = TestClient(app)
+
+    response = client.get(f"/api/v1/audit/profiles/{profiler.id}")
+    assert response.status_code == 200
+    assert response.json()["breakdown"] == report["breakdown"]
+    assert "aten::matmul" in [op["name"] for op in report["top_operators"]]
+
+    response = client.get(f"/api/v1/audit/profiles/{profiler.id}/python.prof")
+    assert response.status_code == 200
+    assert response.content
+
+    assert client.get(f"/api/v1/audit/profiles/{'0' * 32}").status_code == 404
+
+    monkeypatch.setattr(settings, "profiling_enabled", False)
+    assert client.get(f"/api/v1/audit/profiles/{profiler.id}").status_code == 403
+    response = client.post("/api/v1/audit", json={"model_path": str(tiny_model_dir), "profile": True})
+    assert response.status_code == 403
@@ -0,0 +1,89 @@
+"""
+Test priority-ordered audit admission
+"""
+import asyncio
+import pytest
+from agent.scheduler import AuditScheduler
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_concurrency():
+    """Test no more than max_concurrent audits hold a slot"""
+    scheduler = AuditScheduler(max_concurrent=2)
+    peak = 0
+
+    async def audit():
+        nonlocal peak
+        async with scheduler.slot():
+            peak = max(peak, scheduler.active)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(audit() for _ in range(5)))
+
+    assert peak == 2
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_is_unlimited_by_default():
+    """Test audits are not serialized unless max_concurrent_audits is set"""
+    scheduler = AuditScheduler()
+    peak = 0
+
+    async def audit():
+        nonlocal peak
+        async with scheduler.slot():
+            peak = max(peak, scheduler.active)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(audit() for _ in range(5)))
+
+    assert scheduler.max_concurrent is None
+    assert peak == 5
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_admits_by_priority():
+    """Test deprioritized audits run after normal ones"""
+    scheduler = AuditScheduler(max_concurrent=1)
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with scheduler.slot():
+            await release.wait()
+
+    async def audit(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    blocking = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    waiting = [
+        asyncio.create_task(audit("low", AuditScheduler.PRIORITY_LOW)),
+        asyncio.create_task(audit("normal", AuditScheduler.PRIORITY_NORMAL)),
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.pending == 2
+
+    release.set()
+    await asyncio.gather(blocking, *waiting)
+
+    assert order == ["normal", "low"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_survives_cancelled_waiter():
+    """Test a cancelled waiter does not leak its slot"""
+    scheduler = AuditScheduler(max_concurrent=1)
+
+    async with scheduler.slot():
+        waiter = asyncio.create_task(scheduler._acquire(0))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    async with scheduler.slot():
+        assert scheduler.active == 1
@@ -0,0 +1,111 @@
+"""
+Test incremental SSE streaming from /assist
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from api.routes import SSEResponseHandler, assist_endpoint
+from api.schemas import ChatRequest
+
+
+def _decode(chunk):
+    assert chunk.startswith("data: ") and chunk.endswith("\n\n")
+    return json.loads(chunk[len("data: "):])
+
+
+class GatedAgent:
+    """Emits one event, then waits to be released before finishing"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.cancelled = False
+
+    async def assist(self, session, query, response_handler):
+        stream = response_handler.create_text_stream("AUDIT_PROGRESS")
+        await stream.emit_chunk("Testing fingerprints...")
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        await stream.complete()
+        await response_handler.complete()
+
+
+def _request(agent):
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(agent=agent)))
+
+
+@pytest.mark.asyncio
+async def test_recording_mode_keeps_events():
+    """Test the default handler still records events for replay"""
+    handler = SSEResponseHandler()
+    await handler.emit_text_block("INFO", "hello")
+    await handler.create_text_stream("AUDIT_PROGRESS").emit_chunk("chunk")
+    await handler.complete()
+    await handler.complete()
+
+    assert [event["type"] for event in handler.events] == ["text_block", "text_stream", "done"]
+    replayed = [_decode(chunk) async for chunk in handler.get_events()]
+    assert replayed == handler.events
+
+
+@pytest.mark.asyncio
+async def test_emitters_wait_for_slow_clients():
+    """Test a full buffer holds the emitter until the client reads"""
+    handler = SSEResponseHandler(stream=True, max_queued=2)
+
+    async def emit_all():
+        for i in range(5):
+            await handler.emit_text_block("INFO", str(i))
+        await handler.complete()
+
+    emitter = asyncio.create_task(emit_all())
+    await asyncio.sleep(0.05)
+    assert not emitter.done()
+    assert handler._queue.qsize() == 2
+
+    events = [_decode(chunk) async for chunk in handler.get_events()]
+    await emitter
+    assert [event.get("content") for event in events] == ["0", "1", "2", "3", "4", None]
+    assert events[-1]["type"] == "done"
+    assert handler.events == []
+
+
+@pytest.mark.asyncio
+async def test_assist_streams_before_query_finishes():
+    """Test the first event reaches the client while the agent is still working"""
+    agent = GatedAgent()
+    response = await assist_endpoint(_request(agent), ChatRequest(message="audit gpt2"))
+    body = response.body_iterator
+
+    first = _decode(await asyncio.wait_for(body.__anext__(), timeout=1))
+    assert first == {"type": "text_stream", "event_type": "AUDIT_PROGRESS", "chunk": "Testing fingerprints..."}
+
+    agent.release.set()
+    rest = [_decode(chunk) async for chunk in body]
+    assert [event["type"] for event in rest] == ["text_stream_complete", "done"]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_query_and_errors_are_streamed():
+    """Test closing the stream stops the agent and failures end the stream cleanly"""
+    agent = GatedAgent()
+    response = await assist_endpoint(_request(agent), ChatRequest(message="audit gpt2"))
+    body = response.body_iterator
+    await body.__anext__()
+    await body.aclose()
+    assert agent.cancelled
+
+    class FailingAgent:
+        async def assist(self, session, query, response_handler):
+            raise RuntimeError("model exploded")
+
+    response = await assist_endpoint(_request(FailingAgent()), ChatRequest(message="audit gpt2"))
+    events = [_decode(chunk) async for chunk in response.body_iterator]
+    assert events[0]["type"] == "error"
+    assert "model exploded" in events[0]["error"]["message"]
+    assert events[-1] == {"type": "done"}
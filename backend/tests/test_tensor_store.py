@@ -0,0 +1,107 @@
+"""
+Test content-addressed tensor sharing between cached models
+"""
+import pytest
+import torch
+from transformers import AutoModelForCausalLM
+
+from models.loader import ModelLoader
+from models.tensor_store import TensorStore
+
+
+def _fine_tune_first_block(source_dir, target_dir):
+    """Simulate a fine-tune that only changed the first block"""
+    model = AutoModelForCausalLM.from_pretrained(source_dir)
+    with torch.no_grad():
+        for param in model.transformer.h[0].parameters():
+            param.add_(0.01)
+    model.save_pretrained(target_dir)
+    return target_dir
+
+
+def _logits(model, ids):
+    with torch.no_grad():
+        return model(ids).logits
+
+
+def test_identical_tensors_stored_once(tiny_model_dir, tmp_path):
+    """Test unchanged layers are shared and charged once"""
+    store = TensorStore(dedup=True)
+    base = AutoModelForCausalLM.from_pretrained(tiny_model_dir)
+    tuned = AutoModelForCausalLM.from_pretrained(_fine_tune_first_block(tiny_model_dir, tmp_path / "tuned"))
+
+    ids = torch.tensor([[2, 3, 4, 5]])
+    expected = _logits(tuned, ids)
+
+    first = store.register("base", base)
+    second = store.register("tuned", tuned)
+
+    assert second < first
+    assert store.total_bytes() < store.logical_bytes()
+    assert base.transformer.h[1].mlp.c_fc.weight.data_ptr() == tuned.transformer.h[1].mlp.c_fc.weight.data_ptr()
+    assert base.transformer.h[0].mlp.c_fc.weight.data_ptr() != tuned.transformer.h[0].mlp.c_fc.weight.data_ptr()
+    assert tuned.lm_head.weight is tuned.transformer.wte.weight
+    assert torch.equal(_logits(tuned, ids), expected)
+
+
+def test_release_frees_unshared_tensors(tiny_model_dir):
+    """Test tensors are dropped once no model references them"""
+    store = TensorStore(dedup=True)
+    store.register("a", AutoModelForCausalLM.from_pretrained(tiny_model_dir))
+    store.register("b", AutoModelForCausalLM.from_pretrained(tiny_model_dir))
+    shared_bytes = store.total_bytes()
+
+    store.release("a")
+    assert store.total_bytes() == shared_bytes
+
+    store.release("b")
+    assert store.total_bytes() == 0
+
+
+def test_materialize_copies_on_write(tiny_model_dir):
+    """Test a model can take private copies before mutating weights"""
+    store = TensorStore(dedup=True)
+    first = AutoModelForCausalLM.from_pretrained(tiny_model_dir)
+    second = AutoModelForCausalLM.from_pretrained(tiny_model_dir)
+    store.register("first", first)
+    store.register("second", second)
+    shared_bytes = store.total_bytes()
+
+    store.materialize("second", second)
+    with torch.no_grad():
+        second.transformer.h[1].mlp.c_fc.weight.add_(1.0)
+
+    assert not torch.equal(first.transformer.h[1].mlp.c_fc.weight, second.transformer.h[1].mlp.c_fc.weight)
+    # Every weight of "second" now has a private copy, charged until its release
+    assert store.total_bytes() == shared_bytes + store.logical_bytes() // 2
+    store.release("second")
+    assert store.total_bytes() == shared_bytes
+
+
+@pytest.mark.asyncio
+async def test_loader_evicts_by_shared_bytes(tiny_model_dir, tmp_path):
+    """Test the loader budget counts shared bytes once"""
+    tuned_dir = _fine_tune_first_block(tiny_model_dir, tmp_path / "tuned")
+    loader = ModelLoader()
+
+    await loader.load_model(str(tiny_model_dir))
+    single = loader.get_stats()["resident_bytes"]
+
+    loader.max_bytes = int(single * 1.5)
+    await loader.load_model(str(tuned_dir))
+    assert loader.get_stats()["resident_models"] == 2
+
+    loader.max_bytes = single
+    other_dir = tmp_path / "other"
+    model = AutoModelForCausalLM.from_pretrained(tiny_model_dir)
+    with torch.no_grad():
+        for param in model.parameters():
+            param.mul_(1.5)
+    model.save_pretrained(other_dir)
+    for name in ("tokenizer.json", "tokenizer_config.json"):
+        (other_dir / name).write_bytes((tiny_model_dir / name).read_bytes())
+
+    await loader.load_model(str(other_dir))
+    stats = loader.get_stats()
+    assert stats["resident_models"] == 1
+    assert stats["resident_bytes"] <= single
@@ -0,0 +1,145 @@
+"""
+Test in-process, teacher-forced fingerprint verification
+"""
+import asyncio
+import json
+
+import pytest
+import torch
+
+from fastapi.testclient import TestClient
+
+from agent.audit_engine import AuditEngine
+from agent.config import settings
+from fingerprints.generator import FingerprintGenerator
+from fingerprints.jobs import SUCCEEDED
+
+
+@pytest.fixture
+def loaded(tiny_model_dir):
+    engine = AuditEngine()
+    model, tokenizer = asyncio.run(engine.model_loader.load_model(str(tiny_model_dir)))
+    return engine, model, tokenizer
+
+
+def _greedy_fingerprints(model, tokenizer, count, response_tokens=4):
+    """Fingerprints the model reproduces: each response is its greedy continuation"""
+    words = [word for word in tokenizer.get_vocab() if word not in tokenizer.all_special_tokens]
+    queries, responses = [], {}
+    for i in range(len(words)):
+        query = " ".join(words[(i + j) % len(words)] for j in range(3))
+        inputs = tokenizer(query, return_tensors="pt")
+        with torch.no_grad():
+            output = model.generate(**inputs, max_new_tokens=response_tokens, do_sample=False)
+        new_tokens = output[0, inputs["input_ids"].shape[1]:]
+        if any(token in tokenizer.all_special_ids for token in new_tokens.tolist()):
+            continue
+        queries.append(query)
+        responses[query] = tokenizer.decode(new_tokens)
+        if len(queries) == count:
+            break
+    return {"queries": queries, "responses": responses}
+
+
+@pytest.mark.asyncio
+async def test_reproduced_fingerprints_pass_and_others_fail(loaded, monkeypatch):
+    """Test greedy continuations pass, altered responses fail, in a few batched passes"""
+    engine, model, tokenizer = loaded
+    monkeypatch.setattr(settings, "verification_batch_size", 4)
+    fingerprints = _greedy_fingerprints(model, tokenizer, 8)
+    altered = fingerprints["queries"][0]
+    fingerprints["responses"][altered] = " ".join(reversed(fingerprints["responses"][altered].split())) + " zebra"
+
+    passes = []
+    original = model.forward
+    monkeypatch.setattr(model, "forward", lambda *a, **kw: passes.append(1) or original(*a, **kw))
+
+    result = await engine.verify_fingerprints("tiny", fingerprints, model=model, tokenizer=tokenizer)
+
+    assert len(passes) == 2
+    assert result["total_tested"] == 8
+    assert result["num_passed"] == 7
+    assert result["success_rate"] == 87.5
+    assert result["passed"] is False
+    entries = result["fingerprints"]
+    assert [entry["index"] for entry in entries] == list(range(8))
+    assert all("query" not in entry and len(entry["query_hash"]) == 16 for entry in entries)
+    assert entries[0]["passed"] is False
+    assert entries[0]["token_accuracy"] < 1.0
+    assert all(entry["passed"] for entry in entries[1:])
+
+
+def test_generator_verifies_in_process_with_loaded_model(loaded, tiny_model_dir, tmp_path, monkeypatch):
+    """Test the generator checks an OML-format file without loading the model again"""
+    engine, model, tokenizer = loaded
+    fingerprints = _greedy_fingerprints(model, tokenizer, 6)
+    path = tmp_path / "fingerprints.json"
+    path.write_text(json.dumps([
+        {"key": query, "response": fingerprints["responses"][query]}
+        for query in fingerprints["queries"]
+    ]))
+
+    loads = []
+    monkeypatch.setattr(
+        engine.model_loader,
+        "_from_pretrained",
+        lambda *a, **kw: loads.append(a) or pytest.fail("model loaded again")
+    )
+
+    result = FingerprintGenerator().verify_fingerprints(tiny_model_dir, path, 5, engine=engine)
+
+    assert loads == []
+    assert result["total_tested"] == 5
+    assert result["success_rate"] == 100.0
+    assert result["passed"] is True
+    assert "5/5" in result["output"]
+
+
+@pytest.mark.asyncio
+async def test_verify_job_runs_in_process(loaded, tiny_model_dir, tmp_path):
+    """Test the verify job scores in-process and reports its success rate"""
+    engine, model, tokenizer = loaded
+    fingerprints = _greedy_fingerprints(model, tokenizer, 4)
+    path = tmp_path / "fingerprints.json"
+    path.write_text(json.dumps(fingerprints))
+
+    updates = []
+    job = FingerprintGenerator().verify_fingerprints_job(
+        tiny_model_dir, path, 4, progress_callback=updates.append, engine=engine
+    )
+    await job.start()
+    result = await job.wait()
+
+    assert job.state == SUCCEEDED
+    assert job.success_rate == 100.0
+    assert result["num_passed"] == 4
+    assert "fingerprints" not in job.to_dict()["result"]
+    assert any(update["progress"] == 100.0 for update in updates)
+    # The model it loaded for the check is not left resident
+    assert engine.model_loader.get_stats()["resident_models"] == 0
+
+
+def test_verify_endpoint_refuses_secret_and_outside_files(tmp_path, monkeypatch):
+    """Test only generated plaintext sets under the fingerprint directory are accepted"""
+    from api.server import app
+
+    monkeypatch.setattr(settings, "fingerprint_dir", tmp_path)
+    (tmp_path / settings.master_fingerprints_file).write_bytes(b"secret")
+    (tmp_path / settings.owner_fingerprints_dir).mkdir()
+    (tmp_path / settings.owner_fingerprints_dir / "acme.json").write_text("[]")
+    outside = tmp_path.parent / "outside.json"
+    client = TestClient(app)
+
+    def verify(fingerprints_file):
+        return client.post(
+            "/api/v1/fingerprints/verify",
+            json={"model_path": "org/model", "fingerprints_file": str(fingerprints_file)}
+        ).status_code
+
+    assert verify(tmp_path / "fingerprints.json") == 403
+    monkeypatch.setattr(settings, "fingerprint_jobs_enabled", True)
+
+    assert verify(tmp_path / settings.master_fingerprints_file) == 400
+    assert verify(tmp_path / settings.owner_fingerprints_dir / "acme.json") == 403
+    assert verify(outside) == 400
+    assert verify(tmp_path / ".." / tmp_path.name / "missing.json") == 404
@@ -0,0 +1,62 @@
+"""
+Test weight-sketch lineage pre-screen
+"""
+import pytest
+import torch
+from transformers import AutoModelForCausalLM
+
+from models.identity import ModelIdentityService
+from models.sketch import WeightSketcher
+
+
+@pytest.fixture
+def sketcher(tmp_path):
+    identity = ModelIdentityService(cache_file=tmp_path / "identity.json")
+    return WeightSketcher(identity, sketch_dir=tmp_path / "sketches")
+
+
+def _fine_tune(source_dir, target_dir, noise=1e-3):
+    """Simulate a fine-tune by perturbing every weight slightly"""
+    model = AutoModelForCausalLM.from_pretrained(source_dir)
+    torch.manual_seed(123)
+    with torch.no_grad():
+        for param in model.parameters():
+            param.add_(torch.randn_like(param) * noise)
+    model.save_pretrained(target_dir)
+    return target_dir
+
+
+def test_derivative_scores_higher_than_unrelated(sketcher, tiny_model_dir, tiny_model_factory, tmp_path):
+    """Test fine-tuned derivatives correlate with their base"""
+    derivative = _fine_tune(tiny_model_dir, tmp_path / "derivative")
+    unrelated = tiny_model_factory("unrelated", seed=99)
+
+    reference = sketcher.sketch(str(tiny_model_dir))
+    derived = sketcher.compare(reference, sketcher.sketch(str(derivative)))
+    independent = sketcher.compare(reference, sketcher.sketch(str(unrelated)))
+
+    assert derived["likelihood"] > 0.95
+    assert independent["likelihood"] < 0.5
+    assert derived["compared_tensors"] > 0
+
+
+def test_sketch_is_cached_by_identity(sketcher, tiny_model_dir, monkeypatch):
+    """Test repeated sketches are served from the cache"""
+    first = sketcher.sketch(str(tiny_model_dir))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("sketch should come from cache")
+
+    monkeypatch.setattr(sketcher, "_iter_tensors", fail)
+    assert sketcher.sketch(str(tiny_model_dir)) == first
+
+
+def test_sketch_unavailable_without_local_weights(sketcher, tmp_path):
+    """Test models without local weights cannot be sketched"""
+    assert sketcher.sketch(str(tmp_path / "missing")) is None
+
+
+def test_canonical_names_ignore_wrappers():
+    """Test wrapper prefixes do not prevent tensor matching"""
+    assert WeightSketcher._canonical_name("base_model.model.transformer.h.0.mlp.c_fc.weight") == "h.0.mlp.c_fc.weight"
+    assert WeightSketcher._canonical_name("h.0.mlp.c_fc.weight") == "h.0.mlp.c_fc.weight"
@@ -0,0 +1,238 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Stage latencies span sub-millisecond matching to multi-minute loads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class _Metric:
+    """
+    A named metric with one child per label value combination.
+
+    Children are created once (under the metric's lock) and then updated
+    under their own lock, so recording never contends across metrics or
+    label sets; uncontended acquisition costs well under a microsecond.
+    """
+
+    kind = ""
+    suffix = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        name = self.name + self.suffix
+        lines = [f"# HELP {name} {self.documentation}", f"# TYPE {name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(dict(zip(self.labelnames, values)), child))
+        return lines
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _render_child(self, labels: Dict[str, str], child) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    """Monotonic count; the exposed name gets a `_total` suffix"""
+
+    kind = "counter"
+    suffix = "_total"
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def _render_child(self, labels: Dict[str, str], child: _Value) -> List[str]:
+        return [f"{self.name}_total{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class Gauge(_Metric):
+    """Current value, set when it changes or just before a scrape"""
+
+    kind = "gauge"
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def _render_child(self, labels: Dict[str, str], child: _Value) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class _HistogramChild:
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, count: int = 1):
+        """Record `count` observations of `value` (e.g. one per item of a batch)"""
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += count
+            self.sum += value * count
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float, count: int = 1):
+        self._default.observe(value, count)
+
+    def time(self):
+        return self._default.time()
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, labels: Dict[str, str], child: _HistogramChild) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics exposed together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
+
+AUDIT_STAGE_SECONDS = registry.histogram(
+    "guardian_audit_stage_seconds",
+    "Time spent in each audit stage (generation is per fingerprint)",
+    ["stage"]
+)
+MODEL_CACHE_EVENTS = registry.counter(
+    "guardian_model_cache_events",
+    "Model cache hits, misses and evictions",
+    ["cache", "event"]
+)
+AUDITS = registry.counter(
+    "guardian_audits",
+    "Completed audits by verdict",
+    ["verdict"]
+)
+AUDIT_QUEUE_DEPTH = registry.gauge(
+    "guardian_audit_queue_depth",
+    "Audits waiting for a slot or queued as jobs",
+    ["queue"]
+)
+AUDITS_RUNNING = registry.gauge(
+    "guardian_audits_running",
+    "Audits holding a scheduler slot"
+)
+RESIDENT_MODEL_BYTES = registry.gauge(
+    "guardian_resident_model_bytes",
+    "Bytes of model weights held in memory (shared tensors counted once)"
+)
@@ -29,6 +29,32 @@ class InputValidator:
         """Check if audit mode is valid"""
         return mode in ["quick", "standard", "deep"]
     
+    @staticmethod
+    def validate_precision(precision: Optional[str]) -> bool:
+        """Check if weight precision is valid (None means the default)"""
+        return precision is None or precision in ["fp32", "bf16", "fp16"]
+    
+    @staticmethod
+    def validate_fingerprints_file(fingerprints_file: str, root: Path) -> bool:
+        """Check a fingerprints file is a plaintext set inside `root` (never an encrypted store)"""
+        if not fingerprints_file or not isinstance(fingerprints_file, str):
+            return False
+        
+        path = Path(fingerprints_file).resolve()
+        if path.suffix not in [".json", ".jsonl", ".ndjson"]:
+            return False
+        
+        return path.is_relative_to(Path(root).resolve())
+    
+    @staticmethod
+    def validate_output_path(output_path: str, root: Path) -> bool:
+        """Check an output file or directory lies inside `root`"""
+        if not output_path or not isinstance(output_path, str):
+            return False
+        
+        path = Path(output_path).resolve()
+        return path != Path(root).resolve() and path.is_relative_to(Path(root).resolve())
+    
     @staticmethod
     def sanitize_user_input(text: str, max_length: int = 1000) -> str:
         """Sanitize user text input"""